@@ -25,6 +25,9 @@ a = Analysis(
         'apps.image_tools.simple_resizer',
         'apps.image_tools.group_processor',
         'apps.image_tools.individual_processor',
+        'apps.image_tools.share_sync',
+        'apps.image_tools.sync_status',
+        'apps.image_tools.photo_search',
     ],
     hookspath=[],
     hooksconfig={},
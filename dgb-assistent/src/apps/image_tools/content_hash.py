@@ -0,0 +1,227 @@
+"""
+Content Hash - DGB Assistent
+BLAKE2 indholds-hashes til at genkende filer der allerede ligger i en museum mappe.
+Hashes gemmes pr. mappe (med størrelse og mtime) i én delt HashStore, så eksisterende filer
+kun læses igen når de er ændret - og kun filer med samme størrelse som den nye fil læses overhovedet.
+Mappernes indhold (navn, størrelse, mtime) kommer fra organizerens mappe-index - ingen ekstra scanning.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .museum_fs import MuseumFilesystem
+
+# Hvad organize gør med filer hvis indhold allerede findes i målmappen
+DEDUP_OFF = "off"     # Skriv altid som "navn a.jpg" (standard)
+DEDUP_SKIP = "skip"   # Spring over og rapportér i results['skipped']
+DEDUP_LINK = "link"   # Opret det nye navn som hardlink til den eksisterende fil
+DEDUP_MODES = (DEDUP_OFF, DEDUP_SKIP, DEDUP_LINK)
+
+HASH_DIGEST_SIZE = 32
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def new_hasher():
+    """Ny BLAKE2b hasher med appens digest-størrelse"""
+    return hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+
+
+def hash_bytes(data: bytes) -> str:
+    """Hash af data i hukommelsen"""
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """Streamende hash af en fil (læses i blokke)"""
+    hasher = new_hasher()
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb') as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+    return hasher.hexdigest()
+
+
+def hash_file_info(file_info: Dict) -> Optional[Tuple[int, str]]:
+    """
+    Størrelse og hash for en files_data entry ('data' eller 'source_path')
+    Returns: (size, digest) eller None hvis der ikke er noget indhold
+    """
+    if 'data' in file_info:
+        return len(file_info['data']), hash_bytes(file_info['data'])
+    if 'source_path' in file_info:
+        return os.path.getsize(file_info['source_path']), hash_file(file_info['source_path'])
+    return None
+
+
+HASH_CACHE_PATH = Path.home() / "AppData" / "Local" / "DGB-Assistent" / "hash_cache.json"
+
+
+class HashStore:
+    """Persisterede hashes {mappe: {navn: [størrelse, mtime_ns, hash]}} - én instans deles af alle organizere"""
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = Path(cache_path) if cache_path else HASH_CACHE_PATH
+        self.hashes = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Indlæs gemte hashes"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self.hashes = json.load(f)
+        except FileNotFoundError:
+            self.hashes = {}
+        except Exception as e:
+            print(f"Kunne ikke indlæse hash-cache: {e}")
+            self.hashes = {}
+
+    def save(self):
+        """Gem hashes (kun hvis der er ændringer)"""
+        try:
+            with self.lock:
+                if not self.dirty:
+                    return
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.cache_path.with_suffix(".tmp")
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.hashes, f, ensure_ascii=False)
+                os.replace(temp_path, self.cache_path)
+                self.dirty = False
+        except Exception as e:
+            print(f"Kunne ikke gemme hash-cache: {e}")
+
+    def lookup(self, folder: str, name: str, size: int, mtime_ns: int) -> Optional[str]:
+        """Gemt hash hvis filen ikke er ændret siden (samme størrelse og mtime)"""
+        with self.lock:
+            entry = self.hashes.get(folder, {}).get(name)
+        if entry and entry[0] == size and entry[1] == mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, folder: str, name: str, size: int, mtime_ns: int, digest: str):
+        with self.lock:
+            self.hashes.setdefault(folder, {})[name] = [size, mtime_ns, digest]
+            self.dirty = True
+
+    def prune(self, folder: str, names: Iterable[str]):
+        """Glem hashes for filer der ikke længere findes i mappen"""
+        with self.lock:
+            folder_hashes = self.hashes.get(folder)
+            if not folder_hashes:
+                return
+            missing = set(folder_hashes) - set(names)
+            for name in missing:
+                del folder_hashes[name]
+            if missing:
+                self.dirty = True
+
+
+_hash_store = None
+_hash_store_lock = threading.Lock()
+
+def get_hash_store() -> HashStore:
+    """Get the global hash store (delt af UI organizeren og synkroniseringen)"""
+    global _hash_store
+    with _hash_store_lock:
+        if _hash_store is None:
+            _hash_store = HashStore()
+        return _hash_store
+
+
+class FolderHashCache:
+    """
+    Deduplikering for én organizer: finder identisk indhold i en mappe ud fra mappe-indexets
+    listing (navn -> (størrelse, mtime_ns)) og den delte HashStore
+    """
+
+    def __init__(self, listing: Callable[[str], Dict[str, Tuple[int, int]]],
+                 store: Optional[HashStore] = None, fs: Optional[MuseumFilesystem] = None):
+        self.listing = listing      # Fx organizerens tree_index.file_stats - mappen scannes ikke igen her
+        self.store = store or get_hash_store()
+        self.pending = {}   # Denne kørsel: mappe -> {digest: navn} for planlagte filer
+        self.pruned = set()  # Mapper hvis forsvundne filer er fjernet fra store i denne kørsel
+        self.fs = fs or MuseumFilesystem()  # Delt med organizeren, så kaldene tælles med i fs_stats
+
+    def save(self):
+        self.store.save()
+
+    def begin_run(self):
+        """Start en ny organize-kørsel - planlagte filer glemmes, gemte hashes genbruges"""
+        self.pending.clear()
+        self.pruned.clear()
+
+    def list_folder(self, folder: str) -> Dict[str, Tuple[int, int]]:
+        """Filer i mappen med størrelse og mtime (fra mappe-indexet)"""
+        listing = self.listing(folder)
+        if folder not in self.pruned:
+            self.pruned.add(folder)
+            self.store.prune(folder, listing)
+        return listing
+
+    def cached_hash(self, folder: str, name: str, size: int, mtime_ns: int,
+                    cached_only: bool = False) -> Optional[str]:
+        """
+        Hash af en eksisterende fil - beregnes kun hvis størrelse/mtime er ændret
+        cached_only: læs aldrig filen (None hvis hashen ikke er gemt)
+        """
+        digest = self.store.lookup(folder, name, size, mtime_ns)
+        if digest or cached_only:
+            return digest
+
+        with self.fs.timed('hash'):
+            digest = hash_file(os.path.join(folder, name))
+        self.store.put(folder, name, size, mtime_ns, digest)
+        return digest
+
+    def find_duplicate(self, folder: str, size: int, digest: str, cached_only: bool = False) -> Optional[str]:
+        """
+        Find en fil i mappen med samme indhold (kun filer med samme størrelse hashes)
+        cached_only: sammenlign kun med gemte hashes - ingen læsning på drevet (fx forhåndsvisning)
+        """
+        for name, (existing_size, mtime_ns) in self.list_folder(folder).items():
+            if existing_size != size:
+                continue
+            try:
+                if self.cached_hash(folder, name, existing_size, mtime_ns, cached_only) == digest:
+                    return name
+            except OSError as e:
+                print(f"Kunne ikke hashe {os.path.join(folder, name)}: {e}")
+
+        # Planlagt tidligere i samme kørsel (endnu ikke skrevet)
+        return self.pending.get(folder, {}).get(digest)
+
+    def reserve(self, folder: str, name: str, digest: str):
+        """Registrér en planlagt fil, så identiske filer i samme kørsel genkendes"""
+        self.pending.setdefault(folder, {}).setdefault(digest, name)
+
+    def record(self, file_path: str, digest: str) -> Optional[os.stat_result]:
+        """
+        Registrér en fil der netop er skrevet
+        Returns: filens stat (til mappe-indexet) eller None hvis den ikke kunne læses
+        """
+        folder, name = os.path.split(file_path)
+        try:
+            stat = self.fs.stat(file_path)
+        except OSError:
+            return None
+        self.store.put(folder, name, stat.st_size, stat.st_mtime_ns, digest)
+        return stat
+
+    def discard(self, file_path: str, digest: str):
+        """Fjern en planlagt fil der ikke blev skrevet"""
+        folder, name = os.path.split(file_path)
+        pending = self.pending.get(folder, {})
+        if pending.get(digest) == name:
+            del pending[digest]
@@ -0,0 +1,172 @@
+"""
+Fast Copy - DGB Assistent
+Hurtige overførsler af eksisterende filer til museum mapperne. Ligger kilde og mål på
+samme drev kan filen flyttes, hardlinkes eller reflinkes (ingen bytes kopieres).
+Ellers bruges styresystemets egen kopiering (CopyFileW på Windows, som lader SMB
+serveren kopiere selv, og copy_file_range/sendfile på Linux) med stor buffer som sidste udvej.
+"""
+
+import os
+import shutil
+import sys
+
+# Overførselsmåder for source_path filer
+TRANSFER_COPY = "copy"          # Kopi (reflink hvis filsystemet understøtter det)
+TRANSFER_MOVE = "move"          # Flyt med rename på samme drev, ellers kopi + slet kilde
+TRANSFER_HARDLINK = "hardlink"  # Hardlink på samme drev, ellers kopi
+TRANSFER_REFLINK = "reflink"    # Copy-on-write kloning, ellers kopi
+TRANSFER_MODES = (TRANSFER_COPY, TRANSFER_MOVE, TRANSFER_HARDLINK, TRANSFER_REFLINK)
+
+# Buffer til den rene Python kopiering
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Linux ioctl til copy-on-write kloning (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def same_filesystem(source_path: str, target_dir: str) -> bool:
+    """Tjek om kilde og målmappe ligger på samme filsystem/drev"""
+    try:
+        return os.stat(source_path).st_dev == os.stat(target_dir).st_dev
+    except OSError:
+        return False
+
+
+def try_reflink(source_path: str, target_path: str) -> bool:
+    """Forsøg copy-on-write kloning - returnerer False hvis filsystemet ikke understøtter det"""
+    if sys.platform.startswith('linux'):
+        import fcntl
+        try:
+            with open(source_path, 'rb') as src, open(target_path, 'xb') as dest:
+                try:
+                    fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+                    return True
+                except OSError:
+                    pass
+        except OSError:
+            return False
+        # Kloning fejlede - fjern den tomme målfil igen
+        try:
+            os.remove(target_path)
+        except OSError:
+            pass
+        return False
+
+    if sys.platform == 'darwin':
+        import ctypes
+        try:
+            libc = ctypes.CDLL("libc.dylib", use_errno=True)
+            return libc.clonefile(os.fsencode(source_path), os.fsencode(target_path), 0) == 0
+        except Exception:
+            return False
+
+    # Windows (ReFS block cloning) understøttes ikke - CopyFileW bruges i stedet
+    return False
+
+
+def kernel_copy(source_path: str, target_path: str) -> bool:
+    """
+    Kopiér uden at bytes går gennem Python
+    Returns: False hvis ingen af styresystemets metoder kunne bruges (intet er skrevet)
+    """
+    if os.name == 'nt':
+        import ctypes
+        # CopyFileW lader Windows/SMB lave kopien (server-side copy på netværksdrev)
+        if ctypes.windll.kernel32.CopyFileW(source_path, target_path, True):
+            return True
+        raise ctypes.WinError()
+
+    copy_functions = []
+    if hasattr(os, 'copy_file_range'):
+        copy_functions.append(lambda src, dest, count, offset:
+                              os.copy_file_range(src, dest, count, offset_src=offset))
+    if hasattr(os, 'sendfile'):
+        copy_functions.append(lambda src, dest, count, offset:
+                              os.sendfile(dest, src, offset, count))
+
+    for copy_function in copy_functions:
+        with open(source_path, 'rb') as src, open(target_path, 'wb') as dest:
+            size = os.fstat(src.fileno()).st_size
+            offset = 0
+            try:
+                while offset < size:
+                    copied = copy_function(src.fileno(), dest.fileno(), min(size - offset, 1 << 30), offset)
+                    if copied == 0:
+                        break
+                    offset += copied
+            except OSError:
+                if offset == 0:
+                    continue  # Ikke understøttet mellem disse filsystemer - prøv næste metode
+                raise
+            if offset >= size:
+                return True
+
+    return False
+
+
+def buffered_copy(source_path: str, target_path: str):
+    """Kopiér med stor genbrugt buffer (sidste udvej)"""
+    buffer = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dest:
+        while True:
+            read = src.readinto(buffer)
+            if not read:
+                break
+            dest.write(view[:read])
+
+
+def fast_copy(source_path: str, target_path: str, try_clone: bool = True) -> str:
+    """
+    Kopiér med bevarede tidsstempler (som shutil.copy2) via den hurtigste tilgængelige metode
+    try_clone: forsøg reflink først (giver kun mening på samme filsystem)
+    Returns: den brugte metode ('reflink', 'kernel' eller 'buffer')
+    """
+    if try_clone and try_reflink(source_path, target_path):
+        method = "reflink"
+    elif kernel_copy(source_path, target_path):
+        method = "kernel"
+    else:
+        buffered_copy(source_path, target_path)
+        method = "buffer"
+
+    if os.name != 'nt':  # CopyFileW bevarer selv tidsstempler og attributter
+        shutil.copystat(source_path, target_path)
+    return method
+
+
+def transfer_file(source_path: str, target_path: str, mode: str = TRANSFER_COPY) -> str:
+    """
+    Overfør source_path til target_path (der ikke må findes i forvejen)
+    Returns: den brugte metode ('moved', 'hardlink', 'reflink', 'kernel', 'buffer')
+    """
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Ukendt overførselsmåde: {mode}")
+
+    on_same_filesystem = same_filesystem(source_path, os.path.dirname(target_path))
+
+    if mode == TRANSFER_MOVE:
+        if on_same_filesystem:
+            os.rename(source_path, target_path)
+            return "moved"
+        method = fast_copy(source_path, target_path, try_clone=False)
+        os.remove(source_path)
+        return method
+
+    if mode == TRANSFER_HARDLINK and on_same_filesystem:
+        try:
+            os.link(source_path, target_path)
+            return "hardlink"
+        except OSError:
+            pass  # Fx FAT/exFAT eller netværksdrev uden hardlinks - kopiér i stedet
+
+    return fast_copy(source_path, target_path, try_clone=on_same_filesystem)
+
+
+def describe_transfer(method: str) -> str:
+    """Dansk verbum til resultatbeskeder"""
+    return {
+        'moved': "Flyttet",
+        'hardlink': "Linket",
+        'reflink': "Klonet",
+    }.get(method, "Kopieret")
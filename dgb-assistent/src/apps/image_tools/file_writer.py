@@ -0,0 +1,244 @@
+"""
+File Writer - DGB Assistent
+Gemmer behandlede billeder i baggrunden. Hver fil skrives til en midlertidig fil i
+målmappen og omdøbes atomisk på plads, så mappen aldrig indeholder halve billeder.
+Netværksmapper skrives med en lille trådpulje, da hver fil ellers venter på rundture.
+"""
+
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .manifest import HashingWriter, ManifestBuilder
+
+# fsync politik:
+#   none - ingen fsync, styresystemet skriver til disk når det passer (hurtigst)
+#   file - fsync hver fil før den omdøbes på plads (sikrest, langsomt over SMB)
+#   end  - skriv alt først, og fsync alle filer samlet til sidst
+FSYNC_NONE = "none"
+FSYNC_FILE = "file"
+FSYNC_END = "end"
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_FILE, FSYNC_END)
+DEFAULT_FSYNC_POLICY = os.environ.get("DGB_FSYNC_POLICY", FSYNC_NONE)
+
+# Antal samtidige skrivninger - lokale diske vinder intet ved flere tråde
+NETWORK_WORKERS = 4
+LOCAL_WORKERS = 1
+
+COPY_BUFFER_SIZE = 1024 * 1024
+TEMP_SUFFIX = ".dgbtmp"
+
+# Filsystemer der behandles som netværksmapper på Linux/macOS
+NETWORK_FS_TYPES = {'cifs', 'smbfs', 'smb3', 'nfs', 'nfs4', 'afpfs', 'fuse.sshfs', 'davfs', '9p'}
+
+# (payload, målsti[, metadata]) - payload er en StoredPayload fra result_store,
+# metadata {'source', 'rendition'} bruges i manifestet
+WriteJob = Tuple
+
+
+def is_network_path(path: str) -> bool:
+    """Tjek om stien ligger på et netværksdrev (UNC sti, tilknyttet drev eller netværksmount)"""
+    path = os.path.abspath(path)
+    if path.startswith("\\\\") or path.startswith("//"):
+        return True
+
+    if os.name == 'nt':
+        try:
+            import ctypes
+            drive = os.path.splitdrive(path)[0] + "\\"
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+        except Exception:
+            return False
+
+    # Find den længste mount der indeholder stien
+    try:
+        best_mount, best_type = "", ""
+        with open("/proc/mounts", 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point, fs_type = parts[1], parts[2]
+                if path == mount_point or path.startswith(mount_point.rstrip("/") + "/"):
+                    if len(mount_point) > len(best_mount):
+                        best_mount, best_type = mount_point, fs_type
+        return best_type in NETWORK_FS_TYPES
+    except OSError:
+        return False
+
+
+def default_workers(target_dir: str) -> int:
+    """Trådpuljens størrelse ud fra målmappens placering"""
+    return NETWORK_WORKERS if is_network_path(target_dir) else LOCAL_WORKERS
+
+
+def fsync_path(path: str):
+    """fsync en allerede skrevet fil"""
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def write_file_atomic(payload, target_path: str, fsync: bool = False,
+                      algorithms: Iterable[str] = ()) -> Dict:
+    """
+    Skriv payload til en midlertidig fil ved siden af målet og omdøb den på plads
+    Returns: {'size', 'hashes'} - hashes beregnes undervejs for de angivne algoritmer
+    """
+    directory, filename = os.path.split(target_path)
+    temp_path = os.path.join(directory, f".{filename}.{threading.get_ident()}{TEMP_SUFFIX}")
+
+    try:
+        with payload.open() as src, open(temp_path, 'wb') as dest:
+            writer = HashingWriter(dest, algorithms)
+            shutil.copyfileobj(src, writer, COPY_BUFFER_SIZE)
+            if fsync:
+                dest.flush()
+                os.fsync(dest.fileno())
+        os.replace(temp_path, target_path)
+        return {'size': writer.size, 'hashes': writer.digests()}
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def processed_file_jobs(processed_files: List[Dict], output_dir: str) -> List[WriteJob]:
+    """Byg skrive-jobs for small/ og large/ versionerne af behandlede billeder"""
+    small_dir = os.path.join(output_dir, "small")
+    large_dir = os.path.join(output_dir, "large")
+
+    jobs = []
+    for file_pair in processed_files:
+        filename = file_pair['small']['filename']
+        for rendition, folder in (('small', small_dir), ('large', large_dir)):
+            jobs.append((file_pair[rendition]['payload'], os.path.join(folder, filename), {
+                'source': file_pair.get('original_path'),
+                'rendition': file_pair[rendition].get('rendition')
+            }))
+    return jobs
+
+
+class BackgroundWriter:
+    """
+    Skriver en liste af jobs i en baggrundstråd med en begrænset trådpulje
+    Callbacks kaldes fra baggrundstråde - GUI'en skal selv bruge window.after
+    """
+
+    def __init__(self, jobs: List[WriteJob], workers: Optional[int] = None,
+                 fsync_policy: str = DEFAULT_FSYNC_POLICY,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 done_callback: Optional[Callable[[Dict], None]] = None,
+                 manifest: Optional[ManifestBuilder] = None):
+        if fsync_policy not in FSYNC_POLICIES:
+            print(f"Ukendt fsync politik '{fsync_policy}', bruger '{FSYNC_NONE}'")
+            fsync_policy = FSYNC_NONE
+
+        self.jobs = list(jobs)
+        self.workers = workers
+        self.fsync_policy = fsync_policy
+        self.progress_callback = progress_callback
+        self.done_callback = done_callback
+        self.manifest = manifest  # Skrives i manifest.root når alle filer er gemt
+
+        self.results = {'saved': [], 'errors': [], 'manifest': None}
+        self.completed = 0
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start skrivningen i baggrunden"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Stop efter de igangværende filer (resten springes over, ingen flere callbacks)"""
+        self.progress_callback = None
+        self.done_callback = None
+        self.cancelled.set()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Vent på at skrivningen er færdig"""
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self):
+        """Opret mapper én gang, skriv alle filer og rapportér resultatet"""
+        try:
+            # Mapper oprettes samlet før skrivningen - ikke én makedirs pr. fil
+            for directory in sorted({os.path.dirname(job[1]) for job in self.jobs}):
+                os.makedirs(directory, exist_ok=True)
+
+            workers = self.workers
+            if workers is None:
+                workers = default_workers(os.path.dirname(self.jobs[0][1])) if self.jobs else 1
+
+            if workers <= 1:
+                for job in self.jobs:
+                    self.write_job(job)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(self.write_job, self.jobs))
+
+            if self.fsync_policy == FSYNC_END and not self.cancelled.is_set():
+                for target_path in self.results['saved']:
+                    try:
+                        fsync_path(target_path)
+                    except OSError as e:
+                        self.results['errors'].append(f"fsync fejlede for {target_path}: {str(e)}")
+
+        except Exception as e:
+            self.results['errors'].append(f"Fejl ved gemning: {str(e)}")
+
+        if self.manifest is not None and self.results['saved']:
+            try:
+                self.results['manifest'] = self.manifest.write(
+                    os.path.join(self.manifest.root, self.manifest.default_filename()))
+            except Exception as e:
+                self.results['errors'].append(f"Kunne ikke skrive manifest: {str(e)}")
+
+        if self.cancelled.is_set():
+            skipped = len(self.jobs) - self.completed
+            if skipped:
+                self.results['errors'].append(f"Afbrudt - {skipped} filer blev ikke gemt")
+
+        done_callback = self.done_callback
+        if done_callback:
+            done_callback(self.results)
+
+    def write_job(self, job: WriteJob):
+        """Skriv én fil (kører i en arbejdstråd)"""
+        if self.cancelled.is_set():
+            return
+
+        payload, target_path = job[0], job[1]
+        metadata = job[2] if len(job) > 2 else {}
+        try:
+            written = write_file_atomic(payload, target_path, fsync=self.fsync_policy == FSYNC_FILE,
+                                        algorithms=self.manifest.algorithms if self.manifest else ())
+            if self.manifest is not None:
+                self.manifest.add(target_path, written['size'], written['hashes'],
+                                  metadata.get('source'), metadata.get('rendition'))
+            error = None
+        except Exception as e:
+            error = f"Fejl ved gemning af {os.path.basename(target_path)}: {str(e)}"
+
+        with self.lock:
+            if error:
+                self.results['errors'].append(error)
+            else:
+                self.results['saved'].append(target_path)
+            self.completed += 1
+            completed = self.completed
+
+        progress_callback = self.progress_callback
+        if progress_callback:
+            progress_callback(completed, len(self.jobs))
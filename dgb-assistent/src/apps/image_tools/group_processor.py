@@ -14,11 +14,16 @@ from pathlib import Path
 import io
 import gc
 import json
-import zipfile
 from PIL import Image, ImageTk
 import threading
 from typing import List, Dict, Optional
 from .museum_organizer import MuseumOrganizer
+from .fast_copy import TRANSFER_HARDLINK
+from .organize_preview import organize_with_preview
+from .result_store import ResultStore
+from .file_writer import BackgroundWriter, processed_file_jobs
+from .manifest import ManifestBuilder
+from .zip_export import IncrementalZipWriter, ManifestWriteError, processed_file_entries, write_zip
 
 
 class GroupImageProcessor:
@@ -32,6 +37,11 @@ class GroupImageProcessor:
         self.processed_files = []
         self.processing = False
         self.museum_organizer = MuseumOrganizer()
+        self.zip_writer = None  # IncrementalZipWriter når ZIP bygges under behandling
+        self.result_store = None  # ResultStore for den seneste kørsel
+        self.file_writer = None  # BackgroundWriter mens der gemmes
+        self.export_store = None  # ResultStore som ZIP eksporten læser fra mens den kører
+        self.export_lock = threading.Lock()
         
     def show(self):
         """Show the group image processor window"""
@@ -41,12 +51,35 @@ class GroupImageProcessor:
             self.window.lift()
             self.window.focus_force()
     
+    def on_close(self):
+        """Luk vinduet, afbryd løbende ZIP/gemning og slet midlertidige resultatfiler"""
+        writer, self.zip_writer = self.zip_writer, None
+        if writer is not None:
+            writer.abort()
+        if self.file_writer is not None:
+            # Lad igangværende filer blive færdige før spill-filerne slettes
+            self.file_writer.cancel()
+            self.file_writer.wait(timeout=5)
+            self.file_writer = None
+        self.close_result_store()
+        self.processed_files.clear()
+        self.window.destroy()
+    
+    def close_result_store(self):
+        """Slet spill-filerne - læser ZIP eksporten stadig fra lageret, lukker eksporten det selv"""
+        with self.export_lock:
+            store, self.result_store = self.result_store, None
+            if store is None or store is self.export_store:
+                return
+        store.close()
+    
     def create_window(self):
         """Create the main window"""
         self.window = tk.Toplevel(self.parent) if self.parent else tk.Tk()
         self.window.title("Gruppe Billedbehandler - DGB Assistent")
         self.window.geometry("1000x700")
         self.window.configure(bg='#f8fafc')
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Colors matching DGB Assistent theme
         self.colors = {
@@ -238,6 +271,13 @@ class GroupImageProcessor:
                                         variable=self.auto_organize_var)
         organize_check.pack(anchor=tk.W)
         
+        # Løbende ZIP option
+        self.stream_zip_var = tk.BooleanVar(value=False)
+        stream_zip_check = ttk.Checkbutton(settings_frame,
+                                          text="Byg ZIP løbende under behandlingen (vælg fil ved start)",
+                                          variable=self.stream_zip_var)
+        stream_zip_check.pack(anchor=tk.W, pady=(10, 0))
+        
         # Processing area
         process_frame = ttk.LabelFrame(self.process_tab, text="Start Behandling", padding=15)
         process_frame.pack(fill=tk.BOTH, expand=True)
@@ -333,6 +373,11 @@ class GroupImageProcessor:
             parent=self.window
         )
         
+        if files:
+            self.load_files(files)
+    
+    def load_files(self, files):
+        """Indlæs valgte filer (fra fil-dialogen eller overdraget fra en anden instans)"""
         if files:
             self.selected_files = list(files)
             count = len(files)
@@ -627,7 +672,12 @@ class GroupImageProcessor:
     
     def start_processing(self):
         """Start processing images in groups"""
-        if self.processing or not self.image_groups:
+        if self.processing or self.file_writer is not None or not self.image_groups:
+            return
+        
+        # Løbende ZIP: arkivet vælges før behandlingen starter
+        self.zip_writer = None
+        if self.stream_zip_var.get() and not self.open_stream_zip(self.expected_filenames()):
             return
             
         self.processing = True
@@ -637,10 +687,64 @@ class GroupImageProcessor:
         self.progress_var.set(0)
         self.processed_files.clear()
         
+        # Nyt resultatlager - spill-filer fra forrige kørsel slettes
+        self.close_result_store()
+        self.result_store = ResultStore()
+        
         # Start processing in background thread
         thread = threading.Thread(target=self.process_groups, daemon=True)
         thread.start()
     
+    def expected_filenames(self) -> List[str]:
+        """Filnavne i den rækkefølge process_groups vil producere dem"""
+        prefix = "AAB " if self.use_aab_var.get() else ""
+        filenames = []
+        for group in self.image_groups:
+            group_name = group['name'].strip()
+            for i, image_index in enumerate(group['images']):
+                if image_index < len(self.selected_files):
+                    filenames.append(f"{prefix}{group_name} {chr(97 + i)}.jpg")
+        return filenames
+    
+    def open_stream_zip(self, expected_filenames: List[str]) -> bool:
+        """Vælg ZIP-destination før behandlingen og start skrivetråden"""
+        zip_path = filedialog.asksaveasfilename(
+            title="Vælg ZIP fil (bygges under behandlingen)",
+            defaultextension=".zip",
+            filetypes=[("ZIP filer", "*.zip"), ("Alle filer", "*.*")],
+            parent=self.window
+        )
+        
+        if not zip_path:
+            return False
+        
+        try:
+            self.zip_writer = IncrementalZipWriter(
+                zip_path, expected_filenames,
+                manifest=ManifestBuilder('zip', zip_path, self.manifest_parameters()))
+        except Exception as e:
+            messagebox.showerror("ZIP Fejl", f"Kunne ikke oprette ZIP: {str(e)}", parent=self.window)
+            return False
+        return True
+    
+    def finish_stream_zip(self, completed: bool = True):
+        """Færdiggør (eller afbryd) den løbende ZIP - kaldes fra behandlingstråden"""
+        writer, self.zip_writer = self.zip_writer, None
+        if writer is None:
+            return
+        
+        if not completed:
+            writer.abort()
+            return
+        
+        try:
+            writer.close()
+            self.window.after(0, lambda: self.zip_export_complete(writer.zip_path, None))
+        except ManifestWriteError as e:
+            self.window.after(0, lambda warning=str(e): self.zip_export_complete(writer.zip_path, None, warning))
+        except Exception as e:
+            self.window.after(0, lambda error=str(e): self.zip_export_complete(writer.zip_path, error))
+    
     def process_groups(self):
         """Process images in groups (runs in background thread)"""
         try:
@@ -651,6 +755,7 @@ class GroupImageProcessor:
             processed_count = 0
             
             if total_images == 0:
+                self.finish_stream_zip(completed=False)
                 self.window.after(0, lambda: self.processing_error("Ingen billeder i grupperne"))
                 return
             
@@ -679,6 +784,8 @@ class GroupImageProcessor:
                                                             small_max_size_kb, use_aab_prefix)
                             if result:
                                 self.processed_files.append(result)
+                                if self.zip_writer:
+                                    self.zip_writer.add_processed_file(result)
                         except Exception as e:
                             print(f"Fejl ved behandling af {file_path}: {e}")
                         
@@ -692,8 +799,10 @@ class GroupImageProcessor:
             
             # Processing complete
             self.window.after(0, lambda: self.processing_complete(len(self.processed_files), total_images))
+            self.finish_stream_zip()
             
         except Exception as e:
+            self.finish_stream_zip(completed=False)
             self.window.after(0, lambda: self.processing_error(str(e)))
     
     def process_group_image(self, file_path: str, group_name: str, letter: str, 
@@ -719,11 +828,13 @@ class GroupImageProcessor:
             return {
                 'small': {
                     'filename': filename,
-                    'data': small_image
+                    'payload': self.result_store.put(small_image),
+                    'rendition': {'name': 'small', 'format': 'JPEG', 'max_size_kb': small_max_size_kb}
                 },
                 'large': {
                     'filename': filename,
-                    'data': large_image
+                    'payload': self.result_store.put(large_image),
+                    'rendition': {'name': 'large', 'format': 'JPEG', 'quality': 100}
                 },
                 'original_path': file_path,
                 'group_name': group_name,
@@ -858,7 +969,7 @@ class GroupImageProcessor:
     
     def download_zip(self):
         """Create and download ZIP file with all processed images"""
-        if not self.processed_files:
+        if not self.processed_files or self.export_store is not None:
             return
         
         # Bring window to front before showing dialog
@@ -879,44 +990,48 @@ class GroupImageProcessor:
         if not zip_path:
             return
         
-        try:
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # First pass: count duplicates for each filename
-                filename_counts = {}
-                for file_pair in self.processed_files:
-                    base_filename = file_pair['small']['filename']
-                    filename_counts[base_filename] = filename_counts.get(base_filename, 0) + 1
-                
-                # Second pass: assign unique names with suffixes for duplicates
-                filename_counters = {}
-                for file_pair in self.processed_files:
-                    base_filename = file_pair['small']['filename']
-                    name, ext = os.path.splitext(base_filename)
-                    
-                    # If there are multiple files with this name, add suffix
-                    if filename_counts[base_filename] > 1:
-                        if base_filename not in filename_counters:
-                            filename_counters[base_filename] = 0
-                        
-                        suffix = chr(ord('a') + filename_counters[base_filename])
-                        small_filename = f"{name} {suffix}{ext}"
-                        large_filename = f"{name} {suffix}{ext}"
-                        filename_counters[base_filename] += 1
-                    else:
-                        # Single file, no suffix needed
-                        small_filename = base_filename
-                        large_filename = base_filename
-                    
-                    # Add small version
-                    zip_file.writestr(f"small/{small_filename}", file_pair['small']['data'])
-                    
-                    # Add large version
-                    zip_file.writestr(f"large/{large_filename}", file_pair['large']['data'])
+        # Skriv arkivet i baggrunden - JPEG'er gemmes ukomprimeret og streames i blokke
+        entries = processed_file_entries(self.processed_files)
+        manifest = ManifestBuilder('zip', zip_path, self.manifest_parameters())
+        self.download_zip_btn.config(state=tk.DISABLED, text="⏳ Opretter ZIP...")
+        
+        # Lageret holdes i live til eksporten er færdig (se close_result_store)
+        self.export_store = self.result_store
+        
+        def export_zip():
+            error, warning = None, None
+            try:
+                write_zip(zip_path, entries, manifest=manifest)
+            except ManifestWriteError as e:
+                warning = str(e)
+            except Exception as e:
+                error = str(e)
             
+            with self.export_lock:
+                store, self.export_store = self.export_store, None
+                orphaned = store is not self.result_store  # Ny kørsel startet eller vinduet lukket
+            if orphaned:
+                store.close()
+            try:
+                self.window.after(0, lambda: self.zip_export_complete(zip_path, error, warning))
+            except (RuntimeError, tk.TclError):
+                pass  # Vinduet er lukket
+        
+        threading.Thread(target=export_zip, daemon=True).start()
+    
+    def zip_export_complete(self, zip_path: str, error: Optional[str], warning: Optional[str] = None):
+        """Called when the ZIP export thread is done (warning: arkivet er gemt, men uden manifest)"""
+        if not self.window.winfo_exists():
+            return
+        ready = self.processed_files and not self.processing
+        self.download_zip_btn.config(state=tk.NORMAL if ready else tk.DISABLED, text="📦 Download ZIP")
+        
+        if error:
+            messagebox.showerror("ZIP Fejl", f"Fejl ved oprettelse af ZIP: {error}")
+        elif warning:
+            messagebox.showwarning("ZIP Oprettet", f"ZIP fil gemt som:\n{zip_path}\n\n⚠️ {warning}")
+        else:
             messagebox.showinfo("ZIP Oprettet", f"ZIP fil gemt som:\n{zip_path}")
-            
-        except Exception as e:
-            messagebox.showerror("ZIP Fejl", f"Fejl ved oprettelse af ZIP: {str(e)}")
     
     def save_individual(self):
         """Save processed images to selected directory"""
@@ -935,34 +1050,52 @@ class GroupImageProcessor:
         if not output_dir:
             return
         
-        try:
-            # Create subdirectories
-            small_dir = os.path.join(output_dir, "small")
-            large_dir = os.path.join(output_dir, "large")
-            os.makedirs(small_dir, exist_ok=True)
-            os.makedirs(large_dir, exist_ok=True)
-            
-            saved_count = 0
-            for file_pair in self.processed_files:
-                filename = file_pair['small']['filename']
-                
-                # Save small version
-                small_path = os.path.join(small_dir, filename)
-                with open(small_path, 'wb') as f:
-                    f.write(file_pair['small']['data'])
-                
-                # Save large version
-                large_path = os.path.join(large_dir, filename)
-                with open(large_path, 'wb') as f:
-                    f.write(file_pair['large']['data'])
-                
-                saved_count += 1
-            
+        # Skriv i baggrunden - vinduet kan bruges imens, og filerne dukker op færdige
+        self.start_background_save(processed_file_jobs(self.processed_files, output_dir), output_dir)
+    
+    def start_background_save(self, jobs: List, output_dir: str):
+        """Start BackgroundWriter og vis fremdrift i statuslinjen"""
+        self.save_individual_btn.config(state=tk.DISABLED, text="⏳ Gemmer...")
+        self.progress_var.set(0)
+        self.status_label.config(text=f"Gemmer 0/{len(jobs)} filer...")
+        
+        self.file_writer = BackgroundWriter(
+            jobs,
+            progress_callback=lambda done, total: self.window.after(
+                0, lambda: self.save_progress(done, total)),
+            done_callback=lambda results: self.window.after(
+                0, lambda: self.save_complete(output_dir, results)),
+            manifest=ManifestBuilder('save', output_dir, self.manifest_parameters())
+        )
+        self.file_writer.start()
+    
+    def manifest_parameters(self) -> Dict:
+        """Værktøjsindstillinger der skrives i fixity-manifestet"""
+        return {'tool': 'group_processor', 'aab_prefix': self.use_aab_var.get()}
+    
+    def save_progress(self, done: int, total: int):
+        """Opdater fremdrift under gemning"""
+        self.progress_var.set((done / total) * 100 if total else 100)
+        self.status_label.config(text=f"Gemmer {done}/{total} filer...")
+    
+    def save_complete(self, output_dir: str, results: Dict):
+        """Called when the background writer is done"""
+        self.file_writer = None
+        self.save_individual_btn.config(state=tk.NORMAL, text="💾 Gem Individuelt")
+        
+        saved_count = len(results['saved'])
+        self.status_label.config(text=f"{saved_count} filer gemt")
+        
+        if results['errors']:
+            error_msg = "\n".join(results['errors'][:3])
+            if len(results['errors']) > 3:
+                error_msg += f"\n... og {len(results['errors']) - 3} flere fejl"
+            messagebox.showerror("Gem Fejl",
+                               f"{saved_count} filer gemt i:\n{output_dir}\n\n"
+                               f"{len(results['errors'])} fejl:\n{error_msg}")
+        else:
             messagebox.showinfo("Gem Fuldført", 
-                              f"{saved_count * 2} filer gemt succesfuldt i:\n{output_dir}")
-            
-        except Exception as e:
-            messagebox.showerror("Gem Fejl", f"Fejl ved gemning af billeder: {str(e)}")
+                              f"{saved_count} filer gemt succesfuldt i:\n{output_dir}")
     
     def organize_to_museum(self):
         """Organiser processede billeder til museum mappestruktur (kun store versioner)"""
@@ -974,15 +1107,17 @@ class GroupImageProcessor:
             large_files = []
             invalid_files = []
             
+            validations = self.museum_organizer.validate_filenames(
+                [file_pair['large']['filename'] for file_pair in self.processed_files])
             for file_pair in self.processed_files:
                 filename = file_pair['large']['filename']
-                valid, message = self.museum_organizer.validate_filename(filename)
+                valid, message = validations[filename]
                 
                 if valid:
-                    large_files.append({
-                        'filename': filename,
-                        'data': file_pair['large']['data']
-                    })
+                    file_info = file_pair['large']['payload'].file_info(filename)
+                    file_info['original_path'] = file_pair['original_path']
+                    file_info['rendition'] = file_pair['large']['rendition']
+                    large_files.append(file_info)
                 else:
                     invalid_files.append(f"{filename}: {message}")
             
@@ -1001,47 +1136,9 @@ class GroupImageProcessor:
                                    "Ingen filer har gyldige sagnumre til organisering.")
                 return
             
-            # Bekræft organisering
-            response = messagebox.askyesno(
-                "Bekræft Museum Organisering",
-                f"Organisér {len(large_files)} store billeder til museum mappestruktur?\n\n"
-                f"Kun de store/ukomprimerete versioner organiseres.\n"
-                f"Filerne vil blive kopieret til:\n"
-                f"{self.museum_organizer.base_path}\n\n"
-                f"Eksisterende mapper med beskrivelser vil blive fundet automatisk."
-            )
-            
-            if not response:
-                return
-            
-            # Organisér filerne - nu med smart scanning
-            results = self.museum_organizer.organize_files(large_files, ask_before_create=True)
-            
-            # Vis resultater
-            success_count = len(results['success'])
-            error_count = len(results['errors'])
-            
-            result_msg = f"Museum Organisering Fuldført!\n\n"
-            result_msg += f"✅ Store billeder organiseret: {success_count}\n"
-            
-            if error_count > 0:
-                result_msg += f"❌ Fejl: {error_count} filer\n"
-            
-            if results['created_folders']:
-                result_msg += f"\n📁 {len(results['created_folders'])} mapper oprettet\n"
-            
-            # Vis detaljer hvis fejl
-            if results['errors']:
-                result_msg += f"\nFejl detaljer:\n"
-                for error in results['errors'][:3]:
-                    result_msg += f"• {error}\n"
-                if len(results['errors']) > 3:
-                    result_msg += f"... og {len(results['errors']) - 3} flere fejl"
-            
-            if success_count > 0:
-                messagebox.showinfo("Museum Organisering", result_msg)
-            else:
-                messagebox.showerror("Museum Organisering Fejl", result_msg)
+            # Forhåndsvis hvor filerne havner (dry-run i baggrunden - intet skrives) og læg dem i kø
+            # Spill-filer ændres aldrig - de hardlinkes ind i journalen i stedet for at blive kopieret
+            organize_with_preview(self.window, self.museum_organizer, large_files, TRANSFER_HARDLINK)
             
         except Exception as e:
             messagebox.showerror("Organisering Fejl", 
@@ -10,16 +10,24 @@ from pathlib import Path
 import io
 import gc
 import json
-import zipfile
 from PIL import Image, ImageTk
 import threading
 from typing import List, Dict, Optional
 from .museum_organizer import MuseumOrganizer
+from .fast_copy import TRANSFER_HARDLINK
+from .organize_preview import organize_with_preview
+from .result_store import ResultStore
+from .file_writer import BackgroundWriter, processed_file_jobs
+from .manifest import ManifestBuilder
+from .zip_export import IncrementalZipWriter, ManifestWriteError, processed_file_entries, write_zip
 
 
 class IndividualImageProcessor:
     """Individual image naming and processing tool"""
     
+    # Forsinkelse før validerings-feedback vises efter sidste tastetryk
+    VALIDATION_DELAY_MS = 250
+    
     def __init__(self, parent=None):
         self.parent = parent
         self.window = None
@@ -28,6 +36,20 @@ class IndividualImageProcessor:
         self.processed_files = []
         self.processing = False
         self.museum_organizer = MuseumOrganizer()
+        self.zip_writer = None  # IncrementalZipWriter når ZIP bygges under behandling
+        self.result_store = None  # ResultStore for den seneste kørsel
+        self.file_writer = None  # BackgroundWriter mens der gemmes
+        self.export_store = None  # ResultStore som ZIP eksporten læser fra mens den kører
+        self.export_lock = threading.Lock()
+        
+        # Live validerings-tilstand (opdateres pr. redigering, ikke pr. scanning)
+        self.current_names = []      # Nuværende (strippede) navn for hvert billede
+        self.name_index = {}         # navn (lowercase) -> set af billed-indekser
+        self.duplicate_count = 0     # Antal navne der deler navn med et tidligere billede
+        self.empty_indices = set()
+        self.invalid_names = {}      # indeks -> besked fra MuseumOrganizer
+        self.dirty_indices = set()   # Felter der mangler visuel feedback
+        self.validation_job = None
         
     def show(self):
         """Show the individual image processor window"""
@@ -37,12 +59,35 @@ class IndividualImageProcessor:
             self.window.lift()
             self.window.focus_force()
     
+    def on_close(self):
+        """Luk vinduet, afbryd løbende ZIP/gemning og slet midlertidige resultatfiler"""
+        writer, self.zip_writer = self.zip_writer, None
+        if writer is not None:
+            writer.abort()
+        if self.file_writer is not None:
+            # Lad igangværende filer blive færdige før spill-filerne slettes
+            self.file_writer.cancel()
+            self.file_writer.wait(timeout=5)
+            self.file_writer = None
+        self.close_result_store()
+        self.processed_files.clear()
+        self.window.destroy()
+    
+    def close_result_store(self):
+        """Slet spill-filerne - læser ZIP eksporten stadig fra lageret, lukker eksporten det selv"""
+        with self.export_lock:
+            store, self.result_store = self.result_store, None
+            if store is None or store is self.export_store:
+                return
+        store.close()
+    
     def create_window(self):
         """Create the main window"""
         self.window = tk.Toplevel(self.parent) if self.parent else tk.Tk()
         self.window.title("Individuel Billedbehandler - DGB Assistent")
         self.window.geometry("1000x700")
         self.window.configure(bg='#f8fafc')
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Colors matching DGB Assistent theme
         self.colors = {
@@ -197,6 +242,9 @@ class IndividualImageProcessor:
                                    variable=self.use_aab_var)
         aab_check.pack(anchor=tk.W, pady=(0, 10))
         
+        # Præfikset ændrer filnavnet - og dermed museum-valideringen - for alle navne
+        self.use_aab_var.trace_add('write', lambda *args: self.on_prefix_change())
+        
         # Auto-organize option
         self.auto_organize_var = tk.BooleanVar(value=False)
         organize_check = ttk.Checkbutton(settings_frame,
@@ -204,6 +252,13 @@ class IndividualImageProcessor:
                                         variable=self.auto_organize_var)
         organize_check.pack(anchor=tk.W)
         
+        # Løbende ZIP option
+        self.stream_zip_var = tk.BooleanVar(value=False)
+        stream_zip_check = ttk.Checkbutton(settings_frame,
+                                          text="Byg ZIP løbende under behandlingen (vælg fil ved start)",
+                                          variable=self.stream_zip_var)
+        stream_zip_check.pack(anchor=tk.W, pady=(10, 0))
+        
         # Processing area
         process_frame = ttk.LabelFrame(self.process_tab, text="Start Behandling", padding=15)
         process_frame.pack(fill=tk.BOTH, expand=True)
@@ -317,6 +372,11 @@ class IndividualImageProcessor:
             parent=self.window
         )
         
+        if files:
+            self.load_files(files)
+    
+    def load_files(self, files):
+        """Indlæs valgte filer (fra fil-dialogen eller overdraget fra en anden instans)"""
         if files:
             self.selected_files = list(files)
             count = len(files)
@@ -337,6 +397,7 @@ class IndividualImageProcessor:
         
         self.image_names.clear()
         self.name_entries = []  # Keep track of entry widgets
+        self.reset_validation_state()
         
         # Create naming row for each image
         for i, file_path in enumerate(self.selected_files):
@@ -395,6 +456,10 @@ class IndividualImageProcessor:
         self.image_names.append(name_var)
         self.name_entries.append(name_entry)
         
+        # Nyt felt starter tomt
+        self.current_names.append("")
+        self.empty_indices.add(index)
+        
         # Add validation on change
         name_var.trace_add('write', lambda *args, idx=index: self.on_name_change(idx))
         
@@ -402,60 +467,181 @@ class IndividualImageProcessor:
         for widget in [row_frame, img_label, info_frame, filename_label, name_frame, name_label, name_entry]:
             widget.bind("<MouseWheel>", self.on_mousewheel)
     
+    def reset_validation_state(self):
+        """Nulstil live validerings-tilstand (ved nyt filvalg)"""
+        if self.validation_job is not None and self.window:
+            self.window.after_cancel(self.validation_job)
+        self.validation_job = None
+        self.current_names = []
+        self.name_index = {}
+        self.duplicate_count = 0
+        self.empty_indices = set()
+        self.invalid_names = {}
+        self.dirty_indices = set()
+    
+    def build_filename(self, name: str) -> str:
+        """Byg det endelige filnavn for et navn (samme regel som ved behandling)"""
+        if self.use_aab_var.get():
+            return f"AAB {name}.jpg"
+        return f"{name}.jpg"
+    
     def on_name_change(self, index: int):
-        """Called when a name entry changes"""
-        # Clear previous validation
-        self.validation_label.config(text="", foreground='black')
-        self.start_btn.config(state=tk.DISABLED)
+        """Called when a name entry changes - opdaterer kun det ændrede felt"""
+        new_name = self.image_names[index].get().strip()
+        old_name = self.current_names[index]
+        
+        if new_name != old_name:
+            self.current_names[index] = new_name
+            
+            # Fjern gammelt navn fra multisættet
+            if old_name:
+                key = old_name.lower()
+                indices = self.name_index[key]
+                if len(indices) > 1:
+                    self.duplicate_count -= 1
+                indices.discard(index)
+                # Resten af den gamle gruppe kan være blevet unik - farv den igen
+                self.dirty_indices.update(indices)
+                if not indices:
+                    del self.name_index[key]
+            
+            # Tilføj nyt navn til multisættet
+            if new_name:
+                indices = self.name_index.setdefault(new_name.lower(), set())
+                if indices:
+                    self.duplicate_count += 1
+                indices.add(index)
+                self.empty_indices.discard(index)
+            else:
+                self.empty_indices.add(index)
+            
+            self.check_museum_name(index)
+        
+        self.dirty_indices.add(index)
+        self.schedule_validation_feedback()
     
-    def validate_names(self):
-        """Validate all image names"""
+    def on_prefix_change(self):
+        """AAB præfiks ændret - genvalidér filnavne mod museum reglerne"""
+        for index in range(len(self.current_names)):
+            self.check_museum_name(index)
+            self.dirty_indices.add(index)
+        self.schedule_validation_feedback()
+    
+    def check_museum_name(self, index: int):
+        """Validér et enkelt navn mod MuseumOrganizer filnavn-reglerne"""
+        name = self.current_names[index]
+        if not name:
+            self.invalid_names.pop(index, None)
+            return
+        
+        valid, message = self.museum_organizer.validate_filename(self.build_filename(name))
+        if valid:
+            self.invalid_names.pop(index, None)
+        else:
+            self.invalid_names[index] = message
+    
+    def schedule_validation_feedback(self):
+        """Debounce visuel feedback så den kun opdateres når brugeren holder pause"""
+        if not self.window:
+            return
+        if self.validation_job is not None:
+            self.window.after_cancel(self.validation_job)
+        self.validation_job = self.window.after(self.VALIDATION_DELAY_MS,
+                                                self.apply_validation_feedback)
+    
+    def apply_validation_feedback(self):
+        """Opdater feltfarver for ændrede felter og vis samlet status"""
+        self.validation_job = None
+        
+        # Kun felter der er ændret siden sidst - og dem der deler navn med dem
+        affected = set(self.dirty_indices)
+        for index in self.dirty_indices:
+            name = self.current_names[index]
+            if name:
+                affected.update(self.name_index.get(name.lower(), ()))
+        self.dirty_indices.clear()
+        
+        for index in affected:
+            self.update_entry_feedback(index)
+        
+        self.show_validation_summary()
+    
+    def update_entry_feedback(self, index: int):
+        """Farv et navnefelt efter dets validerings-status"""
+        name = self.current_names[index]
+        entry = self.name_entries[index]
+        
+        if not name:
+            entry.config(bg='white')
+            return
+        
+        if index in self.invalid_names:
+            entry.config(bg='#fef3c7')  # Kan ikke organiseres til museum
+        elif len(self.name_index.get(name.lower(), ())) > 1:
+            entry.config(bg='#ffedd5')  # Duplikat - får automatisk suffiks
+        else:
+            entry.config(bg='#ecfdf5')
+    
+    def show_validation_summary(self) -> bool:
+        """Vis samlet validerings-status ud fra den vedligeholdte tilstand"""
         if not self.image_names:
             self.validation_label.config(text="Ingen billeder at validere", foreground='red')
+            self.start_btn.config(state=tk.DISABLED)
             return False
         
-        names = [name_var.get().strip() for name_var in self.image_names]
-        
         # Check for empty names
-        empty_indices = [i for i, name in enumerate(names) if not name]
-        if empty_indices:
+        if self.empty_indices:
+            empty_numbers = sorted(i + 1 for i in self.empty_indices)
+            shown = ', '.join(map(str, empty_numbers[:10]))
+            if len(empty_numbers) > 10:
+                shown += f" ... (+{len(empty_numbers) - 10})"
             self.validation_label.config(
-                text=f"Tomme navne fundet på billede(r): {', '.join(map(str, [i+1 for i in empty_indices]))}",
+                text=f"Tomme navne fundet på billede(r): {shown}",
                 foreground='red'
             )
+            self.start_btn.config(state=tk.DISABLED)
             return False
         
-        # Check for duplicate names (men tillad dem nu - systemet håndterer automatisk)
-        duplicates = []
-        seen_names = {}
-        for i, name in enumerate(names):
-            if name.lower() in seen_names:
-                duplicates.append(f"{name} (billede {i+1} og {seen_names[name.lower()]+1})")
-            else:
-                seen_names[name.lower()] = i
-        
-        if duplicates:
+        messages = []
+        if self.duplicate_count:
             # Info besked i stedet for fejl - systemet håndterer automatisk
-            duplicate_count = len(duplicates)
-            self.validation_label.config(
-                text=f"ℹ️ {duplicate_count} duplikerede navne vil få automatisk suffiks (a, b, c)",
-                foreground='orange'
-            )
+            messages.append(f"ℹ️ {self.duplicate_count} duplikerede navne vil få automatisk suffiks (a, b, c)")
+        if self.invalid_names:
+            messages.append(f"⚠️ {len(self.invalid_names)} navne kan ikke organiseres til museum")
+        
+        if messages:
+            self.validation_label.config(text="\n".join(messages), foreground='orange')
         else:
             # Ingen duplikater fundet
             self.validation_label.config(text="✅ Alle navne er unikke!", foreground='green')
         
         # All validation passed - duplikater er nu tilladt
-        self.start_btn.config(state=tk.NORMAL)
+        if not self.processing:
+            self.start_btn.config(state=tk.NORMAL)
         return True
     
+    def validate_names(self):
+        """Validate all image names"""
+        # Anvend ventende feedback med det samme i stedet for at vente på debounce
+        if self.validation_job is not None:
+            self.window.after_cancel(self.validation_job)
+            self.apply_validation_feedback()
+        
+        return self.show_validation_summary()
+    
     def on_mousewheel(self, event):
         """Handle mouse wheel scrolling"""
         self.naming_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
     
     def start_processing(self):
         """Start processing images individually"""
-        if self.processing or not self.validate_names():
+        if self.processing or self.file_writer is not None or not self.validate_names():
+            return
+        
+        # Løbende ZIP: arkivet vælges før behandlingen starter
+        self.zip_writer = None
+        expected_filenames = [self.build_filename(name_var.get().strip()) for name_var in self.image_names]
+        if self.stream_zip_var.get() and not self.open_stream_zip(expected_filenames):
             return
             
         self.processing = True
@@ -465,10 +651,53 @@ class IndividualImageProcessor:
         self.progress_var.set(0)
         self.processed_files.clear()
         
+        # Nyt resultatlager - spill-filer fra forrige kørsel slettes
+        self.close_result_store()
+        self.result_store = ResultStore()
+        
         # Start processing in background thread
         thread = threading.Thread(target=self.process_individual_images, daemon=True)
         thread.start()
     
+    def open_stream_zip(self, expected_filenames: List[str]) -> bool:
+        """Vælg ZIP-destination før behandlingen og start skrivetråden"""
+        zip_path = filedialog.asksaveasfilename(
+            title="Vælg ZIP fil (bygges under behandlingen)",
+            defaultextension=".zip",
+            filetypes=[("ZIP filer", "*.zip"), ("Alle filer", "*.*")],
+            parent=self.window
+        )
+        
+        if not zip_path:
+            return False
+        
+        try:
+            self.zip_writer = IncrementalZipWriter(
+                zip_path, expected_filenames,
+                manifest=ManifestBuilder('zip', zip_path, self.manifest_parameters()))
+        except Exception as e:
+            messagebox.showerror("ZIP Fejl", f"Kunne ikke oprette ZIP: {str(e)}", parent=self.window)
+            return False
+        return True
+    
+    def finish_stream_zip(self, completed: bool = True):
+        """Færdiggør (eller afbryd) den løbende ZIP - kaldes fra behandlingstråden"""
+        writer, self.zip_writer = self.zip_writer, None
+        if writer is None:
+            return
+        
+        if not completed:
+            writer.abort()
+            return
+        
+        try:
+            writer.close()
+            self.window.after(0, lambda: self.zip_export_complete(writer.zip_path, None))
+        except ManifestWriteError as e:
+            self.window.after(0, lambda warning=str(e): self.zip_export_complete(writer.zip_path, None, warning))
+        except Exception as e:
+            self.window.after(0, lambda error=str(e): self.zip_export_complete(writer.zip_path, error))
+    
     def process_individual_images(self):
         """Process images individually (runs in background thread)"""
         try:
@@ -489,6 +718,8 @@ class IndividualImageProcessor:
                                                          small_max_size_kb, use_aab_prefix)
                     if result:
                         self.processed_files.append(result)
+                        if self.zip_writer:
+                            self.zip_writer.add_processed_file(result)
                 except Exception as e:
                     print(f"Fejl ved behandling af {file_path}: {e}")
                 
@@ -502,8 +733,10 @@ class IndividualImageProcessor:
             
             # Processing complete
             self.window.after(0, lambda: self.processing_complete(len(self.processed_files), total_images))
+            self.finish_stream_zip()
             
         except Exception as e:
+            self.finish_stream_zip(completed=False)
             self.window.after(0, lambda: self.processing_error(str(e)))
     
     def process_individual_image(self, file_path: str, name: str, 
@@ -529,11 +762,13 @@ class IndividualImageProcessor:
             return {
                 'small': {
                     'filename': filename,
-                    'data': small_image
+                    'payload': self.result_store.put(small_image),
+                    'rendition': {'name': 'small', 'format': 'JPEG', 'max_size_kb': small_max_size_kb}
                 },
                 'large': {
                     'filename': filename,
-                    'data': large_image
+                    'payload': self.result_store.put(large_image),
+                    'rendition': {'name': 'large', 'format': 'JPEG', 'quality': 100}
                 },
                 'original_path': file_path,
                 'name': name
@@ -666,7 +901,7 @@ class IndividualImageProcessor:
     
     def download_zip(self):
         """Create and download ZIP file with all processed images"""
-        if not self.processed_files:
+        if not self.processed_files or self.export_store is not None:
             return
         
         # Bring window to front before showing dialog
@@ -687,44 +922,48 @@ class IndividualImageProcessor:
         if not zip_path:
             return
         
-        try:
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # First pass: count duplicates for each filename
-                filename_counts = {}
-                for file_pair in self.processed_files:
-                    base_filename = file_pair['small']['filename']
-                    filename_counts[base_filename] = filename_counts.get(base_filename, 0) + 1
-                
-                # Second pass: assign unique names with suffixes for duplicates
-                filename_counters = {}
-                for file_pair in self.processed_files:
-                    base_filename = file_pair['small']['filename']
-                    name, ext = os.path.splitext(base_filename)
-                    
-                    # If there are multiple files with this name, add suffix
-                    if filename_counts[base_filename] > 1:
-                        if base_filename not in filename_counters:
-                            filename_counters[base_filename] = 0
-                        
-                        suffix = chr(ord('a') + filename_counters[base_filename])
-                        small_filename = f"{name} {suffix}{ext}"
-                        large_filename = f"{name} {suffix}{ext}"
-                        filename_counters[base_filename] += 1
-                    else:
-                        # Single file, no suffix needed
-                        small_filename = base_filename
-                        large_filename = base_filename
-                    
-                    # Add small version
-                    zip_file.writestr(f"small/{small_filename}", file_pair['small']['data'])
-                    
-                    # Add large version
-                    zip_file.writestr(f"large/{large_filename}", file_pair['large']['data'])
+        # Skriv arkivet i baggrunden - JPEG'er gemmes ukomprimeret og streames i blokke
+        entries = processed_file_entries(self.processed_files)
+        manifest = ManifestBuilder('zip', zip_path, self.manifest_parameters())
+        self.download_zip_btn.config(state=tk.DISABLED, text="⏳ Opretter ZIP...")
+        
+        # Lageret holdes i live til eksporten er færdig (se close_result_store)
+        self.export_store = self.result_store
+        
+        def export_zip():
+            error, warning = None, None
+            try:
+                write_zip(zip_path, entries, manifest=manifest)
+            except ManifestWriteError as e:
+                warning = str(e)
+            except Exception as e:
+                error = str(e)
             
+            with self.export_lock:
+                store, self.export_store = self.export_store, None
+                orphaned = store is not self.result_store  # Ny kørsel startet eller vinduet lukket
+            if orphaned:
+                store.close()
+            try:
+                self.window.after(0, lambda: self.zip_export_complete(zip_path, error, warning))
+            except (RuntimeError, tk.TclError):
+                pass  # Vinduet er lukket
+        
+        threading.Thread(target=export_zip, daemon=True).start()
+    
+    def zip_export_complete(self, zip_path: str, error: Optional[str], warning: Optional[str] = None):
+        """Called when the ZIP export thread is done (warning: arkivet er gemt, men uden manifest)"""
+        if not self.window.winfo_exists():
+            return
+        ready = self.processed_files and not self.processing
+        self.download_zip_btn.config(state=tk.NORMAL if ready else tk.DISABLED, text="📦 Download ZIP")
+        
+        if error:
+            messagebox.showerror("ZIP Fejl", f"Fejl ved oprettelse af ZIP: {error}")
+        elif warning:
+            messagebox.showwarning("ZIP Oprettet", f"ZIP fil gemt som:\n{zip_path}\n\n⚠️ {warning}")
+        else:
             messagebox.showinfo("ZIP Oprettet", f"ZIP fil gemt som:\n{zip_path}")
-            
-        except Exception as e:
-            messagebox.showerror("ZIP Fejl", f"Fejl ved oprettelse af ZIP: {str(e)}")
     
     def save_individual(self):
         """Save processed images to selected directory"""
@@ -743,34 +982,52 @@ class IndividualImageProcessor:
         if not output_dir:
             return
         
-        try:
-            # Create subdirectories
-            small_dir = os.path.join(output_dir, "small")
-            large_dir = os.path.join(output_dir, "large")
-            os.makedirs(small_dir, exist_ok=True)
-            os.makedirs(large_dir, exist_ok=True)
-            
-            saved_count = 0
-            for file_pair in self.processed_files:
-                filename = file_pair['small']['filename']
-                
-                # Save small version
-                small_path = os.path.join(small_dir, filename)
-                with open(small_path, 'wb') as f:
-                    f.write(file_pair['small']['data'])
-                
-                # Save large version
-                large_path = os.path.join(large_dir, filename)
-                with open(large_path, 'wb') as f:
-                    f.write(file_pair['large']['data'])
-                
-                saved_count += 1
-            
+        # Skriv i baggrunden - vinduet kan bruges imens, og filerne dukker op færdige
+        self.start_background_save(processed_file_jobs(self.processed_files, output_dir), output_dir)
+    
+    def start_background_save(self, jobs: List, output_dir: str):
+        """Start BackgroundWriter og vis fremdrift i statuslinjen"""
+        self.save_individual_btn.config(state=tk.DISABLED, text="⏳ Gemmer...")
+        self.progress_var.set(0)
+        self.status_label.config(text=f"Gemmer 0/{len(jobs)} filer...")
+        
+        self.file_writer = BackgroundWriter(
+            jobs,
+            progress_callback=lambda done, total: self.window.after(
+                0, lambda: self.save_progress(done, total)),
+            done_callback=lambda results: self.window.after(
+                0, lambda: self.save_complete(output_dir, results)),
+            manifest=ManifestBuilder('save', output_dir, self.manifest_parameters())
+        )
+        self.file_writer.start()
+    
+    def manifest_parameters(self) -> Dict:
+        """Værktøjsindstillinger der skrives i fixity-manifestet"""
+        return {'tool': 'individual_processor', 'aab_prefix': self.use_aab_var.get()}
+    
+    def save_progress(self, done: int, total: int):
+        """Opdater fremdrift under gemning"""
+        self.progress_var.set((done / total) * 100 if total else 100)
+        self.status_label.config(text=f"Gemmer {done}/{total} filer...")
+    
+    def save_complete(self, output_dir: str, results: Dict):
+        """Called when the background writer is done"""
+        self.file_writer = None
+        self.save_individual_btn.config(state=tk.NORMAL, text="💾 Gem Individuelt")
+        
+        saved_count = len(results['saved'])
+        self.status_label.config(text=f"{saved_count} filer gemt")
+        
+        if results['errors']:
+            error_msg = "\n".join(results['errors'][:3])
+            if len(results['errors']) > 3:
+                error_msg += f"\n... og {len(results['errors']) - 3} flere fejl"
+            messagebox.showerror("Gem Fejl",
+                               f"{saved_count} filer gemt i:\n{output_dir}\n\n"
+                               f"{len(results['errors'])} fejl:\n{error_msg}")
+        else:
             messagebox.showinfo("Gem Fuldført", 
-                              f"{saved_count * 2} filer gemt succesfuldt i:\n{output_dir}")
-            
-        except Exception as e:
-            messagebox.showerror("Gem Fejl", f"Fejl ved gemning af billeder: {str(e)}")
+                              f"{saved_count} filer gemt succesfuldt i:\n{output_dir}")
     
     def organize_to_museum(self):
         """Organiser processede billeder til museum mappestruktur (kun store versioner)"""
@@ -782,15 +1039,17 @@ class IndividualImageProcessor:
             large_files = []
             invalid_files = []
             
+            validations = self.museum_organizer.validate_filenames(
+                [file_pair['large']['filename'] for file_pair in self.processed_files])
             for file_pair in self.processed_files:
                 filename = file_pair['large']['filename']
-                valid, message = self.museum_organizer.validate_filename(filename)
+                valid, message = validations[filename]
                 
                 if valid:
-                    large_files.append({
-                        'filename': filename,
-                        'data': file_pair['large']['data']
-                    })
+                    file_info = file_pair['large']['payload'].file_info(filename)
+                    file_info['original_path'] = file_pair['original_path']
+                    file_info['rendition'] = file_pair['large']['rendition']
+                    large_files.append(file_info)
                 else:
                     invalid_files.append(f"{filename}: {message}")
             
@@ -809,47 +1068,9 @@ class IndividualImageProcessor:
                                    "Ingen filer har gyldige sagnumre til organisering.")
                 return
             
-            # Bekræft organisering
-            response = messagebox.askyesno(
-                "Bekræft Museum Organisering",
-                f"Organisér {len(large_files)} store billeder til museum mappestruktur?\n\n"
-                f"Kun de store/ukomprimerete versioner organiseres.\n"
-                f"Filerne vil blive kopieret til:\n"
-                f"{self.museum_organizer.base_path}\n\n"
-                f"Eksisterende mapper med beskrivelser vil blive fundet automatisk."
-            )
-            
-            if not response:
-                return
-            
-            # Organisér filerne - nu med smart scanning
-            results = self.museum_organizer.organize_files(large_files, ask_before_create=True)
-            
-            # Vis resultater
-            success_count = len(results['success'])
-            error_count = len(results['errors'])
-            
-            result_msg = f"Museum Organisering Fuldført!\n\n"
-            result_msg += f"✅ Store billeder organiseret: {success_count}\n"
-            
-            if error_count > 0:
-                result_msg += f"❌ Fejl: {error_count} filer\n"
-            
-            if results['created_folders']:
-                result_msg += f"\n📁 {len(results['created_folders'])} mapper oprettet\n"
-            
-            # Vis detaljer hvis fejl
-            if results['errors']:
-                result_msg += f"\nFejl detaljer:\n"
-                for error in results['errors'][:3]:
-                    result_msg += f"• {error}\n"
-                if len(results['errors']) > 3:
-                    result_msg += f"... og {len(results['errors']) - 3} flere fejl"
-            
-            if success_count > 0:
-                messagebox.showinfo("Museum Organisering", result_msg)
-            else:
-                messagebox.showerror("Museum Organisering Fejl", result_msg)
+            # Forhåndsvis hvor filerne havner (dry-run i baggrunden - intet skrives) og læg dem i kø
+            # Spill-filer ændres aldrig - de hardlinkes ind i journalen i stedet for at blive kopieret
+            organize_with_preview(self.window, self.museum_organizer, large_files, TRANSFER_HARDLINK)
             
         except Exception as e:
             messagebox.showerror("Organisering Fejl", 
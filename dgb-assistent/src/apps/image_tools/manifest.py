@@ -0,0 +1,271 @@
+"""
+Manifest - DGB Assistent
+Fixity-manifester for alt hvad værktøjerne skriver (gem, ZIP og museum organisering).
+Hashes beregnes mens bytes streames til disken (HashingWriter) - ingen ekstra læsning.
+
+Verificér en mappe mod dens manifest:
+    python -m apps.image_tools.manifest verify manifest.json [--workers 8]
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# Understøttede algoritmer (navnene skrives i manifestet)
+BLAKE2B_256 = "blake2b-256"
+SHA256 = "sha256"
+SUPPORTED_ALGORITHMS = (BLAKE2B_256, SHA256)
+
+# Standard: BLAKE2b-256 (samme hash som deduplikeringen, så den kan genbruges)
+DEFAULT_ALGORITHMS = tuple(
+    name.strip() for name in os.environ.get("DGB_MANIFEST_ALGORITHMS", BLAKE2B_256).split(",")
+    if name.strip() in SUPPORTED_ALGORITHMS
+) or (BLAKE2B_256,)
+
+MANIFEST_FORMAT = "dgb-manifest"
+MANIFEST_VERSION = 1
+
+# Mappe i museum base_path hvor organiserings-manifester gemmes
+MUSEUM_MANIFEST_DIR = "_manifester"
+
+VERIFY_BUFFER_SIZE = 1024 * 1024
+DEFAULT_VERIFY_WORKERS = 8
+
+
+def new_hash(algorithm: str):
+    """Opret hasher for en manifest-algoritme"""
+    if algorithm == BLAKE2B_256:
+        return hashlib.blake2b(digest_size=32)
+    if algorithm == SHA256:
+        return hashlib.sha256()
+    raise ValueError(f"Ukendt hash-algoritme: {algorithm}")
+
+
+def hash_stream(stream, algorithms: Iterable[str] = DEFAULT_ALGORITHMS) -> Dict:
+    """Hash en åben binær strøm i blokke. Returns: {'size', 'hashes'}"""
+    hashers = {algorithm: new_hash(algorithm) for algorithm in algorithms}
+    size = 0
+    while True:
+        block = stream.read(VERIFY_BUFFER_SIZE)
+        if not block:
+            break
+        size += len(block)
+        for hasher in hashers.values():
+            hasher.update(block)
+    return {'size': size, 'hashes': {name: hasher.hexdigest() for name, hasher in hashers.items()}}
+
+
+class HashingWriter:
+    """Fil-lignende wrapper der hasher og tæller bytes på vej til den underliggende fil"""
+
+    def __init__(self, raw, algorithms: Iterable[str] = DEFAULT_ALGORITHMS):
+        self.raw = raw
+        self.hashers = {algorithm: new_hash(algorithm) for algorithm in algorithms}
+        self.size = 0
+
+    def write(self, data) -> int:
+        written = self.raw.write(data)
+        for hasher in self.hashers.values():
+            hasher.update(data)
+        self.size += len(data)
+        return written
+
+    def flush(self):
+        self.raw.flush()
+
+    def fileno(self) -> int:
+        return self.raw.fileno()
+
+    def digests(self) -> Dict[str, str]:
+        """Hex-digests for alle algoritmer"""
+        return {name: hasher.hexdigest() for name, hasher in self.hashers.items()}
+
+
+class ManifestBuilder:
+    """Opsamler filer til et manifest (trådsikker - bruges fra skrivetrådene)"""
+
+    def __init__(self, kind: str, root: str, parameters: Optional[Dict] = None,
+                 algorithms: Iterable[str] = DEFAULT_ALGORITHMS):
+        self.kind = kind              # 'save', 'zip' eller 'organize'
+        self.root = os.path.abspath(root)
+        self.parameters = parameters or {}
+        self.algorithms = tuple(algorithms)
+        self.created = datetime.now()
+        self.files = []
+        self.lock = threading.Lock()
+
+    def add(self, path: str, size: int, hashes: Dict[str, str],
+            source: Optional[str] = None, rendition: Optional[Dict] = None):
+        """
+        Tilføj en skrevet fil - path er absolut eller relativ til root (ZIP: arkivnavn)
+        rendition: {'name': 'small'/'large'/..., plus de parametre renditionen er lavet med}
+        """
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        entry = {
+            'path': path.replace(os.sep, "/"),
+            'size': size,
+            'hashes': hashes,
+            'source': source,
+            'rendition': rendition
+        }
+        with self.lock:
+            self.files.append(entry)
+
+    def build(self) -> Dict:
+        """Manifest som dict"""
+        try:
+            from config import APP_VERSION
+        except ImportError:
+            APP_VERSION = "ukendt"
+
+        with self.lock:
+            files = sorted(self.files, key=lambda entry: entry['path'])
+
+        return {
+            'format': MANIFEST_FORMAT,
+            'version': MANIFEST_VERSION,
+            'kind': self.kind,
+            'created': self.created.isoformat(timespec='seconds'),
+            'app_version': APP_VERSION,
+            'root': self.root,
+            'algorithms': list(self.algorithms),
+            'parameters': self.parameters,
+            'file_count': len(files),
+            'total_size': sum(entry['size'] for entry in files),
+            'files': files
+        }
+
+    def default_filename(self) -> str:
+        """Fx manifest_organize_20250101_120000.json"""
+        return f"manifest_{self.kind}_{self.created.strftime('%Y%m%d_%H%M%S')}.json"
+
+    def write(self, manifest_path: str) -> str:
+        """Skriv manifestet atomisk (tmp + rename)"""
+        os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.build(), f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, manifest_path)
+        return manifest_path
+
+
+def zip_manifest_path(zip_path: str) -> str:
+    """Manifest for en ZIP gemmes ved siden af arkivet"""
+    return zip_path + ".manifest.json"
+
+
+def load_manifest(manifest_path: str) -> Dict:
+    """Indlæs og tjek et manifest"""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != MANIFEST_FORMAT:
+        raise ValueError(f"Ikke et DGB manifest: {manifest_path}")
+    return manifest
+
+
+def verify_manifest(manifest_path: str, root: Optional[str] = None,
+                    workers: int = DEFAULT_VERIFY_WORKERS, progress_callback=None) -> Dict:
+    """
+    Gen-hash alle filer i et manifest parallelt
+    root: overstyr manifestets rodmappe (fx hvis mappen er flyttet)
+    Returns: {'ok': [stier], 'missing': [stier], 'mismatch': [beskeder], 'errors': [beskeder]}
+    """
+    manifest = load_manifest(manifest_path)
+    algorithms = [name for name in manifest.get('algorithms', []) if name in SUPPORTED_ALGORITHMS]
+    if not algorithms:
+        raise ValueError("Manifestet har ingen understøttede hash-algoritmer")
+
+    files = manifest.get('files', [])
+    results = {'ok': [], 'missing': [], 'mismatch': [], 'errors': []}
+    lock = threading.Lock()
+    completed = [0]
+
+    if manifest.get('kind') == 'zip':
+        # Arkivet ligger ved siden af manifestet - én ZipFile pr. tråd
+        zip_path = manifest_path[:-len(".manifest.json")] if manifest_path.endswith(".manifest.json") \
+            else manifest.get('root')
+        thread_state = threading.local()
+
+        def open_entry(entry):
+            if not hasattr(thread_state, 'zip_file'):
+                thread_state.zip_file = zipfile.ZipFile(zip_path, 'r')
+            return thread_state.zip_file.open(entry['path'], 'r')
+        missing_error = KeyError
+    else:
+        base = root or manifest.get('root')
+
+        def open_entry(entry):
+            return open(os.path.join(base, *entry['path'].split("/")), 'rb')
+        missing_error = FileNotFoundError
+
+    def verify_entry(entry):
+        path = entry['path']
+        try:
+            with open_entry(entry) as stream:
+                actual = hash_stream(stream, algorithms)
+            if actual['size'] != entry['size']:
+                outcome = ('mismatch', f"{path}: størrelse {actual['size']} (forventet {entry['size']})")
+            elif any(actual['hashes'][name] != entry['hashes'].get(name) for name in algorithms
+                     if name in entry['hashes']):
+                outcome = ('mismatch', f"{path}: checksum afviger")
+            else:
+                outcome = ('ok', path)
+        except missing_error:
+            outcome = ('missing', path)
+        except Exception as e:
+            outcome = ('errors', f"{path}: {str(e)}")
+
+        with lock:
+            results[outcome[0]].append(outcome[1])
+            completed[0] += 1
+            done = completed[0]
+        if progress_callback:
+            progress_callback(done, len(files))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(verify_entry, files))
+
+    for key in results:
+        results[key].sort()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Kommandolinje: verificér et manifest"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DGB Assistent manifester")
+    subparsers = parser.add_subparsers(dest='command')
+
+    verify_parser = subparsers.add_parser('verify', help="Verificér filer mod et manifest")
+    verify_parser.add_argument('manifest', help="Manifest (JSON)")
+    verify_parser.add_argument('--root', default=None, help="Overstyr mappen filerne ligger i")
+    verify_parser.add_argument('--workers', type=int, default=DEFAULT_VERIFY_WORKERS,
+                               help="Antal samtidige læsninger")
+
+    args = parser.parse_args(argv)
+    if args.command != 'verify':
+        parser.print_help()
+        return 2
+
+    results = verify_manifest(args.manifest, args.root, args.workers)
+
+    print(f"OK: {len(results['ok'])}")
+    for title, key in [("Mangler", 'missing'), ("Afviger", 'mismatch'), ("Fejl", 'errors')]:
+        if results[key]:
+            print(f"{title}: {len(results[key])}")
+            for line in results[key]:
+                print(f"  {line}")
+
+    return 1 if results['missing'] or results['mismatch'] or results['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
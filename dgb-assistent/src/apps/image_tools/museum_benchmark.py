@@ -0,0 +1,318 @@
+"""
+Museum Benchmark - DGB Assistent
+Måler MuseumOrganizer offline: bygger et syntetisk museum-træ (hundrede/ti/sag mapper med
+alternative navne, årti/år mapper og tusindvis af filer) og kører organizer-faserne gennem
+et filsystem-shim der forsinker og tæller hvert kald under træet, som på M: drevet.
+
+Kør fra src mappen:
+    python -m apps.image_tools.museum_benchmark --cases 2000 --files 500 --latency-ms 2
+    python -m apps.image_tools.museum_benchmark --latency-ms 5 --report benchmark.json
+"""
+
+import builtins
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .content_hash import DEDUP_SKIP, FolderHashCache, HashStore
+from .file_writer import NETWORK_WORKERS
+from .museum_organizer import MuseumOrganizer
+
+CASE_DESCRIPTIONS = ["Vase", "Kirkesølv", "Udgravning ved Hjortholm", "Møntfund", "Bogbind",
+                     "Portrætsamling", "Skibsmodel", "Dragt og tekstiler"]
+
+# Andel af sag-mapperne med alternative navne ("Sag 0030, beskrivelse" og "0030x")
+DESCRIPTION_RATIO = 0.2
+SHORT_NAME_RATIO = 0.1
+
+FIRST_DECADE = 1910
+LAST_DECADE = 2020
+
+# Kald der forsinkes/tælles: (modul, attribut) -> kategori
+FS_CALLS = {
+    (os, 'scandir'): 'listdir',
+    (os, 'listdir'): 'listdir',
+    (os, 'stat'): 'stat',
+    (os, 'lstat'): 'stat',
+    (os, 'open'): 'open',
+    (builtins, 'open'): 'open',
+    (os, 'mkdir'): 'mkdir',
+    (os, 'replace'): 'rename',
+    (os, 'rename'): 'rename',
+    (os, 'remove'): 'remove',
+    (os, 'unlink'): 'remove',
+    (os, 'link'): 'link',
+}
+
+
+class SlowFilesystem:
+    """
+    Context manager der forsinker og tæller filsystem-kald på stier under root
+    os.path.exists/isdir/getsize tælles som 'stat' (de kalder os.stat), os.makedirs som 'mkdir'
+    """
+
+    def __init__(self, root: str, latency_ms: float = 2.0, latencies: Optional[Dict[str, float]] = None):
+        self.root = os.path.normcase(os.path.abspath(root))
+        self.latency_ms = latency_ms
+        self.latencies = latencies or {}    # kategori -> ms (overstyrer latency_ms)
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.originals = {}
+
+    def inside(self, path) -> bool:
+        """Ligger stien under root (fil-deskriptorer og andre stier tælles ikke)"""
+        if isinstance(path, int):
+            return False
+        try:
+            path = os.fsdecode(os.fspath(path))
+        except TypeError:
+            return False
+        path = os.path.normcase(os.path.abspath(path))
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def wrap(self, function, category: str):
+        delay = self.latencies.get(category, self.latency_ms) / 1000.0
+
+        def slow_call(*args, **kwargs):
+            if args and (self.inside(args[0]) or (len(args) > 1 and category in ('rename', 'link')
+                                                  and self.inside(args[1]))):
+                with self.lock:
+                    self.counts[category] = self.counts.get(category, 0) + 1
+                if delay:
+                    time.sleep(delay)
+            return function(*args, **kwargs)
+
+        return slow_call
+
+    def reset(self) -> Dict[str, int]:
+        """Nulstil tællerne. Returns: tællerne indtil nu"""
+        with self.lock:
+            counts, self.counts = self.counts, {}
+        return counts
+
+    def __enter__(self):
+        for (module, name), category in FS_CALLS.items():
+            original = getattr(module, name)
+            self.originals[(module, name)] = original
+            setattr(module, name, self.wrap(original, category))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for (module, name), original in self.originals.items():
+            setattr(module, name, original)
+        self.originals.clear()
+        return False
+
+
+def case_folder_parts(case_number: int, name: str) -> List[str]:
+    """hundrede/ti/sag mappenavne som MuseumOrganizer.get_case_folder_path bygger dem"""
+    hundred_start = (case_number // 100) * 100
+    hundred_folder = "Sag 0001-0099" if hundred_start == 0 else f"Sag {hundred_start:04d}-{hundred_start + 99:04d}"
+    ten_start = (case_number // 10) * 10
+    return [hundred_folder, f"Sag {ten_start:04d}-{ten_start + 9:04d}", name]
+
+
+def generate_museum_tree(base_path: str, cases: int = 2000, files_per_case: int = 5,
+                         objects_per_year: int = 40, file_size: int = 2048, seed: int = 1) -> Dict:
+    """
+    Byg et syntetisk museum-træ under base_path
+    Returns: {'cases': [sagnumre], 'objects': {år: [genstands-numre]}, 'folders', 'files', 'seconds'}
+    """
+    started = time.monotonic()
+    rng = random.Random(seed)
+    stats = {'cases': [], 'objects': {}, 'folders': 0, 'files': 0, 'seconds': 0.0}
+
+    def write_files(folder: str, names: List[str]):
+        os.makedirs(folder, exist_ok=True)
+        stats['folders'] += 1
+        for name in names:
+            with open(os.path.join(folder, name), 'wb') as f:
+                f.write(rng.randbytes(file_size))
+        stats['files'] += len(names)
+
+    for case_number in sorted(rng.sample(range(1, 10000), min(cases, 9999))):
+        case_text = f"{case_number:04d}"
+        variant = rng.random()
+        if variant < DESCRIPTION_RATIO:
+            name = f"Sag {case_text}, {rng.choice(CASE_DESCRIPTIONS)}"
+        elif variant < DESCRIPTION_RATIO + SHORT_NAME_RATIO:
+            name = f"{case_text}x"
+        else:
+            name = f"Sag {case_text}"
+
+        count = rng.randint(1, files_per_case * 2 - 1)
+        names = [f"{case_text}x{index:04d}.jpg" for index in range(1, count + 1)]
+        names += [f"{case_text}x0001 a.jpg"] if rng.random() < 0.1 else []
+        write_files(os.path.join(base_path, *case_folder_parts(case_number, name)), names)
+        stats['cases'].append(case_text)
+
+    for decade in range(FIRST_DECADE, LAST_DECADE + 1, 10):
+        decade_path = os.path.join(base_path, f"Genstande registreret i {decade}'erne")
+        for year in range(decade, min(decade + 10, LAST_DECADE + 5)):
+            # År-mapper findes i flere formater: "1917" og "0417 Genstande registreret i 1917"
+            year_folder = str(year) if rng.random() < 0.5 else \
+                f"{year % 100 + 400:04d} Genstande registreret i {year}"
+            objects = sorted(rng.sample(range(1, 20000), objects_per_year))
+            write_files(os.path.join(decade_path, year_folder),
+                        [f"{number:05d};{year % 100:02d}.jpg" if 1910 <= year < 2010 else f"{number:05d};{year}.jpg"
+                         for number in objects])
+            stats['objects'][year] = objects
+
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    return stats
+
+
+def build_workload(tree: Dict, count: int = 500, new_case_ratio: float = 0.1, genstand_ratio: float = 0.2,
+                   file_size: int = 20 * 1024, seed: int = 2) -> List[Dict]:
+    """
+    Filer til organisering: mest eksisterende sager (nogle navne findes allerede og får suffiks),
+    nogle nye sager der kræver nye mapper og nogle genstands-numre
+    Returns: files_data som MuseumOrganizer.organize_files forventer
+    """
+    rng = random.Random(seed)
+    existing_cases = tree['cases']
+    free_cases = sorted(set(f"{number:04d}" for number in range(1, 10000)) - set(existing_cases))
+    years = sorted(tree['objects'])
+
+    files_data = []
+    for _ in range(count):
+        choice = rng.random()
+        if choice < genstand_ratio:
+            year = rng.choice(years)
+            number = rng.choice(tree['objects'][year]) if rng.random() < 0.5 else rng.randint(1, 99999)
+            filename = f"{number:05d};{year}.jpg"
+        elif choice < genstand_ratio + new_case_ratio and free_cases:
+            filename = f"{rng.choice(free_cases)}x{rng.randint(1, 20):04d}.jpg"
+        else:
+            filename = f"{rng.choice(existing_cases)}x{rng.randint(1, 20):04d}.jpg"
+        files_data.append({'filename': filename, 'data': rng.randbytes(file_size)})
+    return files_data
+
+
+def run_benchmark(tree_path: str, files: int = 500, latency_ms: float = 2.0, workers: Optional[int] = None,
+                  cases: int = 2000, files_per_case: int = 5, seed: int = 1) -> Dict:
+    """
+    Generér et træ i tree_path og mål organizer-faserne med simuleret netværkslatens
+    Hver fase kører med en ny MuseumOrganizer (kolde caches)
+    Returns: {'settings', 'tree', 'phases': {fase: {'seconds', 'calls', 'total_calls', ...}}}
+    """
+    base_path = os.path.join(tree_path, "museum")
+    tree = generate_museum_tree(base_path, cases=cases, files_per_case=files_per_case, seed=seed)
+    workload = build_workload(tree, files, seed=seed + 1)
+    workers = workers or NETWORK_WORKERS
+
+    def new_organizer() -> MuseumOrganizer:
+        organizer = MuseumOrganizer()
+        organizer.base_path = base_path
+        organizer.max_workers = workers
+        organizer.hash_cache = FolderHashCache(lambda folder: organizer.tree_index.file_stats(folder),
+                                               store=HashStore(os.path.join(tree_path, "hash_cache.json")),
+                                               fs=organizer.fs)
+        return organizer
+
+    report = {
+        'settings': {'files': files, 'latency_ms': latency_ms, 'workers': workers,
+                     'cases': cases, 'files_per_case': files_per_case, 'seed': seed},
+        'tree': {'folders': tree['folders'], 'files': tree['files'], 'seconds': tree['seconds']},
+        'phases': {}
+    }
+
+    with SlowFilesystem(base_path, latency_ms) as filesystem:
+        def measure(name: str, function) -> Dict:
+            filesystem.reset()
+            started = time.perf_counter()
+            result = function()
+            seconds = time.perf_counter() - started
+            calls = filesystem.reset()
+            report['phases'][name] = {'seconds': round(seconds, 3), 'calls': calls,
+                                      'total_calls': sum(calls.values())}
+            return result
+
+        found = measure('existing_cases', lambda: new_organizer().get_existing_cases())
+        report['phases']['existing_cases']['cases'] = len(found)
+
+        preview = measure('preview', lambda: new_organizer().preview_organize(
+            workload, DEDUP_SKIP, use_photo_index=False))
+        report['phases']['preview']['planned'] = preview['summary']['planned']
+
+        results = measure('organize', lambda: new_organizer().organize_files(
+            workload, ask_before_create=False, dedup_mode=DEDUP_SKIP))
+        phase = report['phases']['organize']
+        phase['success'] = len(results['success'])
+        phase['skipped'] = len(results['skipped'])
+        phase['errors'] = len(results['errors'])
+        phase['created_folders'] = len(results['created_folders'])
+        phase['files_per_second'] = round(files / phase['seconds'], 1) if phase['seconds'] else None
+        phase['fs_stats'] = results['fs_stats']
+
+    return report
+
+
+def format_report(report: Dict) -> str:
+    """Tekst-rapport med tid og kald pr. fase"""
+    settings = report['settings']
+    lines = [
+        f"Museum benchmark: {settings['files']} filer, {settings['latency_ms']} ms latens pr. kald, "
+        f"{settings['workers']} tråde",
+        f"Træ: {report['tree']['folders']} mapper, {report['tree']['files']} filer "
+        f"(genereret på {report['tree']['seconds']} s)",
+        ""
+    ]
+    categories = sorted({category for phase in report['phases'].values() for category in phase['calls']})
+    lines.append(f"  {'fase':<16} {'tid (s)':>9} {'kald':>8}  " + "  ".join(f"{c:>7}" for c in categories))
+    for name, phase in report['phases'].items():
+        lines.append(f"  {name:<16} {phase['seconds']:>9.3f} {phase['total_calls']:>8}  " +
+                     "  ".join(f"{phase['calls'].get(c, 0):>7}" for c in categories))
+
+    organize = report['phases'].get('organize')
+    if organize:
+        lines.append("")
+        lines.append(f"Organisering: {organize['files_per_second']} filer/s · {organize['success']} gemt · "
+                     f"{organize['skipped']} sprunget over · {organize['errors']} fejl · "
+                     f"{organize['created_folders']} nye mapper")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Kommandolinje: kør benchmark og udskriv (eller gem) rapporten"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DGB Assistent museum benchmark")
+    parser.add_argument('--files', type=int, default=500, help="Antal filer der organiseres")
+    parser.add_argument('--cases', type=int, default=2000, help="Antal sag-mapper i træet")
+    parser.add_argument('--files-per-case', type=int, default=5, help="Gennemsnitligt antal filer pr. sag")
+    parser.add_argument('--latency-ms', type=float, default=2.0, help="Forsinkelse pr. filsystem-kald (ms)")
+    parser.add_argument('--workers', type=int, default=None, help="Samtidige fil-operationer")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--tree', default=None,
+                        help="Byg træet her og behold det (skal være tom) - ellers en midlertidig mappe")
+    parser.add_argument('--report', default=None, help="Gem rapporten som JSON")
+    args = parser.parse_args(argv)
+
+    if args.tree and os.path.isdir(args.tree) and os.listdir(args.tree):
+        print(f"Mappen er ikke tom: {args.tree}")
+        return 2
+
+    tree_path = args.tree or tempfile.mkdtemp(prefix="dgb_benchmark_")
+    try:
+        report = run_benchmark(tree_path, files=args.files, latency_ms=args.latency_ms, workers=args.workers,
+                               cases=args.cases, files_per_case=args.files_per_case, seed=args.seed)
+    finally:
+        if not args.tree:
+            shutil.rmtree(tree_path, ignore_errors=True)
+
+    print(format_report(report))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
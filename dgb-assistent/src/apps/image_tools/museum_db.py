@@ -0,0 +1,426 @@
+"""
+Museum DB - DGB Assistent
+Persistent SQLite index over fotomapperne under museum base_path (mapper og filer med
+størrelse og mtime). Opslag, eksistens-tjek og statistik svarer fra databasen uden at
+gå på netværksdrevet.
+
+Opdatering er inkrementel: en mappe scannes kun igen hvis dens mtime er ændret (mappers
+mtime ændres når filer/mapper tilføjes, slettes eller omdøbes direkte i dem). Uændrede
+mapper koster kun et stat-kald. En fuld genopbygning scanner alt og køres i baggrunden.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .museum_filename import (KIND_GENSTAND, MuseumFileId, case_folder_number, decade_folder_name,
+                              is_year_folder_name, parse_filename)
+from .museum_organizer import MUSEUM_BASE_PATH
+
+DB_PATH = Path.home() / "AppData" / "Local" / "DGB-Assistent" / "museum_index.sqlite"
+
+SCHEMA_VERSION = 2
+COMMIT_EVERY_FOLDERS = 200
+
+# Filtyper der tæller som fotos i søgninger
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp', '.bmp', '.gif'}
+
+# Sag-mapper ligger i base_path/hundrede/ti/sag - kun mapper i den dybde kan være sager
+CASE_FOLDER_DEPTH = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,      -- relativ til base_path med '/' ('' = roden)
+    parent TEXT,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    case_number TEXT,           -- sagnummer hvis mappen er en sag-mappe
+    file_count INTEGER NOT NULL DEFAULT 0,
+    scanned REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS folders_parent ON folders(parent);
+CREATE INDEX IF NOT EXISTS folders_case ON folders(case_number);
+CREATE TABLE IF NOT EXISTS files (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (folder, name)
+);
+CREATE INDEX IF NOT EXISTS files_name ON files(name COLLATE NOCASE);
+"""
+
+
+def case_number_for_folder(relative_path: str) -> Optional[str]:
+    """Sagnummer for en sag-mappe (None for alle andre mapper) - samme regel som organizeren"""
+    if relative_path.count("/") != CASE_FOLDER_DEPTH - 1:
+        return None
+    return case_folder_number(relative_path.rpartition("/")[2])
+
+
+class MuseumPhotoIndex:
+    """SQLite index over museum fotomapperne (trådsikker - én forbindelse beskyttet af en lås)"""
+
+    def __init__(self, base_path: str = MUSEUM_BASE_PATH, db_path: Optional[str] = None):
+        self.base_path = base_path
+        self.db_path = Path(db_path) if db_path else DB_PATH
+        self.lock = threading.RLock()
+        self.refresh_thread = None
+        self.cancel_event = threading.Event()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+            self.check_base_path()
+
+    def check_base_path(self):
+        """Tøm indexet hvis det er bygget for en anden base_path eller et ældre skema"""
+        stored_base = self.get_meta('base_path')
+        stored_version = self.get_meta('schema_version')
+        if stored_base != self.base_path or stored_version != str(SCHEMA_VERSION):
+            self.connection.execute("DELETE FROM folders")
+            self.connection.execute("DELETE FROM files")
+            self.set_meta('base_path', self.base_path)
+            self.set_meta('schema_version', str(SCHEMA_VERSION))
+            self.set_meta('last_refresh', None)
+            self.connection.commit()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]):
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        """Stop en igangværende opdatering og luk databasen"""
+        self.cancel_refresh()
+        with self.lock:
+            self.connection.close()
+
+    # Stier
+    def relative(self, path: str) -> str:
+        """Absolut sti -> indexets relative nøgle"""
+        relative_path = os.path.relpath(path, self.base_path)
+        return "" if relative_path == "." else relative_path.replace(os.sep, "/")
+
+    def absolute(self, relative_path: str) -> str:
+        """Indexets relative nøgle -> absolut sti"""
+        if not relative_path:
+            return self.base_path
+        return os.path.join(self.base_path, *relative_path.split("/"))
+
+    # Opdatering
+    def refresh(self, full: bool = False, progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Opdatér indexet fra drevet
+        full: scan alle mapper (ellers kun mapper hvis mtime er ændret)
+        Returns: {'scanned', 'unchanged', 'removed', 'files', 'seconds'}
+        """
+        started = time.monotonic()
+        stats = {'scanned': 0, 'unchanged': 0, 'removed': 0, 'files': 0, 'seconds': 0.0}
+
+        with self.lock:
+            known = {row['path']: row['mtime_ns']
+                     for row in self.connection.execute("SELECT path, mtime_ns FROM folders")}
+
+        seen = set()
+        pending_writes = 0
+        stack = [""]
+
+        while stack:
+            if self.cancel_event.is_set():
+                break
+
+            relative_path = stack.pop()
+            folder_path = self.absolute(relative_path)
+            try:
+                mtime_ns = os.stat(folder_path).st_mtime_ns
+            except OSError:
+                continue  # Fjernet - slettes fra indexet nedenfor
+            seen.add(relative_path)
+
+            if not full and known.get(relative_path) == mtime_ns:
+                # Uændret - fortsæt med de kendte undermapper uden at liste mappen
+                with self.lock:
+                    stack.extend(row['path'] for row in self.connection.execute(
+                        "SELECT path FROM folders WHERE parent = ?", (relative_path,)))
+                stats['unchanged'] += 1
+            else:
+                subfolders, files = self.scan_folder(folder_path)
+                prefix = relative_path + "/" if relative_path else ""
+                stack.extend(prefix + name for name in subfolders)
+                self.store_folder(relative_path, mtime_ns, files)
+                stats['scanned'] += 1
+                stats['files'] += len(files)
+                pending_writes += 1
+
+            if pending_writes >= COMMIT_EVERY_FOLDERS:
+                with self.lock:
+                    self.connection.commit()
+                pending_writes = 0
+
+            if progress_callback and (stats['scanned'] + stats['unchanged']) % 50 == 0:
+                progress_callback(dict(stats))
+
+        if self.cancel_event.is_set():
+            # Afbrudt: forældre til mapper der ikke nåede at blive besøgt skal scannes igen
+            # næste gang, ellers ville nye undermapper aldrig blive fundet
+            with self.lock:
+                for path in stack:
+                    self.connection.execute("UPDATE folders SET mtime_ns = -1 WHERE path = ?",
+                                            (path.rpartition("/")[0],))
+        else:
+            # Mapper der ikke længere findes (kun når hele træet er gennemgået)
+            removed = [path for path in known if path not in seen]
+            with self.lock:
+                for path in removed:
+                    self.connection.execute("DELETE FROM folders WHERE path = ?", (path,))
+                    self.connection.execute("DELETE FROM files WHERE folder = ?", (path,))
+                self.set_meta('last_refresh', datetime.now().isoformat(timespec='seconds'))
+            stats['removed'] = len(removed)
+
+        with self.lock:
+            self.connection.commit()
+
+        stats['seconds'] = round(time.monotonic() - started, 2)
+        return stats
+
+    def scan_folder(self, folder_path: str):
+        """Ét scandir kald. Returns: (undermappe-navne, [(navn, størrelse, mtime_ns)])"""
+        subfolders, files = [], []
+        try:
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            subfolders.append(entry.name)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+                    except OSError:
+                        pass
+        except OSError as e:
+            print(f"Kunne ikke scanne {folder_path}: {e}")
+        return subfolders, files
+
+    def store_folder(self, relative_path: str, mtime_ns: int, files: List):
+        """Erstat en mappes række og filer i indexet"""
+        parent, _, name = relative_path.rpartition("/")
+        if not relative_path:
+            parent, name = None, ""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO folders (path, parent, name, mtime_ns, case_number, file_count, scanned) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (relative_path, parent, name, mtime_ns, case_number_for_folder(relative_path), len(files), time.time()))
+            self.connection.execute("DELETE FROM files WHERE folder = ?", (relative_path,))
+            self.connection.executemany(
+                "INSERT INTO files (folder, name, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                [(relative_path, name, size, file_mtime) for name, size, file_mtime in files])
+
+    def start_refresh(self, full: bool = False, done_callback: Optional[Callable[[Dict], None]] = None,
+                      progress_callback: Optional[Callable[[Dict], None]] = None) -> bool:
+        """
+        Opdatér i en baggrundstråd (fx fuld genopbygning)
+        Returns: False hvis en opdatering allerede kører
+        """
+        if self.refreshing:
+            return False
+        self.cancel_event.clear()
+
+        def run():
+            try:
+                stats = self.refresh(full, progress_callback)
+            except Exception as e:
+                stats = {'error': str(e)}
+                print(f"Fejl ved opdatering af museum index: {e}")
+            if done_callback:
+                done_callback(stats)
+
+        self.refresh_thread = threading.Thread(target=run, daemon=True)
+        self.refresh_thread.start()
+        return True
+
+    def cancel_refresh(self):
+        """Afbryd en igangværende opdatering (det scannede indtil nu bevares)"""
+        self.cancel_event.set()
+        if self.refresh_thread is not None:
+            self.refresh_thread.join(5.0)
+
+    @property
+    def refreshing(self) -> bool:
+        return self.refresh_thread is not None and self.refresh_thread.is_alive()
+
+    # Opslag
+    def folder_exists(self, path: str) -> bool:
+        """Findes mappen i indexet"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT 1 FROM folders WHERE path = ?", (self.relative(path),)).fetchone() is not None
+
+    def file_exists(self, path: str) -> bool:
+        """Findes filen i indexet"""
+        folder, name = os.path.split(path)
+        with self.lock:
+            return self.connection.execute(
+                "SELECT 1 FROM files WHERE folder = ? AND name = ?",
+                (self.relative(folder), name)).fetchone() is not None
+
+    def folder_listing(self, folder_path: str) -> Optional[Tuple[List[str], set, Dict[str, Tuple[int, int]]]]:
+        """
+        Listing fra indexet i samme form som MuseumTreeIndex bruger
+        Returns: (undermapper, optagne navne i normcase, {filnavn: (størrelse, mtime_ns)})
+        eller None hvis mappen ikke er kendt
+        """
+        relative_path = self.relative(folder_path)
+        if relative_path.startswith(".."):
+            return None
+        with self.lock:
+            if self.connection.execute("SELECT 1 FROM folders WHERE path = ?", (relative_path,)).fetchone() is None:
+                return None
+            subfolders = [row['name'] for row in self.connection.execute(
+                "SELECT name FROM folders WHERE parent = ?", (relative_path,))]
+            files = {row['name']: (row['size'], row['mtime_ns']) for row in self.connection.execute(
+                "SELECT name, size, mtime_ns FROM files WHERE folder = ?", (relative_path,))}
+        return subfolders, {os.path.normcase(name) for name in subfolders + list(files)}, files
+
+    def find_case_folders(self, case_number: str) -> List[str]:
+        """Absolutte stier til sag-mapper for et sagnummer"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT path FROM folders WHERE case_number = ? ORDER BY path", (case_number,)).fetchall()
+        return [self.absolute(row['path']) for row in rows]
+
+    def existing_cases(self) -> List[str]:
+        """Alle sagnumre med en mappe (sorteret)"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT DISTINCT case_number FROM folders WHERE case_number IS NOT NULL "
+                "ORDER BY case_number").fetchall()
+        return [row['case_number'] for row in rows]
+
+    def files_in(self, folder_path: str) -> List[Dict]:
+        """Filer i en mappe: [{'name', 'path', 'size', 'mtime'}]"""
+        relative_path = self.relative(folder_path)
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name, size, mtime_ns FROM files WHERE folder = ? ORDER BY name",
+                (relative_path,)).fetchall()
+        return [{'name': row['name'], 'path': os.path.join(folder_path, row['name']),
+                 'size': row['size'], 'mtime': row['mtime_ns'] / 1e9} for row in rows]
+
+    def search_files(self, text: str, limit: int = 500) -> List[Dict]:
+        """Filer hvis navn indeholder teksten: [{'name', 'path', 'folder', 'size', 'mtime'}]"""
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT folder, name, size, mtime_ns FROM files WHERE name LIKE ? ESCAPE '\\' "
+                "ORDER BY folder, name LIMIT ?", (pattern, limit)).fetchall()
+        results = []
+        for row in rows:
+            folder_path = self.absolute(row['folder'])
+            results.append({'name': row['name'], 'path': os.path.join(folder_path, row['name']),
+                            'folder': folder_path, 'size': row['size'], 'mtime': row['mtime_ns'] / 1e9})
+        return results
+
+    def files_below(self, relative_paths: List[str]) -> List[Dict]:
+        """Billedfiler i mapperne og alle deres undermapper: [{'name', 'path', 'folder', 'size', 'mtime'}]"""
+        results = []
+        with self.lock:
+            for relative_path in relative_paths:
+                # Undermapper er præcis stierne mellem 'sti/' og 'sti0' ('0' kommer lige efter '/'),
+                # så opslaget bruger primærnøglens index i stedet for at scanne hele tabellen
+                rows = self.connection.execute(
+                    "SELECT folder, name, size, mtime_ns FROM files "
+                    "WHERE folder = ? OR (folder >= ? AND folder < ?) ORDER BY folder, name",
+                    (relative_path, relative_path + "/", relative_path + "0")).fetchall()
+                for row in rows:
+                    if os.path.splitext(row['name'])[1].lower() not in IMAGE_EXTENSIONS:
+                        continue
+                    folder_path = self.absolute(row['folder'])
+                    results.append({'name': row['name'], 'path': os.path.join(folder_path, row['name']),
+                                    'folder': folder_path, 'size': row['size'], 'mtime': row['mtime_ns'] / 1e9})
+        return results
+
+    def find_year_folders(self, year: int) -> List[str]:
+        """Relative stier til år-mapper for et registreringsår (alle navneformater i årti-mappen)"""
+        decade = decade_folder_name(year)
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT path, name FROM folders WHERE parent = ? ORDER BY path", (decade,)).fetchall()
+        return [row['path'] for row in rows if is_year_folder_name(row['name'], year)]
+
+    def find_photos(self, query: str) -> Dict:
+        """
+        Alle fotos for et sagnummer ('1234', 'Sag 1234', '1234x0005') eller genstands-nummer ('00073;15')
+        Returns: {'query': MuseumFileId eller None, 'folders', 'files', 'seconds'}
+        """
+        started = time.monotonic()
+        file_id = parse_filename(query.strip())
+        result = {'query': file_id, 'folders': [], 'files': [], 'seconds': 0.0}
+        if file_id is None:
+            return result
+
+        if file_id.kind == KIND_GENSTAND:
+            folders = self.find_year_folders(file_id.year)
+        else:
+            with self.lock:
+                folders = [row['path'] for row in self.connection.execute(
+                    "SELECT path FROM folders WHERE case_number = ? ORDER BY path", (file_id.case_number,))]
+
+        files = self.files_below(folders)
+        if file_id.kind == KIND_GENSTAND or file_id.object_number:
+            # År-mapper (og sager med løbenummer) indeholder flere genstande - kun de der matcher
+            files = [item for item in files if self.same_object(parse_filename(item['name']), file_id)]
+
+        result['folders'] = [self.absolute(path) for path in folders]
+        result['files'] = files
+        result['seconds'] = round(time.monotonic() - started, 3)
+        return result
+
+    @staticmethod
+    def same_object(file_id: Optional[MuseumFileId], query: MuseumFileId) -> bool:
+        """Hører filen til samme genstand/løbenummer som søgningen (AAB præfiks og suffiks ignoreres)"""
+        return (file_id is not None and file_id.kind == query.kind
+                and file_id.object_number == query.object_number
+                and file_id.year == query.year and file_id.case_number == query.case_number)
+
+    def statistics(self) -> Dict:
+        """Antal mapper, filer, sager, samlet størrelse og tidspunkt for seneste opdatering"""
+        with self.lock:
+            folders = self.connection.execute("SELECT COUNT(*) FROM folders").fetchone()[0]
+            files, total_size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+            cases = self.connection.execute(
+                "SELECT COUNT(DISTINCT case_number) FROM folders WHERE case_number IS NOT NULL").fetchone()[0]
+        return {
+            'folders': folders,
+            'files': files,
+            'cases': cases,
+            'total_size': total_size,
+            'last_refresh': self.get_meta('last_refresh')
+        }
+
+
+_museum_photo_index = None
+
+def get_museum_photo_index() -> MuseumPhotoIndex:
+    """Get the global museum photo index"""
+    global _museum_photo_index
+    if _museum_photo_index is None:
+        _museum_photo_index = MuseumPhotoIndex()
+    return _museum_photo_index
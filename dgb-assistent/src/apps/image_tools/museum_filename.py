@@ -0,0 +1,147 @@
+"""
+Museum Filename - DGB Assistent
+Fortolkning af museum filnavne med forudkompilerede mønstre. Et filnavn klassificeres én gang
+til et MuseumFileId (genstands-nummer '00073;15' eller sagnummer '1234x5678'), og resultatet
+caches så validering, mappe-opslag og organisering ikke søger i samme navn flere gange.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+# Genstands-nummer med registreringsår: 00073;15 eller 00073;2015
+GENSTAND_PATTERN = re.compile(r'(\d+);(\d{2,4})')
+# Sagnummer og løbenummer: 1234x5678
+CASE_OBJECT_PATTERN = re.compile(r'(\d{4})x(\d{4})')
+# Første fire cifre (fx 'AAB 1234') når der ikke er et løbenummer - tom gruppe i stedet for løbenummer
+CASE_PATTERN = re.compile(r'(\d{4})()')
+# AAB præfiks lige foran nummeret (søges med endpos = nummerets start)
+AAB_PREFIX_PATTERN = re.compile(r'AAB\s+$')
+# Bogstav-suffiks efter nummeret: '0156x0234 a.jpg' -> 'a'
+LETTER_SUFFIX_PATTERN = re.compile(r'\s*([a-zæøå])(?:\.[^.\s]*)?$', re.IGNORECASE)
+
+# Gyldige intervaller (samme regler som museum mappestrukturen)
+MIN_REGISTRATION_YEAR = 1900
+MAX_REGISTRATION_YEAR = 2030
+
+KIND_GENSTAND = 'genstand'
+KIND_CASE = 'sag'
+
+PARSE_CACHE_SIZE = 65536
+
+
+class MuseumFileId(NamedTuple):
+    """Struktureret identifikation af et filnavn"""
+    kind: str                       # KIND_GENSTAND eller KIND_CASE
+    case_number: Optional[str]      # '1234' (kun sag)
+    object_number: Optional[str]    # genstands-nummer '00073' eller løbenummer '5678'
+    year: Optional[int]             # registreringsår (kun genstand)
+    aab: bool                       # 'AAB ' foran nummeret
+    suffix: Optional[str]           # bogstav-suffiks, fx 'a'
+
+
+def full_registration_year(year_suffix: str) -> int:
+    """To-cifret år: 15 -> 1915, 05 -> 2005 - ellers året som det står"""
+    year_int = int(year_suffix)
+    if len(year_suffix) != 2:
+        return year_int
+    return 1900 + year_int if year_int >= 10 else 2000 + year_int
+
+
+def find_case_number(filename: str) -> Optional[re.Match]:
+    """Sagnummer-match: group(1) er sagnummeret, group(2) løbenummeret (tomt uden 'x')"""
+    return CASE_OBJECT_PATTERN.search(filename) or CASE_PATTERN.search(filename)
+
+
+def letter_suffix(filename: str, position: int) -> Optional[str]:
+    match = LETTER_SUFFIX_PATTERN.match(filename, position)
+    return match.group(1).lower() if match else None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_filename(filename: str) -> Optional[MuseumFileId]:
+    """
+    Klassificér et filnavn - genstands-nummer går forud for sagnummer
+    Returns: MuseumFileId eller None hvis hverken sagnummer eller genstands-nummer findes
+    """
+    # ';' findes kun i genstands-numre - spar søgningen for almindelige sag-filer
+    match = GENSTAND_PATTERN.search(filename) if ';' in filename else None
+    if match:
+        return MuseumFileId(kind=KIND_GENSTAND,
+                            case_number=None,
+                            object_number=match.group(1).zfill(5),
+                            year=full_registration_year(match.group(2)),
+                            aab=AAB_PREFIX_PATTERN.search(filename, 0, match.start()) is not None,
+                            suffix=letter_suffix(filename, match.end()))
+
+    match = find_case_number(filename)
+    if not match:
+        return None
+    case_number, object_number = match.group(1), match.group(2) or None
+
+    return MuseumFileId(kind=KIND_CASE,
+                        case_number=case_number,
+                        object_number=object_number,
+                        year=None,
+                        aab=AAB_PREFIX_PATTERN.search(filename, 0, match.start()) is not None,
+                        suffix=letter_suffix(filename, match.end()))
+
+
+def is_case_folder_name(name: str, case_number: str) -> bool:
+    """Sag-mappe i et af formaterne 'Sag 0030', 'Sag 0030, beskrivelse' eller '0030x'"""
+    return name == f"Sag {case_number}" or name.startswith(f"Sag {case_number},") or name == f"{case_number}x"
+
+
+def case_folder_number(name: str) -> Optional[str]:
+    """Sagnummeret hvis navnet er en sag-mappe (se is_case_folder_name) - ellers None"""
+    candidate = name[4:8] if name.startswith("Sag ") else name[:4]
+    if len(candidate) == 4 and candidate.isascii() and candidate.isdigit() and \
+            is_case_folder_name(name, candidate):
+        return candidate
+    return None
+
+
+def decade_folder_name(year: int) -> str:
+    """Årti-mappe for et registreringsår: 1915 -> Genstande registreret i 1910'erne"""
+    return f"Genstande registreret i {(year // 10) * 10}'erne"
+
+
+def is_year_folder_name(name: str, year: int) -> bool:
+    """År-mappe i et af formaterne '1917', '0401 Genstande registreret i 2001' m.fl."""
+    return (name == str(year) or f"Genstande registreret i {year}" in name
+            or name.endswith(f"registreret i {year}"))
+
+
+def validate_identifier(file_id: Optional[MuseumFileId]) -> Tuple[bool, str]:
+    """Validér et fortolket filnavn mod reglerne for museum mappestrukturen"""
+    if file_id is None:
+        return False, "Hverken sagnummer eller genstands-nummer fundet i filnavnet"
+
+    if file_id.kind == KIND_GENSTAND:
+        if file_id.year < MIN_REGISTRATION_YEAR or file_id.year > MAX_REGISTRATION_YEAR:
+            return False, (f"Registreringsår {file_id.year} er uden for gyldigt interval "
+                           f"({MIN_REGISTRATION_YEAR}-{MAX_REGISTRATION_YEAR})")
+        return True, f"Gyldigt genstands-nummer: {file_id.object_number};{file_id.year}"
+
+    if int(file_id.case_number) < 1:
+        return False, f"Sagnummer {file_id.case_number} er uden for gyldigt interval (0001-9999)"
+    return True, f"Gyldigt sagnummer: {file_id.case_number}"
+
+
+def validate_filename(filename: str) -> Tuple[bool, str]:
+    """Validér om et filnavn kan organiseres"""
+    return validate_identifier(parse_filename(filename))
+
+
+def parse_filenames(filenames: Iterable[str]) -> Dict[str, Optional[MuseumFileId]]:
+    """Fortolk mange filnavne på én gang (gentagne navne fortolkes kun én gang)"""
+    return {filename: parse_filename(filename) for filename in filenames}
+
+
+def validate_filenames(filenames: Iterable[str]) -> Dict[str, Tuple[bool, str]]:
+    """
+    Validér mange filnavne på én gang, fx til fil-lister
+    Returns: {filnavn: (gyldig, besked)}
+    """
+    return {filename: validate_identifier(file_id)
+            for filename, file_id in parse_filenames(filenames).items()}
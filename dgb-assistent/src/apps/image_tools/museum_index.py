@@ -0,0 +1,287 @@
+"""
+Museum Index - DGB Assistent
+Hukommelses-index over museum mappetræet. Hver mappe scannes med os.scandir højst én gang
+(ét netværkskald i stedet for listdir + isdir pr. element), og svar på "findes mappen",
+"hvilke undermapper", "hvilke navne er optaget" og filernes størrelse/mtime (til deduplikering)
+gives derefter fra hukommelsen.
+Organizeren holder indexet ajour med de mapper og filer den selv opretter.
+
+walk_case_folders gennemløber hundrede/ti/sag hierarkiet parallelt og leverer sag-mapperne
+løbende, så kalderen kan gå i gang før hele træet er scannet.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .museum_filename import case_folder_number
+from .museum_fs import MuseumFilesystem
+
+# Mapper der er ældre end dette scannes igen ved næste kørsel (andre arbejdsstationer
+# kan have oprettet mapper/filer i mellemtiden)
+INDEX_MAX_AGE_SECONDS = 300
+
+# Samtidige scanninger af hundrede-mapper (hver tråd venter mest på netværket)
+WALK_WORKERS = 8
+
+
+class MuseumTreeIndex:
+    """
+    Cache af mappe-listninger: mappe -> {'dirs': [navne], 'names': {normcase navne}, 'scanned',
+    'files': [DirEntry] eller {navn: (størrelse, mtime_ns)}, 'stats': {navn: (størrelse, mtime_ns)} når hentet,
+    'unstatted': {navne registreret uden stat - slås op i file_stats}}
+    """
+
+    def __init__(self, max_age: float = INDEX_MAX_AGE_SECONDS,
+                 loader: Optional[Callable[[str], Optional[Tuple]]] = None,
+                 fs: Optional[MuseumFilesystem] = None):
+        self.max_age = max_age
+        # Alternativ kilde til listninger (fx museum_db) i stedet for drevet:
+        # loader(mappe) -> (undermapper, normcase navne[, {filnavn: (størrelse, mtime_ns)}]) eller None
+        self.loader = loader
+        self.fs = fs or MuseumFilesystem()
+        self.folders = {}   # normaliseret sti -> listing, eller None hvis mappen ikke findes
+        self.lock = threading.RLock()
+        self.scans = 0      # Antal egentlige scandir kald (til statistik)
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    def listing(self, directory: str) -> Optional[Dict]:
+        """Listing for mappen (scannes første gang). Returns: None hvis mappen ikke findes"""
+        key = self.key(directory)
+        with self.lock:
+            if key in self.folders:
+                return self.folders[key]
+
+        if self.loader is not None:
+            loaded = self.loader(directory)
+            listing = None if loaded is None else \
+                {'dirs': list(loaded[0]), 'names': set(loaded[1]), 'scanned': time.monotonic(),
+                 'files': dict(loaded[2]) if len(loaded) > 2 else {}}
+            with self.lock:
+                return self.folders.setdefault(key, listing)
+
+        dirs, names, files = [], set(), []
+        try:
+            for entry in self.fs.scandir(directory):
+                names.add(os.path.normcase(entry.name))
+                try:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry)  # stat hentes først i file_stats (gratis fra listningen på Windows)
+                except OSError:
+                    pass
+            listing = {'dirs': dirs, 'names': names, 'scanned': time.monotonic(), 'files': files}
+        except (FileNotFoundError, NotADirectoryError):
+            listing = None
+
+        with self.lock:
+            self.scans += 1
+            # En anden tråd kan være nået først - behold dens listing (navne-sættet deles)
+            return self.folders.setdefault(key, listing)
+
+    def is_dir(self, path: str) -> bool:
+        """Findes mappen (slås op i forælderens listing)"""
+        parent, name = os.path.split(os.path.normpath(path))
+        if not name or parent == path:
+            return self.listing(path) is not None
+        parent_listing = self.listing(parent)
+        if parent_listing is None:
+            return False
+        normalized = os.path.normcase(name)
+        return any(os.path.normcase(item) == normalized for item in parent_listing['dirs'])
+
+    def subdirs(self, directory: str) -> List[str]:
+        """Navne på undermapper (tom liste hvis mappen ikke findes)"""
+        listing = self.listing(directory)
+        return list(listing['dirs']) if listing else []
+
+    def file_stats(self, directory: str) -> Dict[str, Tuple[int, int]]:
+        """Filer i mappen: {navn: (størrelse, mtime_ns)} - tom hvis mappen ikke findes"""
+        listing = self.listing(directory)
+        if listing is None:
+            return {}
+        with self.lock:
+            stats = listing.get('stats')
+            files = listing.get('files', [])
+        if stats is None:
+            if isinstance(files, dict):
+                stats = dict(files)
+            else:
+                stats = {}
+                for entry in files:
+                    try:
+                        stat = entry.stat()
+                        stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        pass
+            with self.lock:
+                stats = listing.setdefault('stats', stats)
+        self.stat_registered(directory, listing)
+        return stats
+
+    def stat_registered(self, directory: str, listing: Dict):
+        """
+        Hent størrelse/mtime for filer registreret uden stat (skrevet uden deduplikering) -
+        først når file_stats bruges, så kørsler uden deduplikering ikke betaler for det.
+        Navne der endnu ikke findes (reserveret, ikke skrevet) prøves igen næste gang
+        """
+        with self.lock:
+            pending = list(listing.get('unstatted', ()))
+        for name in pending:
+            try:
+                stat = self.fs.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            with self.lock:
+                if name in listing.get('unstatted', ()):
+                    listing['unstatted'].discard(name)
+                    listing['stats'][name] = (stat.st_size, stat.st_mtime_ns)
+
+    def names(self, directory: str) -> set:
+        """
+        Optagne navne i mappen (normcase) - sættet er indexets eget, så navne der
+        reserveres i det er synlige for resten af kørslen
+        """
+        listing = self.listing(directory)
+        if listing is None:
+            # Mappen findes ikke (endnu) - start med et tomt sæt der udfyldes ved oprettelse
+            with self.lock:
+                listing = self.folders[self.key(directory)] = \
+                    {'dirs': [], 'names': set(), 'scanned': time.monotonic(), 'files': {}}
+        return listing['names']
+
+    def add_folder(self, path: str):
+        """Registrér en mappe der lige er oprettet (og dens forældre)"""
+        path = os.path.normpath(path)
+        with self.lock:
+            listing = self.folders.get(self.key(path))
+            if listing is None:
+                self.folders[self.key(path)] = {'dirs': [], 'names': set(), 'scanned': time.monotonic(),
+                                                'files': {}}
+
+            parent, name = os.path.split(path)
+            if not name or parent == path:
+                return
+            if self.key(parent) in self.folders and self.folders[self.key(parent)] is None:
+                # Forælderen var registreret som ikke-eksisterende - den findes nu
+                self.add_folder(parent)
+
+            # Er forælderen ikke scannet endnu, kommer mappen med når den bliver det
+            parent_listing = self.folders.get(self.key(parent))
+            if parent_listing is not None:
+                parent_listing['names'].add(os.path.normcase(name))
+                if not any(os.path.normcase(item) == os.path.normcase(name) for item in parent_listing['dirs']):
+                    parent_listing['dirs'].append(name)
+
+    def add_file(self, path: str, stat: Optional[os.stat_result] = None):
+        """
+        Registrér en fil der er oprettet eller reserveret (stat: den skrevne fils størrelse/mtime
+        til file_stats). Uden stat slås filen op første gang file_stats bruges - kald igen efter
+        skrivningen, så en tidligere størrelse (fx den tomme reservation) ikke genbruges
+        """
+        directory, name = os.path.split(path)
+        if stat is not None:
+            self.file_stats(directory)
+        with self.lock:
+            listing = self.folders.get(self.key(directory))
+            if listing is not None:
+                listing['names'].add(os.path.normcase(name))
+                if stat is not None:
+                    listing['stats'][name] = (stat.st_size, stat.st_mtime_ns)
+                    listing.get('unstatted', set()).discard(name)
+                else:
+                    if 'stats' in listing:
+                        listing['stats'].pop(name, None)
+                    listing.setdefault('unstatted', set()).add(name)
+
+    def remove_file(self, path: str):
+        """Glem en fil der er slettet igen"""
+        directory, name = os.path.split(path)
+        with self.lock:
+            listing = self.folders.get(self.key(directory))
+            if listing is not None:
+                listing['names'].discard(os.path.normcase(name))
+                listing.get('stats', {}).pop(name, None)
+                listing.get('unstatted', set()).discard(name)
+
+    def expire(self):
+        """Glem listninger der er ældre end max_age (og mapper der manglede)"""
+        cutoff = time.monotonic() - self.max_age
+        with self.lock:
+            for key in [key for key, listing in self.folders.items()
+                        if listing is None or listing['scanned'] < cutoff]:
+                del self.folders[key]
+
+    def clear(self):
+        """Glem alt - næste opslag scanner igen"""
+        with self.lock:
+            self.folders.clear()
+
+
+def scandir_folders(path: str) -> Iterator[os.DirEntry]:
+    """Undermapper via scandir - is_dir bruger typen fra listningen (intet ekstra stat-kald)"""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    yield entry
+            except OSError:
+                pass
+
+
+def walk_case_folders(base_path: str, workers: int = WALK_WORKERS) -> Iterator[Tuple[str, str]]:
+    """
+    Find sag-mapper (base/hundrede/ti/sag) med en trådpulje fordelt over hundrede-mapperne
+    Yields: (sagnummer, sti) efterhånden som de findes - rækkefølgen er ikke sorteret
+    """
+    try:
+        hundred_paths = [entry.path for entry in scandir_folders(base_path)]
+    except OSError:
+        return
+    if not hundred_paths:
+        return
+
+    found = queue.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def scan_hundred(hundred_path: str):
+        try:
+            for ten_entry in scandir_folders(hundred_path):
+                if stop.is_set():
+                    return
+                try:
+                    for case_entry in scandir_folders(ten_entry.path):
+                        case_number = case_folder_number(case_entry.name)
+                        if case_number:
+                            found.put((case_number, case_entry.path))
+                except OSError as e:
+                    print(f"Kunne ikke scanne {ten_entry.path}: {e}")
+        except OSError as e:
+            print(f"Kunne ikke scanne {hundred_path}: {e}")
+        finally:
+            found.put(done)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(hundred_paths))))
+    try:
+        for hundred_path in hundred_paths:
+            executor.submit(scan_hundred, hundred_path)
+
+        remaining = len(hundred_paths)
+        while remaining:
+            item = found.get()
+            if item is done:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        # Kalderen kan stoppe før tid - resten af scanningen afbrydes
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
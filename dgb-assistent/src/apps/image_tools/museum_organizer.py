@@ -4,40 +4,73 @@ Håndterer organisering af billeder til den korrekte museum mappestruktur
 """
 
 import os
-import re
-import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from tkinter import messagebox
 
+from .content_hash import DEDUP_LINK, DEDUP_OFF, DEDUP_SKIP, FolderHashCache, hash_file_info
+from .fast_copy import TRANSFER_COPY, describe_transfer
+from .file_writer import TEMP_SUFFIX, default_workers
+from .museum_filename import (KIND_CASE, KIND_GENSTAND, MuseumFileId, decade_folder_name, find_case_number,
+                              is_case_folder_name, is_year_folder_name, parse_filename,
+                              validate_filename, validate_filenames)
+from .museum_fs import MuseumFilesystem, format_fs_stats
+from .museum_index import WALK_WORKERS, MuseumTreeIndex, walk_case_folders
+from .manifest import BLAKE2B_256, MUSEUM_MANIFEST_DIR, HashingWriter, ManifestBuilder, hash_stream
+
+# Museets fællesdrev (kan overstyres med miljøvariabel, fx til test)
+MUSEUM_BASE_PATH = os.environ.get("DGB_MUSEUM_BASE_PATH",
+                                  r"M:\Museumsfaglig afdeling\0 Museets Samlinger\6 Genstandsfotos")
+
+# Antal gange et navn forsøges reserveret hvis andre når at tage det først
+MAX_CLAIM_ATTEMPTS = 50
+
 
 class MuseumOrganizer:
     """Organiserer billeder til museum mappestruktur baseret på sagnummer"""
     
     def __init__(self):
-        # Base path til museum mapper
-        self.base_path = r"M:\Museumsfaglig afdeling\0 Museets Samlinger\6 Genstandsfotos"
+        # Antal samtidige fil-operationer (None = ud fra om base_path er et netværksdrev)
+        self.max_workers = None
+        
+        # Standard overførsel af source_path filer (se fast_copy.TRANSFER_MODES)
+        self.transfer_mode = TRANSFER_COPY
+        
+        # Filer med indhold der allerede ligger i målmappen skrives som standard alligevel
+        # ("navn a.jpg") - DEDUP_SKIP/DEDUP_LINK vælges eksplicit (se content_hash)
+        self.dedup_mode = DEDUP_OFF
+        self.hash_cache = None  # FolderHashCache - oprettes først når den bruges
+        
+        # Fixity-manifest for hver organisering (gemmes i base_path/_manifester)
+        self.write_manifests = True
         
-        # For test/udvikling kan vi bruge en lokal mappe
-        if not os.path.exists(self.base_path):
-            # Fallback til lokal test mappe
-            self.base_path = os.path.join(os.getcwd(), "test_museum_folders")
-            print(f"Museum base path ikke fundet, bruger test mappe: {self.base_path}")
+        # Al adgang til drevet går gennem fs, der tæller og tidtager kaldene (results['fs_stats'])
+        self.fs = MuseumFilesystem()
+        
+        # Mappe-listninger i hukommelsen (hver mappe scannes én gang) - deles af arbejdstrådene
+        self.tree_index = MuseumTreeIndex(fs=self.fs)
+        self.name_lock = threading.RLock()
+        
+        # Base path til museum mapper - er drevet ikke tilgængeligt, skrives der intet
+        # (processorerne lægger filerne i share_sync køen, til test bruges DGB_MUSEUM_BASE_PATH)
+        self.base_path = MUSEUM_BASE_PATH
+    
+    def parse_filename(self, filename: str) -> Optional[MuseumFileId]:
+        """Fortolk filnavnet én gang (se museum_filename) - None hvis det ikke kan organiseres"""
+        return parse_filename(filename)
     
     def extract_case_number(self, filename: str) -> Optional[str]:
         """Udtræk sagnummer fra filnavn som '1234x4321' -> '1234'"""
-        # Søg efter mønster som 1234x4321 hvor 1234 er sagnummer
-        match = re.search(r'(\d{4})x\d{4}', filename)
-        if match:
-            return match.group(1)
+        file_id = parse_filename(filename)
+        if file_id is None or file_id.kind == KIND_CASE:
+            return file_id.case_number if file_id else None
         
-        # Alternative mønstre
-        # Søg efter AAB 1234 eller bare 1234 i starten
-        match = re.search(r'(?:AAB\s+)?(\d{4})', filename)
-        if match:
-            return match.group(1)
-        
-        return None
+        # Genstands-numre har intet sagnummer, men de første fire cifre svares som hidtil
+        match = find_case_number(filename)
+        return match.group(1) if match else None
     
     def extract_genstand_info(self, filename: str) -> Optional[tuple]:
         """
@@ -45,28 +78,10 @@ class MuseumOrganizer:
         Returns: (genstands_nummer, registrerings_år) eller None
         Eksempel: '00073;15' -> ('00073', 1915)
         """
-        # Søg efter mønster som 00073;15 eller 00073;2015
-        match = re.search(r'(\d+);(\d{2,4})', filename)
-        if not match:
-            return None
-        
-        genstands_nr = match.group(1).zfill(5)  # Pad til 5 cifre
-        year_suffix = match.group(2)
-        
-        # Konverter år-suffiks til fuldt år
-        if len(year_suffix) == 2:
-            # To-cifret år: 15 -> 1915, 99 -> 1999
-            year_int = int(year_suffix)
-            if year_int >= 10:  # 1910'erne og frem
-                full_year = 1900 + year_int
-            else:
-                # 00-09 -> 2000-2009
-                full_year = 2000 + year_int
-        else:
-            # Fire-cifret år: 2015 -> 2015
-            full_year = int(year_suffix)
-        
-        return (genstands_nr, full_year)
+        file_id = parse_filename(filename)
+        if file_id and file_id.kind == KIND_GENSTAND:
+            return (file_id.object_number, file_id.year)
+        return None
     
     def get_case_folder_path(self, case_number: str) -> str:
         """Generer den fulde sti til sag mappen"""
@@ -109,8 +124,7 @@ class MuseumOrganizer:
         Generer den fulde sti til genstands mappen baseret på registreringsår
         """
         # Bestem årti-mappe
-        decade = (registration_year // 10) * 10
-        decade_folder = f"Genstande registreret i {decade}'erne"
+        decade_folder = decade_folder_name(registration_year)
         
         # Byg fuld sti til år-mappen (vi returnerer parent, da år-mappen kan have forskellige navne)
         decade_path = os.path.join(self.base_path, decade_folder)
@@ -122,28 +136,11 @@ class MuseumOrganizer:
         Scan for eksisterende år-mappe med forskellige navneformater
         """
         try:
-            if not os.path.exists(decade_path):
-                return None
-            
-            year_str = str(year)
-            
-            # Scan for forskellige år-mappe formater
-            for item in os.listdir(decade_path):
-                item_path = os.path.join(decade_path, item)
-                if not os.path.isdir(item_path):
-                    continue
-                
-                # Format 1: "1917" (bare år)
-                if item == year_str:
-                    return item_path
-                
-                # Format 2: "0401 Genstande registreret i 2001"
-                if f"Genstande registreret i {year}" in item:
-                    return item_path
-                
-                # Format 3: "0386 Genstande registreret i 1986"
-                if item.endswith(f"registreret i {year}"):
-                    return item_path
+            # Scan for forskellige år-mappe formater (undermapper fra indexet):
+            # "1917", "0401 Genstande registreret i 2001", "0386 Genstande registreret i 1986"
+            for item in self.tree_index.subdirs(decade_path):
+                if is_year_folder_name(item, year):
+                    return os.path.join(decade_path, item)
             
             return None
             
@@ -161,26 +158,11 @@ class MuseumOrganizer:
             standard_path = self.get_case_folder_path(case_number)
             parent_path = os.path.dirname(standard_path)
             
-            if not os.path.exists(parent_path):
-                return None
-            
-            # Scan for forskellige navngivningsformater
-            for item in os.listdir(parent_path):
-                item_path = os.path.join(parent_path, item)
-                if not os.path.isdir(item_path):
-                    continue
-                
-                # Format 1: "Sag 0030, beskrivelse..."
-                if item.startswith(f"Sag {case_number},"):
-                    return item_path
-                
-                # Format 2: "0030x" (bare nummeret med x)
-                if item == f"{case_number}x":
-                    return item_path
-                
-                # Format 3: Præcist match (sikkerhedscheck)
-                if item == f"Sag {case_number}":
-                    return item_path
+            # Scan for forskellige navngivningsformater (undermapper fra indexet)
+            # ("Sag 0030, beskrivelse...", "0030x" eller præcist "Sag 0030")
+            for item in self.tree_index.subdirs(parent_path):
+                if is_case_folder_name(item, case_number):
+                    return os.path.join(parent_path, item)
             
             return None
             
@@ -188,262 +170,570 @@ class MuseumOrganizer:
             print(f"Fejl ved scanning efter sag {case_number}: {e}")
             return None
     
-    def verify_and_create_path_for_genstand(self, genstands_nr: str, registration_year: int, ask_user: bool = True) -> Tuple[bool, str]:
-        """
-        Verificer eller opret sti for genstands-nummer
-        Returns: (success, target_path)
-        """
-        try:
-            # Få årti-mappe sti
-            decade_path = self.get_genstand_folder_path(genstands_nr, registration_year)
-            
-            # Tjek om årti-mappen findes
-            if not os.path.exists(decade_path):
-                if ask_user:
-                    response = messagebox.askyesno(
-                        "Opret Årti Mappe?",
-                        f"Årti-mappen findes ikke:\n\n{decade_path}\n\n"
-                        f"Skal mappen oprettes?"
-                    )
-                    if not response:
-                        return False, f"Bruger afviste oprettelse af årti-mappe"
-                
-                os.makedirs(decade_path, exist_ok=True)
-            
-            # Find eller opret år-mappe
-            existing_year_folder = self.find_existing_year_folder(decade_path, registration_year)
-            
-            if existing_year_folder:
-                return True, existing_year_folder
-            
-            # År-mappe findes ikke - opret standard format
-            year_folder_name = str(registration_year)
-            year_folder_path = os.path.join(decade_path, year_folder_name)
-            
-            if ask_user:
-                response = messagebox.askyesno(
-                    "Opret År Mappe?",
-                    f"År-mappen for {registration_year} findes ikke:\n\n"
-                    f"{year_folder_path}\n\n"
-                    f"Skal mappen oprettes?"
-                )
-                
-                if not response:
-                    return False, f"Bruger afviste oprettelse af år-mappe for {registration_year}"
-            
-            os.makedirs(year_folder_path, exist_ok=True)
-            return True, year_folder_path
-            
-        except Exception as e:
-            return False, f"Fejl ved håndtering af genstand {genstands_nr};{registration_year}: {str(e)}"
-
-    def verify_and_create_path(self, case_number: str, ask_user: bool = True) -> Tuple[bool, str]:
-        """
-        Verificer om stien findes, og spørg brugeren om den skal oprettes hvis ikke
-        Returns: (success, message)
-        """
-        try:
-            target_path = self.get_case_folder_path(case_number)
-            
-            if os.path.exists(target_path):
-                return True, f"Mappe findes: {target_path}"
-            
-            # Standard mappe findes ikke - scan for alternative navne
-            existing_path = self.find_existing_case_folder(case_number)
-            if existing_path:
-                return True, f"Fandt eksisterende mappe: {existing_path}"
-            
-            # Ingen variation fundet - spørg om oprettelse
-            if ask_user:
-                response = messagebox.askyesno(
-                    "Opret Mappe?",
-                    f"Mappen for sag {case_number} findes ikke:\n\n"
-                    f"{target_path}\n\n"
-                    f"Skal mappen oprettes?"
-                )
-                
-                if response:
-                    os.makedirs(target_path, exist_ok=True)
-                    return True, f"Mappe oprettet: {target_path}"
-                else:
-                    return False, f"Bruger afviste oprettelse af mappe for sag {case_number}"
-            else:
-                # Auto-opret uden at spørge
-                os.makedirs(target_path, exist_ok=True)
-                return True, f"Mappe auto-oprettet: {target_path}"
-                
-        except Exception as e:
-            return False, f"Fejl ved håndtering af sag {case_number}: {str(e)}"
-    
-    def organize_files(self, files_data: List[Dict], ask_before_create: bool = True) -> Dict:
+    def organize_files(self, files_data: List[Dict], ask_before_create: bool = True,
+                       transfer_mode: Optional[str] = None, dedup_mode: Optional[str] = None) -> Dict:
         """
         Organisér filer til deres korrekte museum mapper
         files_data: Liste af dicts med 'filename' og 'data' eller 'source_path'
+        transfer_mode: 'copy', 'move', 'hardlink' eller 'reflink' for source_path filer
+        dedup_mode: 'skip', 'link' eller 'off' for filer hvis indhold allerede findes i målmappen
+        
+        Fase 1 (uden skrivning): slå hver målmappe op én gang og tildel unikke filnavne
+        Fase 2: opret manglende mapper efter én samlet bekræftelse
+        Fase 3 (parallelt): skriv/kopiér filerne med en begrænset trådpulje
         """
         results = {
             'success': [],
             'errors': [],
             'created_folders': set(),
-            'skipped': []
+            'skipped': [],
+            'manifest': None,
+            'fs_stats': None
         }
+        fs_snapshot = self.fs.snapshot()
+        
+        # Check base path - oprettes aldrig, et manglende drev må ikke give filer et andet sted
+        if not self.share_available():
+            results['errors'].append(f"Museumsdrevet er ikke tilgængeligt ({self.base_path}) - ingen filer er gemt")
+            results['fs_stats'] = self.fs.since(fs_snapshot)
+            return results
+        
+        self.begin_naming()
+        dedup_mode = dedup_mode or self.dedup_mode
+        if dedup_mode != DEDUP_OFF:
+            self.get_hash_cache().begin_run()
         
-        # Check base path
-        if not os.path.exists(self.base_path):
+        transfer_mode = transfer_mode or self.transfer_mode
+        manifest = None
+        if self.write_manifests:
+            manifest = ManifestBuilder('organize', self.base_path,
+                                       {'transfer_mode': transfer_mode, 'dedup_mode': dedup_mode})
+        
+        plan = self.plan_files(files_data, dedup_mode)
+        planned_files = self.prepare_plan(plan, ask_before_create, results)
+        self.place_files(planned_files, results, transfer_mode, manifest)
+        
+        if dedup_mode != DEDUP_OFF:
+            self.get_hash_cache().save()
+        
+        if manifest is not None and manifest.files:
             try:
-                os.makedirs(self.base_path, exist_ok=True)
-                results['created_folders'].add(self.base_path)
+                with self.fs.timed('manifest'):
+                    results['manifest'] = manifest.write(
+                        os.path.join(self.base_path, MUSEUM_MANIFEST_DIR, manifest.default_filename()))
             except Exception as e:
-                results['errors'].append(f"Kunne ikke oprette base mappe {self.base_path}: {str(e)}")
-                return results
+                results['errors'].append(f"Kunne ikke skrive manifest: {str(e)}")
+        
+        results['fs_stats'] = self.fs.since(fs_snapshot)
+        print(f"Museum organisering ({len(files_data)} filer): {format_fs_stats(results['fs_stats'])}")
+        return results
+    
+    def preview_organize(self, files_data: List[Dict], dedup_mode: Optional[str] = None,
+                         use_photo_index: bool = True,
+                         progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Dry-run: hvor ville hver fil havne, hvilke mapper oprettes og hvilke navne får suffiks
+        Intet skrives og brugeren spørges ikke. Er det persistente index (museum_db) bygget
+        for base_path, planlægges ud fra det (drevet tjekkes kun for om det er tilgængeligt) -
+        ellers fra mappe-indexet, der scanner målmapperne. Identisk indhold findes kun ud fra
+        gemte hashes, så eksisterende filer aldrig læses. Kan tage tid - kald fra en baggrundstråd
+        progress_callback(færdige_mapper, mapper) kaldes efter hver målmappe
+        Returns: {'entries': [{'filename', 'status', 'message', 'folder', 'folder_exists',
+                               'target', 'renamed', 'action'}],
+                  'create_folders': [...], 'summary': {...}, 'source': 'index'/'drev'/'offline', 'online',
+                  'seconds', 'fs_stats'}
+        """
+        started = time.monotonic()
+        fs_snapshot = self.fs.snapshot()
+        online = self.share_available()
+        dedup_mode = dedup_mode or self.dedup_mode
+        if not online:
+            dedup_mode = DEDUP_OFF  # Indholdet på drevet kan ikke sammenlignes - det sker ved synkroniseringen
+        if dedup_mode != DEDUP_OFF:
+            self.get_hash_cache().begin_run()
+        
+        tree_index = self.tree_index
+        source = 'drev'
+        if use_photo_index:
+            from .museum_db import get_museum_photo_index
+            photo_index = get_museum_photo_index()
+            if photo_index.base_path == self.base_path and photo_index.get_meta('last_refresh'):
+                self.tree_index = MuseumTreeIndex(loader=photo_index.folder_listing)
+                source = 'index'
+        if source == 'drev' and not online:
+            # Intet at slå op i - alle mål planlægges som standard mapper der skal oprettes
+            self.tree_index = MuseumTreeIndex(loader=lambda path: None)
+            source = 'offline'
+        elif source == 'drev':
+            self.begin_naming()
+        
+        try:
+            plan = self.plan_files(files_data, dedup_mode, cached_only=True, progress_callback=progress_callback)
+        finally:
+            self.tree_index = tree_index
+            if dedup_mode != DEDUP_OFF:
+                self.get_hash_cache().begin_run()  # Glem planens reservationer
+        
+        keys = ('filename', 'status', 'message', 'folder', 'folder_exists', 'target', 'renamed', 'action')
+        entries = [{key: entry[key] for key in keys} for entry in plan['entries']]
+        
+        return {
+            'entries': entries,
+            'create_folders': plan['create_folders'],
+            'summary': {
+                'planned': sum(1 for entry in entries if entry['status'] == 'planned'),
+                'skipped': sum(1 for entry in entries if entry['status'] == 'skipped'),
+                'errors': sum(1 for entry in entries if entry['status'] == 'error'),
+                'renamed': sum(1 for entry in entries if entry['renamed']),
+                'links': sum(1 for entry in entries if entry['action'] == 'link' and entry['status'] == 'planned'),
+                'create_folders': len(plan['create_folders'])
+            },
+            'source': source,
+            'online': online,
+            'seconds': round(time.monotonic() - started, 3),
+            'fs_stats': self.fs.since(fs_snapshot)
+        }
+    
+    def share_available(self) -> bool:
+        """Er museumsdrevet (base_path) tilgængeligt lige nu"""
+        return self.fs.isdir(self.base_path)
+    
+    def get_hash_cache(self) -> FolderHashCache:
+        """Hash-cache til deduplikering - mapperne listes fra mappe-indexet, hashes deles (get_hash_store)"""
+        if self.hash_cache is None:
+            self.hash_cache = FolderHashCache(lambda folder: self.tree_index.file_stats(folder), fs=self.fs)
+        return self.hash_cache
+    
+    def folder_key(self, filename: str) -> Optional[tuple]:
+        """Målmappens nøgle for et filnavn: ('genstand', nr, år), ('sag', nr) eller None"""
+        file_id = parse_filename(filename)
+        if file_id is None:
+            return None
+        if file_id.kind == KIND_GENSTAND:
+            return ('genstand', file_id.object_number, file_id.year)
+        return ('sag', file_id.case_number)
+    
+    def locate_folder(self, folder_key: tuple) -> Tuple[bool, str]:
+        """
+        Find målmappen for en nøgle uden at oprette noget (svar fra mappe-indexet)
+        Returns: (findes, sti) - findes mappen ikke, er stien den der skal oprettes
+        """
+        if folder_key[0] == 'genstand':
+            _, genstands_nr, registration_year = folder_key
+            decade_path = self.get_genstand_folder_path(genstands_nr, registration_year)
+            existing_folder = self.find_existing_year_folder(decade_path, registration_year)
+            if existing_folder:
+                return True, existing_folder
+            return False, os.path.join(decade_path, str(registration_year))
+        
+        # Traditionelt sagnummer system - eksisterende mappe (evt. med beskrivelse) først
+        case_number = folder_key[1]
+        existing_folder = self.find_existing_case_folder(case_number)
+        if existing_folder:
+            return True, existing_folder
+        return False, self.get_case_folder_path(case_number)
+    
+    def plan_files(self, files_data: List[Dict], dedup_mode: str = DEDUP_OFF, cached_only: bool = False,
+                   progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Planlæg en organisering uden at skrive noget eller spørge brugeren
+        1) fortolk alle filnavne og gruppér dem efter målmappe
+        2) slå hver målmappe op én gang (findes den, eller skal den oprettes)
+        3) tildel unikke filnavne (og find identisk indhold) mappe for mappe
+        cached_only: identisk indhold findes kun ud fra gemte hashes (ingen læsning af målmapperne)
+        Returns: {'entries': [én dict pr. fil i samme rækkefølge som files_data],
+                  'create_folders': [mapper der skal oprettes]}
+        """
+        entries = []
+        groups = {}   # mappe-nøgle -> entries
         
         for file_info in files_data:
             filename = file_info.get('filename', '')
+            entry = {
+                'filename': filename,
+                'file_info': file_info,
+                'status': 'planned',        # 'planned', 'skipped' eller 'error'
+                'message': '',
+                'folder': None,
+                'folder_exists': False,
+                'target': None,
+                'renamed': False,           # Får suffiks fordi navnet er optaget
+                'action': 'write',          # 'write' eller 'link' (identisk indhold)
+                'digest': None
+            }
+            entries.append(entry)
             
-            # Tjek om det er genstands-nummer (med ';')
-            genstand_info = self.extract_genstand_info(filename)
-            if genstand_info:
-                genstands_nr, registration_year = genstand_info
-                
-                try:
-                    # Håndter genstands-nummer
-                    success, target_folder = self.verify_and_create_path_for_genstand(
-                        genstands_nr, registration_year, ask_before_create)
-                    
-                    if not success:
-                        results['errors'].append(target_folder)  # target_folder er fejlbesked her
-                        continue
-                    
-                    target_file_path = os.path.join(target_folder, filename)
-                    
-                except Exception as e:
-                    results['errors'].append(f"Fejl ved organisering af genstand {filename}: {str(e)}")
-                    continue
+            folder_key = self.folder_key(filename)
+            if folder_key is None:
+                entry['status'] = 'skipped'
+                entry['message'] = f"Kunne ikke finde sagnummer eller genstands-nummer i: {filename}"
+                continue
+            groups.setdefault(folder_key, []).append(entry)
+        
+        create_folders = set()
+        name_sets = {}  # mappe -> optagne navne (kopi - indexet ændres først når planen udføres)
+        
+        for done, (folder_key, group) in enumerate(groups.items(), 1):
+            try:
+                folder_exists, folder = self.locate_folder(folder_key)
+            except Exception as e:
+                for entry in group:
+                    entry['status'] = 'error'
+                    entry['message'] = f"Fejl ved organisering af {entry['filename']}: {str(e)}"
+                continue
+            finally:
+                if progress_callback:
+                    progress_callback(done, len(groups))
             
-            else:
-                # Traditionelt sagnummer system
-                case_number = self.extract_case_number(filename)
-                if not case_number:
-                    results['skipped'].append(f"Kunne ikke finde sagnummer eller genstands-nummer i: {filename}")
-                    continue
-                
-                try:
-                    # Verificer/opret mappe
-                    success, message = self.verify_and_create_path(case_number, ask_before_create)
-                    if not success:
-                        results['errors'].append(message)
-                        continue
-                    
-                    # Få target sti - brug eksisterende hvis fundet, ellers den beregnede
-                    existing_folder = self.find_existing_case_folder(case_number)
-                    target_folder = existing_folder if existing_folder else self.get_case_folder_path(case_number)
-                    target_file_path = os.path.join(target_folder, filename)
-                
-                except Exception as e:
-                    results['errors'].append(f"Fejl ved organisering af sag {filename}: {str(e)}")
-                    continue
+            if not folder_exists:
+                create_folders.add(folder)
+            if folder not in name_sets:
+                name_sets[folder] = set(self.taken_names(folder)) if folder_exists else set()
             
-            # Håndter duplikerede filnavne
-            final_file_path = self.get_unique_filename(target_file_path)
-            final_filename = os.path.basename(final_file_path)
+            for entry in group:
+                entry['folder'] = folder
+                entry['folder_exists'] = folder_exists
+                self.plan_entry(entry, name_sets[folder], dedup_mode, cached_only)
+        
+        return {'entries': entries, 'create_folders': sorted(create_folders)}
+    
+    def plan_entry(self, entry: Dict, taken_names: set, dedup_mode: str, cached_only: bool = False):
+        """Find identisk indhold og tildel det endelige navn for én fil i planen"""
+        filename = entry['filename']
+        folder = entry['folder']
+        
+        # Håndter identisk indhold der allerede ligger i mappen
+        if dedup_mode != DEDUP_OFF:
+            try:
+                content = hash_file_info(entry['file_info'])
+            except OSError as e:
+                entry['status'] = 'error'
+                entry['message'] = f"Kunne ikke læse {filename}: {str(e)}"
+                return
             
-            # Kopiér eller flyt filen (fælles for begge typer)
+            if content:
+                size, entry['digest'] = content
+                hash_cache = self.get_hash_cache()
+                duplicate_name = hash_cache.find_duplicate(folder, size, entry['digest'], cached_only)
+                
+                if duplicate_name and dedup_mode == DEDUP_SKIP:
+                    entry['status'] = 'skipped'
+                    entry['message'] = (f"Identisk indhold findes allerede: {filename} = "
+                                        f"{os.path.join(folder, duplicate_name)}")
+                    return
+                
+                if duplicate_name and dedup_mode == DEDUP_LINK and \
+                        duplicate_name in hash_cache.list_folder(folder):
+                    entry['file_info'] = dict(entry['file_info'], link_to=os.path.join(folder, duplicate_name))
+                    entry['action'] = 'link'
+        
+        # Håndter duplikerede filnavne
+        try:
+            entry['target'] = self.get_unique_filename(os.path.join(folder, filename), taken_names)
+        except Exception as e:
+            entry['status'] = 'error'
+            entry['message'] = f"Fejl ved fil-operation for {filename}: {str(e)}"
+            return
+        
+        entry['renamed'] = os.path.basename(entry['target']) != filename
+        if entry['digest']:
+            self.get_hash_cache().reserve(folder, os.path.basename(entry['target']), entry['digest'])
+    
+    def prepare_plan(self, plan: Dict, ask_before_create: bool, results: Dict) -> List[Tuple[Dict, str, Optional[str]]]:
+        """
+        Udfør planens mappe-del: opret manglende mapper efter én samlet bekræftelse
+        og reservér de planlagte navne
+        Returns: (file_info, final_file_path, digest) for de filer der kan placeres
+        """
+        planned_entries = []
+        for entry in plan['entries']:
+            if entry['status'] == 'skipped':
+                results['skipped'].append(entry['message'])
+            elif entry['status'] == 'error':
+                results['errors'].append(entry['message'])
+            else:
+                planned_entries.append(entry)
+        
+        missing_folders = sorted({entry['folder'] for entry in planned_entries if not entry['folder_exists']})
+        refused = set()
+        if missing_folders and ask_before_create and not self.confirm_create_folders(missing_folders):
+            refused = set(missing_folders)
+        
+        failed = {}
+        for folder in missing_folders:
+            if folder in refused:
+                continue
             try:
-                if 'data' in file_info:
-                    # Skriv data direkte til fil
-                    with open(final_file_path, 'wb') as f:
-                        f.write(file_info['data'])
-                    results['success'].append(f"Gemt {final_filename} til {final_file_path}")
-                    
-                elif 'source_path' in file_info:
-                    # Kopiér fra kilde fil
-                    shutil.copy2(file_info['source_path'], final_file_path)
-                    results['success'].append(f"Kopieret {final_filename} til {final_file_path}")
-                    
-                else:
-                    results['errors'].append(f"Ingen data eller kilde sti for {filename}")
-                    
+                self.make_folder(folder)
+                results['created_folders'].add(folder)
             except Exception as e:
-                results['errors'].append(f"Fejl ved fil-operation for {filename}: {str(e)}")
+                failed[folder] = str(e)
+        
+        planned_files = []
+        for entry in planned_entries:
+            folder = entry['folder']
+            if folder in refused or folder in failed:
+                if folder in refused:
+                    results['errors'].append(f"Bruger afviste oprettelse af mappe for {entry['filename']}: {folder}")
+                else:
+                    results['errors'].append(f"Kunne ikke oprette mappe {folder}: {failed[folder]}")
+                if entry['digest']:
+                    self.get_hash_cache().discard(entry['target'], entry['digest'])
+                continue
+            
+            # Navnet er nu optaget for resten af sessionen (frigives igen hvis skrivningen fejler)
+            self.tree_index.add_file(entry['target'])
+            planned_files.append((entry['file_info'], entry['target'], entry['digest']))
         
-        return results
+        return planned_files
+    
+    def confirm_create_folders(self, folders: List[str]) -> bool:
+        """Én samlet bekræftelse for alle mapper der skal oprettes"""
+        shown = [os.path.relpath(folder, self.base_path) for folder in folders[:15]]
+        folder_list = "\n".join(shown)
+        if len(folders) > 15:
+            folder_list += f"\n... og {len(folders) - 15} flere"
+        
+        return messagebox.askyesno(
+            "Opret Mapper?",
+            f"{len(folders)} mapper findes ikke i:\n{self.base_path}\n\n"
+            f"{folder_list}\n\n"
+            f"Skal mapperne oprettes?"
+        )
     
-    def get_existing_cases(self) -> List[str]:
-        """Få liste over eksisterende sagnumre i museum systemet"""
-        existing_cases = []
+    def place_files(self, planned_files: List[Tuple[Dict, str, Optional[str]]], results: Dict,
+                    transfer_mode: str = TRANSFER_COPY, manifest: Optional[ManifestBuilder] = None):
+        """Fase 2: skriv/kopiér alle planlagte filer - resultater i samme rækkefølge som planen"""
+        if not planned_files:
+            return
+        
+        workers = self.max_workers or default_workers(self.base_path)
+        if workers <= 1:
+            outcomes = [self.place_file(planned, transfer_mode, manifest) for planned in planned_files]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(planned_files))) as executor:
+                outcomes = list(executor.map(
+                    lambda planned: self.place_file(planned, transfer_mode, manifest), planned_files))
         
-        try:
-            if not os.path.exists(self.base_path):
-                return existing_cases
+        for (file_info, planned_path, digest), (success, message, final_file_path) in zip(planned_files, outcomes):
+            results['success' if success else 'errors'].append(message)
             
-            # Gennemgå hundred folders
-            for hundred_folder in os.listdir(self.base_path):
-                hundred_path = os.path.join(self.base_path, hundred_folder)
-                if not os.path.isdir(hundred_path):
-                    continue
-                
-                # Gennemgå ten folders
-                for ten_folder in os.listdir(hundred_path):
-                    ten_path = os.path.join(hundred_path, ten_folder)
-                    if not os.path.isdir(ten_path):
-                        continue
-                    
-                    # Gennemgå case folders
-                    for case_folder in os.listdir(ten_path):
-                        case_path = os.path.join(ten_path, case_folder)
-                        if not os.path.isdir(case_path):
-                            continue
-                        
-                        # Udtræk sagnummer fra folder navn
-                        match = re.search(r'Sag (\d{4})', case_folder)
-                        if match:
-                            existing_cases.append(match.group(1))
+            # Hold hash-cachen (og indexets størrelse/mtime) ajour med de skrevne filer
+            stat = None
+            if digest:
+                self.get_hash_cache().discard(planned_path, digest)
+                if success:
+                    stat = self.get_hash_cache().record(final_file_path, digest)
+            if success:
+                # Uden stat (ingen deduplikering) hentes størrelse/mtime først når en senere
+                # kørsel med deduplikering læser mappen (tree_index.file_stats)
+                self.tree_index.add_file(final_file_path, stat)
+    
+    def content_hashes(self, source_path: str, digest: Optional[str], algorithms: Tuple[str, ...]) -> Dict[str, str]:
+        """
+        Manifest-hashes for indhold der ikke streames gennem Python (flyt/hardlink/reflink og links
+        til identiske filer). Målet er her samme bytes som kilden (rename, samme inode eller
+        copy-on-write) - falder en af dem tilbage til kopi, hashes kilden og ikke de skrevne bytes.
+        Deduplikeringens BLAKE2b-256 genbruges - kun andre algoritmer kræver en læsning af kilden
+        """
+        hashes = {BLAKE2B_256: digest} if digest and BLAKE2B_256 in algorithms else {}
+        missing = tuple(algorithm for algorithm in algorithms if algorithm not in hashes)
+        if missing:
+            hashes.update(self.fs.read(source_path, lambda f: hash_stream(f, missing))['hashes'])
+        return hashes
+    
+    def place_file(self, planned: Tuple[Dict, str, Optional[str]], transfer_mode: str = TRANSFER_COPY,
+                   manifest: Optional[ManifestBuilder] = None) -> Tuple[bool, str, str]:
+        """
+        Skriv eller kopiér én fil til sin endelige sti (kører i en arbejdstråd)
+        Navnet reserveres først eksklusivt på drevet - er det taget af en anden arbejdsstation
+        siden planlægningen, bruges næste ledige navn
+        Returns: (success, besked, den faktiske sti)
+        """
+        file_info, final_file_path, digest = planned
+        filename = file_info.get('filename', '')
+        algorithms = manifest.algorithms if manifest else ()
+        
+        try:
+            final_file_path = self.claim_filename(final_file_path, filename)
+        except Exception as e:
+            return False, f"Kunne ikke reservere filnavn for {filename}: {str(e)}", final_file_path
+        
+        final_filename = os.path.basename(final_file_path)
+        temp_path = os.path.join(os.path.dirname(final_file_path),
+                                 f".{final_filename}.{threading.get_ident()}{TEMP_SUFFIX}")
+        
+        def record(size: int, hashes: Dict[str, str]):
+            if manifest is not None:
+                manifest.add(final_file_path, size, hashes,
+                             file_info.get('original_path') or file_info.get('source_path'),
+                             file_info.get('rendition'))
         
+        # Identisk fil findes allerede i mappen - link i stedet for at skrive bytes igen
+        if 'link_to' in file_info:
+            try:
+                self.fs.link(file_info['link_to'], temp_path)
+                self.fs.replace(temp_path, final_file_path)
+                if manifest is not None:
+                    record(self.fs.getsize(final_file_path),
+                           self.content_hashes(final_file_path, digest, algorithms))
+                return True, (f"Linket {final_filename} til {final_file_path} "
+                              f"(identisk med {os.path.basename(file_info['link_to'])})"), final_file_path
+            except OSError:
+                self.remove_quietly(temp_path)  # Hardlinks ikke understøttet på drevet - skriv indholdet i stedet
+        
+        # Kopiér eller flyt filen (fælles for begge typer)
+        try:
+            if 'data' in file_info:
+                # Skriv data direkte i den reserverede fil - hashes beregnes undervejs
+                writer = self.fs.write_bytes(final_file_path, lambda f: HashingWriter(f, algorithms),
+                                             file_info['data'])
+                record(writer.size, writer.digests())
+                return True, f"Gemt {final_filename} til {final_file_path}", final_file_path
+                
+            elif 'source_path' in file_info:
+                # Til en midlertidig fil, der derefter erstatter den reserverede
+                if manifest is not None and transfer_mode == TRANSFER_COPY:
+                    # Kopi med manifest: hash de bytes der faktisk skrives til drevet
+                    written = self.fs.copy_hashed(file_info['source_path'], temp_path, algorithms)
+                    method, size, hashes = "buffer", written['size'], written['hashes']
+                else:
+                    # Flyt/link/klon (eller kopi uden manifest) - hurtigste metode for drevene.
+                    # Hashes tages fra kilden før en evt. flytning (se content_hashes)
+                    hashes = self.content_hashes(file_info['source_path'], digest, algorithms) if manifest else {}
+                    method = self.fs.copy(file_info['source_path'], temp_path, transfer_mode)
+                    size = None
+                self.fs.replace(temp_path, final_file_path)
+                record(size if size is not None else self.fs.getsize(final_file_path), hashes)
+                return True, f"{describe_transfer(method)} {final_filename} til {final_file_path}", final_file_path
+                
+            else:
+                self.release_filename(final_file_path)
+                return False, f"Ingen data eller kilde sti for {filename}", final_file_path
+                
         except Exception as e:
-            print(f"Fejl ved scanning af eksisterende sager: {e}")
+            self.remove_quietly(temp_path)
+            self.release_filename(final_file_path)
+            return False, f"Fejl ved fil-operation for {filename}: {str(e)}", final_file_path
+    
+    def get_existing_cases(self, use_index: bool = False) -> List[str]:
+        """
+        Få liste over eksisterende sagnumre i museum systemet
+        use_index: svar fra det persistente index (museum_db) hvis det er bygget for base_path
+        """
+        if use_index:
+            from .museum_db import get_museum_photo_index
+            photo_index = get_museum_photo_index()
+            if photo_index.base_path == self.base_path and photo_index.get_meta('last_refresh'):
+                return photo_index.existing_cases()
         
-        return sorted(existing_cases)
+        return sorted(case_number for case_number, _ in self.iter_case_folders())
+    
+    def iter_case_folders(self, workers: int = WALK_WORKERS) -> Iterator[Tuple[str, str]]:
+        """Sag-mapper under base_path som (sagnummer, sti) - leveres mens træet scannes parallelt"""
+        return walk_case_folders(self.base_path, workers)
     
-    def get_unique_filename(self, file_path: str) -> str:
+    def make_folder(self, path: str):
+        """Opret mappen (og manglende forældre) og registrér den i indexet"""
+        self.fs.makedirs(path)
+        self.tree_index.add_folder(path)
+    
+    def begin_naming(self):
+        """Ny kørsel - mapper der er scannet for længe siden scannes igen ved første brug"""
+        self.tree_index.expire()
+    
+    def taken_names(self, directory: str) -> set:
+        """Optagne navne i mappen fra indexet (normaliseret efter store/små bogstaver)"""
+        return self.tree_index.names(directory)
+    
+    def claim_filename(self, file_path: str, requested_name: Optional[str] = None) -> str:
+        """
+        Reservér file_path ved at oprette en tom fil eksklusivt (O_EXCL) - atomisk også
+        på tværs af arbejdsstationer på SMB. Er navnet taget, vælges næste ledige navn
+        ud fra requested_name og der forsøges igen
+        Returns: den reserverede sti
+        """
+        directory = os.path.dirname(file_path)
+        requested_path = os.path.join(directory, requested_name or os.path.basename(file_path))
+        
+        for _ in range(MAX_CLAIM_ATTEMPTS):
+            try:
+                self.fs.create_exclusive(file_path)
+                return file_path
+            except FileExistsError:
+                # Taget af en anden - marker navnet og find det næste
+                with self.name_lock:
+                    taken_names = self.taken_names(directory)
+                    taken_names.add(os.path.normcase(os.path.basename(file_path)))
+                    file_path = self.get_unique_filename(requested_path, taken_names)
+        
+        raise Exception(f"Kunne ikke reservere et ledigt filnavn for {os.path.basename(requested_path)}")
+    
+    def release_filename(self, file_path: str):
+        """Fjern en reserveret (tom) fil igen efter en fejl"""
+        try:
+            if self.fs.getsize(file_path) == 0:
+                self.fs.remove(file_path)
+        except OSError:
+            pass
+        self.tree_index.remove_file(file_path)
+    
+    def remove_quietly(self, path: str):
+        """Slet en midlertidig fil hvis den findes"""
+        try:
+            self.fs.remove(path)
+        except OSError:
+            pass
+    
+    def get_unique_filename(self, file_path: str, taken_names: Optional[set] = None) -> str:
         """
         Generer et unikt filnavn for duplikerede filer
         Alle duplikerede filer får a, b, c suffikser - også det første
+        taken_names: navne der allerede er optaget i mappen (standard: fra indexet) - bruges i
+        stedet for listdir/exists pr. fil, og det valgte navn reserveres i sættet
         """
         # Split filnavn og extension
         directory = os.path.dirname(file_path)
         filename = os.path.basename(file_path)
         name, ext = os.path.splitext(filename)
         
+        if taken_names is None:
+            taken_names = self.taken_names(directory)
+        
+        def is_taken(candidate: str) -> bool:
+            return os.path.normcase(candidate) in taken_names
+        
+        def reserve(candidate: str) -> str:
+            taken_names.add(os.path.normcase(candidate))
+            return os.path.join(directory, candidate)
+        
         # Tjek om der allerede findes filer med dette navn (med eller uden suffikser)
-        existing_files = []
-        if os.path.exists(directory):
-            for existing_file in os.listdir(directory):
-                existing_name, existing_ext = os.path.splitext(existing_file)
-                # Tjek for exact match eller files med suffikser
-                if (existing_name == name or 
-                    existing_name.startswith(name + " ")) and existing_ext == ext:
-                    existing_files.append(existing_file)
+        norm_name, norm_ext = os.path.normcase(name), os.path.normcase(ext)
+        has_existing = False
+        for existing_file in taken_names:
+            existing_name, existing_ext = os.path.splitext(existing_file)
+            # Tjek for exact match eller files med suffikser
+            if (existing_name == norm_name or 
+                existing_name.startswith(norm_name + " ")) and existing_ext == norm_ext:
+                has_existing = True
+                break
         
         # Hvis der ikke er duplikater, returner originalt navn
-        if not existing_files and not os.path.exists(file_path):
-            return file_path
+        if not has_existing:
+            return reserve(filename)
         
         # Find næste tilgængelige bogstav
         for i in range(26):  # a-z
-            suffix = chr(ord('a') + i)
-            new_name = f"{name} {suffix}{ext}"
-            new_path = os.path.join(directory, new_name)
-            
-            if not os.path.exists(new_path):
-                return new_path
+            new_name = f"{name} {chr(ord('a') + i)}{ext}"
+            if not is_taken(new_name):
+                return reserve(new_name)
         
         # Hvis alle bogstaver er brugt, brug numre
         counter = 1
         while True:
             new_name = f"{name} {counter}{ext}"
-            new_path = os.path.join(directory, new_name)
-            
-            if not os.path.exists(new_path):
-                return new_path
+            if not is_taken(new_name):
+                return reserve(new_name)
             
             counter += 1
             
@@ -453,32 +743,11 @@ class MuseumOrganizer:
     
     def validate_filename(self, filename: str) -> Tuple[bool, str]:
         """Validér om et filnavn kan organiseres"""
-        
-        # Tjek først for genstands-nummer
-        genstand_info = self.extract_genstand_info(filename)
-        if genstand_info:
-            genstands_nr, registration_year = genstand_info
-            
-            # Validér registreringsår
-            if registration_year < 1900 or registration_year > 2030:
-                return False, f"Registreringsår {registration_year} er uden for gyldigt interval (1900-2030)"
-            
-            return True, f"Gyldigt genstands-nummer: {genstands_nr};{registration_year}"
-        
-        # Ellers tjek for traditionelt sagnummer
-        case_number = self.extract_case_number(filename)
-        
-        if not case_number:
-            return False, "Hverken sagnummer eller genstands-nummer fundet i filnavnet"
-        
-        try:
-            case_num = int(case_number)
-            if case_num < 1 or case_num > 9999:
-                return False, f"Sagnummer {case_number} er uden for gyldigt interval (0001-9999)"
-        except ValueError:
-            return False, f"Sagnummer {case_number} er ikke numerisk"
-        
-        return True, f"Gyldigt sagnummer: {case_number}"
+        return validate_filename(filename)
+    
+    def validate_filenames(self, filenames: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """Validér mange filnavne på én gang - Returns: {filnavn: (gyldig, besked)}"""
+        return validate_filenames(filenames)
 
 
 def test_organizer():
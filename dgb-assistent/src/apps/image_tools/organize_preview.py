@@ -0,0 +1,373 @@
+"""
+Organize Preview - DGB Assistent
+Forhåndsvisning af en museum organisering (dry-run fra MuseumOrganizer.preview_organize):
+hvor hver fil havner, hvilke mapper der oprettes og hvilke navne der får suffiks.
+Her vælges også hvad der sker med filer hvis indhold allerede ligger i målmappen (deduplikering).
+Planen beregnes i en baggrundstråd, så vinduet ikke fryser mens drevet eller indexet slås op.
+"""
+
+import os
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox
+from typing import Dict, List, Optional
+
+from .content_hash import DEDUP_LINK, DEDUP_MODES, DEDUP_OFF, DEDUP_SKIP
+from .museum_organizer import MuseumOrganizer
+from .share_sync import get_share_sync
+
+# Hvor ofte fremdriften fra planlægnings-tråden vises
+PROGRESS_POLL_MS = 100
+
+DEDUP_LABELS = {
+    DEDUP_OFF: "Gem alligevel med nyt navn",
+    DEDUP_SKIP: "Spring over",
+    DEDUP_LINK: "Link til den eksisterende fil"
+}
+
+STATUS_LABELS = {
+    'planned': "Gemmes",
+    'skipped': "Springes over",
+    'error': "Fejl"
+}
+
+
+class OrganizePreviewDialog:
+    """
+    Modal dialog med planen som sorterbar tabel - show() returnerer True hvis brugeren fortsætter
+    Vælger brugeren en anden deduplikering, lukkes dialogen med replan=True og det nye dedup_mode
+    """
+
+    def __init__(self, parent, preview: Dict, base_path: str, confirm_text: str = "Organisér",
+                 dedup_mode: str = DEDUP_OFF):
+        self.parent = parent
+        self.preview = preview
+        self.base_path = base_path
+        self.confirm_text = confirm_text
+        self.dedup_mode = dedup_mode
+        self.dialog = None
+        self.tree = None
+        self.sort_state = {}    # kolonne -> True hvis sorteret faldende
+        self.confirmed = False
+        self.replan = False
+
+    def show(self) -> bool:
+        """Vis dialogen og vent på svar"""
+        self.dialog = tk.Toplevel(self.parent)
+        self.dialog.title("Forhåndsvisning - Museum Organisering")
+        self.dialog.geometry("1000x600")
+        self.dialog.transient(self.parent)
+        self.dialog.grab_set()
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        # Center the dialog
+        self.dialog.update_idletasks()
+        x = (self.dialog.winfo_screenwidth() // 2) - (1000 // 2)
+        y = (self.dialog.winfo_screenheight() // 2) - (600 // 2)
+        self.dialog.geometry(f"1000x600+{x}+{y}")
+
+        self.create_widgets()
+        self.dialog.wait_window()
+        return self.confirmed
+
+    def create_widgets(self):
+        """Opbyg opsummering, tabel og knapper"""
+        main_frame = tk.Frame(self.dialog, bg='#ffffff', padx=20, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        summary = self.preview['summary']
+        title_label = tk.Label(main_frame,
+                               text="🔍 Forhåndsvisning af organisering",
+                               font=('Segoe UI', 14, 'bold'),
+                               fg='#1e293b', bg='#ffffff')
+        title_label.pack(anchor=tk.W)
+
+        summary_text = (f"{summary['planned']} filer gemmes · {summary['create_folders']} nye mapper · "
+                        f"{summary['renamed']} får suffiks · {summary['skipped']} springes over · "
+                        f"{summary['errors']} fejl")
+        if summary['links']:
+            summary_text += f" · {summary['links']} linkes til identiske filer"
+        tk.Label(main_frame, text=summary_text, font=('Segoe UI', 10),
+                 fg='#475569', bg='#ffffff').pack(anchor=tk.W, pady=(4, 0))
+
+        source_text = {'index': "fra det lokale museum index",
+                       'offline': "uden museumsdrevet"}.get(self.preview['source'], "fra museumsdrevet")
+        tk.Label(main_frame,
+                 text=f"Planlagt {source_text} på {self.preview['seconds']:.2f} s - navne kan ændre sig "
+                      f"hvis andre gemmer i de samme mapper inden filerne skrives.",
+                 font=('Segoe UI', 9), fg='#64748b', bg='#ffffff').pack(anchor=tk.W, pady=(0, 10))
+        
+        if not self.preview['online']:
+            tk.Label(main_frame,
+                     text="⚠️ Museumsdrevet er ikke tilgængeligt - filerne lægges i kø lokalt og gemmes "
+                          "når drevet er tilbage. Mapper og navne kontrolleres igen inden de skrives.",
+                     font=('Segoe UI', 9, 'bold'), fg='#b45309', bg='#ffffff',
+                     wraplength=940, justify=tk.LEFT).pack(anchor=tk.W, pady=(0, 10))
+
+        self.create_dedup_choice(main_frame)
+
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+
+        files_frame = tk.Frame(notebook, bg='#ffffff')
+        notebook.add(files_frame, text=f"Filer ({len(self.preview['entries'])})")
+        self.create_file_table(files_frame)
+
+        folders_frame = tk.Frame(notebook, bg='#ffffff')
+        notebook.add(folders_frame, text=f"Nye mapper ({summary['create_folders']})")
+        self.create_folder_list(folders_frame)
+
+        button_frame = tk.Frame(main_frame, bg='#ffffff')
+        button_frame.pack(fill=tk.X)
+
+        cancel_btn = tk.Button(button_frame,
+                               text="Annuller",
+                               font=('Segoe UI', 10),
+                               fg='#475569', bg='#f1f5f9',
+                               activebackground='#e2e8f0',
+                               relief=tk.FLAT, bd=0,
+                               padx=20, pady=10,
+                               cursor='hand2',
+                               command=self.cancel)
+        cancel_btn.pack(side=tk.RIGHT, padx=(10, 0))
+
+        confirm_btn = tk.Button(button_frame,
+                                text=f"{self.confirm_text} {summary['planned']} filer",
+                                font=('Segoe UI', 10, 'bold'),
+                                fg='#ffffff', bg='#10b981',
+                                activebackground='#059669',
+                                relief=tk.FLAT, bd=0,
+                                padx=20, pady=10,
+                                cursor='hand2',
+                                command=self.confirm,
+                                state=tk.NORMAL if summary['planned'] else tk.DISABLED)
+        confirm_btn.pack(side=tk.RIGHT)
+
+    def create_dedup_choice(self, parent):
+        """Valg af deduplikering - et nyt valg planlægger forhåndsvisningen igen"""
+        dedup_frame = tk.Frame(parent, bg='#ffffff')
+        dedup_frame.pack(fill=tk.X, pady=(0, 10))
+        tk.Label(dedup_frame, text="Identisk indhold findes allerede i målmappen:",
+                 font=('Segoe UI', 10), fg='#1e293b', bg='#ffffff').pack(side=tk.LEFT)
+
+        self.dedup_var = tk.StringVar(value=DEDUP_LABELS[self.dedup_mode])
+        dedup_combo = ttk.Combobox(dedup_frame, textvariable=self.dedup_var, state='readonly', width=30,
+                                   values=[DEDUP_LABELS[mode] for mode in DEDUP_MODES])
+        dedup_combo.pack(side=tk.LEFT, padx=(10, 0))
+        dedup_combo.bind('<<ComboboxSelected>>', lambda event: self.change_dedup_mode())
+
+        if self.dedup_mode != DEDUP_OFF:
+            tk.Label(dedup_frame, text="Sammenlignes her med kendte filer - kontrolleres igen når filerne gemmes",
+                     font=('Segoe UI', 9), fg='#64748b', bg='#ffffff').pack(side=tk.LEFT, padx=(10, 0))
+
+    def change_dedup_mode(self):
+        dedup_mode = next(mode for mode, label in DEDUP_LABELS.items() if label == self.dedup_var.get())
+        if dedup_mode == self.dedup_mode:
+            return
+        self.dedup_mode = dedup_mode
+        self.replan = True
+        self.dialog.destroy()
+
+    def create_file_table(self, parent):
+        """Sorterbar tabel med én række pr. fil"""
+        columns = ('filename', 'status', 'target', 'folder', 'new_folder')
+        headings = {
+            'filename': "Fil",
+            'status': "Status",
+            'target': "Gemmes som",
+            'folder': "Mappe",
+            'new_folder': "Ny mappe"
+        }
+        widths = {'filename': 180, 'status': 110, 'target': 180, 'folder': 380, 'new_folder': 80}
+
+        self.tree = ttk.Treeview(parent, columns=columns, show='headings')
+        for column in columns:
+            self.tree.heading(column, text=headings[column],
+                              command=lambda column=column: self.sort_by(column))
+            self.tree.column(column, width=widths[column], anchor=tk.W, stretch=column == 'folder')
+
+        self.tree.tag_configure('renamed', foreground='#b45309')
+        self.tree.tag_configure('skipped', foreground='#64748b')
+        self.tree.tag_configure('error', foreground='#dc2626')
+
+        for entry in self.preview['entries']:
+            status = STATUS_LABELS.get(entry['status'], entry['status'])
+            if entry['status'] == 'planned' and entry['action'] == 'link':
+                status = "Linkes"
+            elif entry['status'] == 'planned' and entry['renamed']:
+                status = "Gemmes (nyt navn)"
+
+            folder = self.relative(entry['folder']) if entry['folder'] else ""
+            target = os.path.basename(entry['target']) if entry['target'] else entry['message']
+            new_folder = "Ja" if entry['folder'] and not entry['folder_exists'] else ""
+
+            tag = entry['status'] if entry['status'] != 'planned' else ('renamed' if entry['renamed'] else '')
+            self.tree.insert('', tk.END, values=(entry['filename'], status, target, folder, new_folder),
+                             tags=(tag,) if tag else ())
+
+        scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def create_folder_list(self, parent):
+        """Liste over mapper der oprettes (godkendes sammen med planen)"""
+        if self.preview['create_folders']:
+            tk.Label(parent, text="Kun disse mapper oprettes - mangler andre mapper når filerne gemmes, "
+                                  "venter filerne på dit valg.",
+                     font=('Segoe UI', 9), fg='#64748b', bg='#ffffff').pack(anchor=tk.W, pady=(0, 6))
+        listbox = tk.Listbox(parent, font=('Segoe UI', 10), relief=tk.FLAT,
+                             highlightthickness=0, bg='#ffffff')
+        for folder in self.preview['create_folders']:
+            listbox.insert(tk.END, self.relative(folder))
+        if not self.preview['create_folders']:
+            listbox.insert(tk.END, "Alle målmapper findes allerede")
+
+        scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=listbox.yview)
+        listbox.configure(yscrollcommand=scrollbar.set)
+        listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def relative(self, path: str) -> str:
+        """Sti relativt til museum base_path"""
+        try:
+            return os.path.relpath(path, self.base_path)
+        except ValueError:
+            return path  # Andet drev på Windows
+
+    def sort_by(self, column: str):
+        """Sortér tabellen efter en kolonne (klik igen for omvendt rækkefølge)"""
+        descending = not self.sort_state.get(column, True)
+        self.sort_state = {column: descending}
+        rows = [(self.tree.set(item, column).lower(), item) for item in self.tree.get_children('')]
+        rows.sort(reverse=descending)
+        for index, (_, item) in enumerate(rows):
+            self.tree.move(item, '', index)
+
+    def confirm(self):
+        self.confirmed = True
+        self.dialog.destroy()
+
+    def cancel(self):
+        self.confirmed = False
+        self.dialog.destroy()
+
+
+class PreviewProgressDialog:
+    """Lille modal dialog med fremdrift mens planen beregnes i baggrunden"""
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.progress = (0, 0)  # (færdige mapper, mapper) - skrives fra planlægnings-tråden
+        self.closed = False
+
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Museum Organisering")
+        self.dialog.geometry("400x120")
+        self.dialog.resizable(False, False)
+        self.dialog.transient(parent)
+        self.dialog.protocol("WM_DELETE_WINDOW", lambda: None)  # Lukkes når planen er klar
+
+        main_frame = tk.Frame(self.dialog, bg='#ffffff', padx=20, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        self.label = tk.Label(main_frame, text="Forbereder forhåndsvisning...",
+                              font=('Segoe UI', 10), fg='#1e293b', bg='#ffffff')
+        self.label.pack(anchor=tk.W, pady=(0, 10))
+        self.progressbar = ttk.Progressbar(main_frame, mode='indeterminate')
+        self.progressbar.pack(fill=tk.X)
+        self.progressbar.start(10)
+
+        self.dialog.grab_set()
+        self.dialog.after(PROGRESS_POLL_MS, self.poll)
+
+    def report(self, done: int, total: int):
+        """Kaldes fra planlægnings-tråden - GUI'en opdateres i poll()"""
+        self.progress = (done, total)
+
+    def poll(self):
+        if self.closed:
+            return
+        done, total = self.progress
+        if total:
+            if str(self.progressbar['mode']) != 'determinate':
+                self.progressbar.stop()
+                self.progressbar.config(mode='determinate', maximum=total)
+            self.progressbar['value'] = done
+            self.label.config(text=f"Forbereder forhåndsvisning... {done}/{total} mapper")
+        self.dialog.after(PROGRESS_POLL_MS, self.poll)
+
+    def close(self):
+        self.closed = True
+        try:
+            self.dialog.grab_release()
+            self.dialog.destroy()
+        except tk.TclError:
+            pass
+
+
+def organize_with_preview(parent, organizer: MuseumOrganizer, files_data: List[Dict],
+                          transfer_mode: Optional[str] = None):
+    """
+    Forhåndsvis og læg filer i kø til museumsdrevet
+    preview_organize kører i en baggrundstråd med en fremdriftsdialog; bagefter vises planen
+    på Tk-tråden, og bekræfter brugeren, lægges filerne i share_sync køen med de planlagte mål
+    og den valgte deduplikering (huskes i organizer.dedup_mode til næste gang).
+    Vender tilbage med det samme - resten sker via parent.after()
+    """
+    share_sync = get_share_sync()
+    organizer.base_path = share_sync.base_path
+
+    def start(dedup_mode: str):
+        progress = PreviewProgressDialog(parent)
+        threading.Thread(target=plan, args=(progress, dedup_mode), daemon=True).start()
+
+    def plan(progress: PreviewProgressDialog, dedup_mode: str):
+        preview, error = None, None
+        try:
+            preview = organizer.preview_organize(files_data, dedup_mode, progress_callback=progress.report)
+        except Exception as e:
+            error = e
+        try:
+            parent.after(0, lambda: finish(progress, dedup_mode, preview, error))
+        except (RuntimeError, tk.TclError):
+            pass  # Vinduet er lukket imens
+
+    def finish(progress: PreviewProgressDialog, dedup_mode: str, preview: Optional[Dict],
+               error: Optional[Exception]):
+        progress.close()
+        if error is not None:
+            messagebox.showerror("Organisering Fejl",
+                                 f"Uventet fejl ved museum organisering:\n{str(error)}", parent=parent)
+            return
+        dialog = OrganizePreviewDialog(parent, preview, share_sync.base_path, dedup_mode=dedup_mode)
+        confirmed = dialog.show()
+        if dialog.replan:
+            organizer.dedup_mode = dialog.dedup_mode
+            start(dialog.dedup_mode)
+            return
+        if not confirmed:
+            return
+
+        try:
+            # Læg filerne i den lokale staging-journal - synkroniseringen til drevet
+            # kører i baggrunden, så vinduet aldrig venter på netværksdrevet
+            # Kun de viste nye mapper er godkendt - mangler andre ved synkroniseringen, venter filen
+            queued = share_sync.enqueue(files_data, [entry['target'] for entry in preview['entries']],
+                                        transfer_mode, preview['create_folders'], dedup_mode)
+            pending = share_sync.pending_count()
+        except Exception as e:
+            messagebox.showerror("Organisering Fejl",
+                                 f"Uventet fejl ved museum organisering:\n{str(e)}", parent=parent)
+            return
+
+        result_msg = f"{queued} billeder lagt i kø til museumsdrevet.\n\n"
+        if not preview['online']:
+            result_msg += "⚠️ Museumsdrevet er ikke tilgængeligt lige nu - filerne gemmes når det er tilbage.\n\n"
+        result_msg += f"Filerne kopieres i baggrunden til:\n{share_sync.base_path}\n\n"
+        result_msg += f"⏳ Venter på synkronisering i alt: {pending} filer\n"
+        result_msg += "Kun de godkendte nye mapper oprettes - mangler andre mapper, venter filerne på dit valg " \
+                      "(klik på køen i hovedvinduet). Er drevet ikke tilgængeligt, forsøges der igen " \
+                      "senere - også efter genstart."
+        messagebox.showinfo("Museum Organisering", result_msg, parent=parent)
+
+    start(organizer.dedup_mode)
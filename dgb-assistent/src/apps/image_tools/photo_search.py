@@ -0,0 +1,276 @@
+"""
+Photo Search - DGB Assistent
+Find alle fotos der allerede ligger på museumsdrevet for et sagnummer eller genstands-nummer.
+Søgningen svarer fra det lokale museum index (museum_db), thumbnails hentes i baggrunden.
+"""
+
+import os
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from tkinter import ttk, messagebox
+from typing import Dict, List
+
+from PIL import Image, ImageTk
+
+from .museum_db import get_museum_photo_index
+from .museum_filename import KIND_GENSTAND
+
+THUMBNAIL_SIZE = (48, 48)
+# Samtidige thumbnail-indlæsninger (hver venter mest på netværket)
+THUMBNAIL_WORKERS = 4
+# Thumbnails hentes kun for de første resultater - resten vises uden billede
+THUMBNAIL_LIMIT = 300
+
+
+def load_thumbnail(path: str) -> Image.Image:
+    """Lille udgave af et billede - JPEG afkodes direkte i reduceret størrelse (draft)"""
+    with Image.open(path) as img:
+        img.draft('RGB', (THUMBNAIL_SIZE[0] * 2, THUMBNAIL_SIZE[1] * 2))
+        img = img.convert('RGB')
+        img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        return img
+
+
+class PhotoSearch:
+    """Søg efter eksisterende fotos for en sag eller genstand"""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.window = None
+        self.photo_index = get_museum_photo_index()
+        self.results = []
+        self.thumbnails = {}        # sti -> PhotoImage (referencer skal holdes i live)
+        self.search_generation = 0  # Thumbnails fra en tidligere søgning kasseres
+        self.thumbnail_pool = None
+
+    def show(self):
+        """Show the photo search window"""
+        if self.window is None or not self.window.winfo_exists():
+            self.create_window()
+        else:
+            self.window.lift()
+            self.window.focus_force()
+
+    def on_close(self):
+        """Luk vinduet og stop thumbnail-indlæsning"""
+        self.search_generation += 1
+        if self.thumbnail_pool is not None:
+            self.thumbnail_pool.shutdown(wait=False, cancel_futures=True)
+            self.thumbnail_pool = None
+        self.thumbnails.clear()
+        self.window.destroy()
+
+    def create_window(self):
+        """Create the main window"""
+        self.window = tk.Toplevel(self.parent) if self.parent else tk.Tk()
+        self.window.title("Find Fotos - DGB Assistent")
+        self.window.geometry("950x650")
+        self.window.configure(bg='#f8fafc')
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.thumbnail_pool = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+        self.create_interface()
+        self.update_index_status()
+        self.search_entry.focus_set()
+
+    def create_interface(self):
+        """Create the user interface"""
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+        title_label = tk.Label(main_frame,
+                               text="🔎 Find Fotos",
+                               font=('Segoe UI', 18, 'bold'),
+                               fg='#0f172a', bg='#f8fafc')
+        title_label.pack(anchor=tk.W)
+
+        desc_label = tk.Label(main_frame,
+                              text="Søg på sagnummer (1234, Sag 1234, 1234x0005) eller genstands-nummer (00073;15)",
+                              font=('Segoe UI', 10),
+                              fg='#475569', bg='#f8fafc')
+        desc_label.pack(anchor=tk.W, pady=(0, 15))
+
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var, font=('Segoe UI', 12))
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.search_entry.bind('<Return>', lambda e: self.search())
+
+        search_btn = tk.Button(search_frame,
+                               text="Søg",
+                               font=('Segoe UI', 10, 'bold'),
+                               fg='#ffffff', bg='#3b82f6',
+                               activebackground='#2563eb',
+                               relief=tk.FLAT, bd=0,
+                               padx=20, pady=6,
+                               cursor='hand2',
+                               command=self.search)
+        search_btn.pack(side=tk.LEFT, padx=(10, 0))
+
+        self.summary_label = tk.Label(main_frame, text="", font=('Segoe UI', 10),
+                                      fg='#475569', bg='#f8fafc')
+        self.summary_label.pack(anchor=tk.W, pady=(0, 5))
+
+        # Resultater - thumbnail i træ-kolonnen
+        results_frame = ttk.Frame(main_frame)
+        results_frame.pack(fill=tk.BOTH, expand=True)
+
+        style = ttk.Style(self.window)
+        style.configure('PhotoSearch.Treeview', rowheight=THUMBNAIL_SIZE[1] + 6)
+
+        columns = ('name', 'folder', 'size', 'modified')
+        self.tree = ttk.Treeview(results_frame, columns=columns, show='tree headings',
+                                 style='PhotoSearch.Treeview')
+        self.tree.column('#0', width=THUMBNAIL_SIZE[0] + 20, stretch=False)
+        self.tree.heading('name', text="Fil")
+        self.tree.heading('folder', text="Mappe")
+        self.tree.heading('size', text="Størrelse")
+        self.tree.heading('modified', text="Ændret")
+        self.tree.column('name', width=200, anchor=tk.W)
+        self.tree.column('folder', width=420, anchor=tk.W)
+        self.tree.column('size', width=80, anchor=tk.E, stretch=False)
+        self.tree.column('modified', width=120, anchor=tk.W, stretch=False)
+        self.tree.bind('<Double-1>', self.open_selected)
+
+        scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Index status og opdatering
+        status_frame = ttk.Frame(main_frame)
+        status_frame.pack(fill=tk.X, pady=(10, 0))
+
+        self.index_label = tk.Label(status_frame, text="", font=('Segoe UI', 9),
+                                    fg='#64748b', bg='#f8fafc')
+        self.index_label.pack(side=tk.LEFT)
+
+        self.refresh_btn = tk.Button(status_frame,
+                                     text="🔄 Opdatér index",
+                                     font=('Segoe UI', 9),
+                                     fg='#475569', bg='#f1f5f9',
+                                     activebackground='#e2e8f0',
+                                     relief=tk.FLAT, bd=0,
+                                     padx=12, pady=4,
+                                     cursor='hand2',
+                                     command=self.refresh_index)
+        self.refresh_btn.pack(side=tk.RIGHT)
+
+    def update_index_status(self):
+        """Vis hvor stort indexet er og hvornår det sidst blev opdateret"""
+        stats = self.photo_index.statistics()
+        if self.photo_index.refreshing:
+            text = "Opdaterer museum index..."
+        elif not stats['last_refresh']:
+            text = "Museum index er ikke bygget endnu - klik 'Opdatér index' (første gang tager det lidt tid)"
+        else:
+            text = (f"Index: {stats['files']} filer i {stats['folders']} mapper · "
+                    f"opdateret {stats['last_refresh'].replace('T', ' ')}")
+        self.index_label.config(text=text)
+        self.refresh_btn.config(state=tk.DISABLED if self.photo_index.refreshing else tk.NORMAL)
+
+    def refresh_index(self):
+        """Opdatér indexet fra museumsdrevet i baggrunden"""
+        def done(stats: Dict):
+            if self.window is not None and self.window.winfo_exists():
+                self.window.after(0, lambda: self.refresh_complete(stats))
+
+        if self.photo_index.start_refresh(done_callback=done):
+            self.update_index_status()
+
+    def refresh_complete(self, stats: Dict):
+        if not self.window.winfo_exists():
+            return
+        self.update_index_status()
+        if 'error' in stats:
+            messagebox.showerror("Fejl", f"Kunne ikke opdatere museum index:\n{stats['error']}", parent=self.window)
+        elif self.search_var.get().strip():
+            self.search()
+
+    def search(self):
+        """Slå sagnummer/genstands-nummer op i indexet og vis resultaterne"""
+        query = self.search_var.get().strip()
+        if not query:
+            return
+
+        result = self.photo_index.find_photos(query)
+        file_id = result['query']
+        if file_id is None:
+            self.show_results([])
+            self.summary_label.config(text="Hverken sagnummer eller genstands-nummer fundet i søgningen",
+                                      fg='#dc2626')
+            return
+
+        if file_id.kind == KIND_GENSTAND:
+            label = f"genstand {file_id.object_number};{file_id.year}"
+        elif file_id.object_number:
+            label = f"sag {file_id.case_number}x{file_id.object_number}"
+        else:
+            label = f"sag {file_id.case_number}"
+
+        self.show_results(result['files'])
+        total_kb = sum(item['size'] for item in result['files']) / 1024
+        if result['folders']:
+            summary = (f"{len(result['files'])} fotos for {label} i {len(result['folders'])} mapper · "
+                       f"{total_kb:,.0f} KB · {result['seconds'] * 1000:.0f} ms")
+        else:
+            summary = f"Ingen mapper fundet for {label}"
+        self.summary_label.config(text=summary, fg='#475569')
+
+    def show_results(self, files: List[Dict]):
+        """Udfyld tabellen og start indlæsning af thumbnails"""
+        self.search_generation += 1
+        generation = self.search_generation
+        self.results = files
+        self.thumbnails.clear()
+        self.tree.delete(*self.tree.get_children(''))
+
+        base_path = self.photo_index.base_path
+        for index, item in enumerate(files):
+            try:
+                folder = os.path.relpath(item['folder'], base_path)
+            except ValueError:
+                folder = item['folder']  # Andet drev på Windows
+            modified = datetime.fromtimestamp(item['mtime']).strftime('%Y-%m-%d %H:%M')
+            self.tree.insert('', tk.END, iid=str(index),
+                             values=(item['name'], folder, f"{item['size'] / 1024:,.0f} KB", modified))
+
+        for index, item in enumerate(files[:THUMBNAIL_LIMIT]):
+            self.thumbnail_pool.submit(self.load_thumbnail, generation, index, item['path'])
+
+    def load_thumbnail(self, generation: int, index: int, path: str):
+        """Baggrundstråd: læs og skalér billedet - PhotoImage oprettes i GUI-tråden"""
+        if generation != self.search_generation:
+            return
+        try:
+            img = load_thumbnail(path)
+        except Exception as e:
+            print(f"Fejl ved indlæsning af thumbnail for {path}: {e}")
+            return
+        try:
+            self.window.after(0, lambda: self.set_thumbnail(generation, index, path, img))
+        except (RuntimeError, tk.TclError):
+            pass  # Vinduet er lukket
+
+    def set_thumbnail(self, generation: int, index: int, path: str, img: Image.Image):
+        if generation != self.search_generation or not self.tree.exists(str(index)):
+            return
+        photo = ImageTk.PhotoImage(img)
+        self.thumbnails[path] = photo
+        self.tree.item(str(index), image=photo)
+
+    def open_selected(self, event=None):
+        """Åbn det valgte foto i standardprogrammet"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        path = self.results[int(selection[0])]['path']
+        try:
+            os.startfile(path)
+        except AttributeError:
+            messagebox.showinfo("Foto", path, parent=self.window)  # os.startfile findes kun på Windows
+        except OSError as e:
+            messagebox.showerror("Fejl", f"Kunne ikke åbne {path}:\n{e}", parent=self.window)
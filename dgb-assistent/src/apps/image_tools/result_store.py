@@ -0,0 +1,164 @@
+"""
+Result Store - DGB Assistent
+Holder behandlede renditions som kompakte referencer. Små payloads bliver i hukommelsen,
+store (fx kvalitet-100 JPEG'er) spildes til en midlertidig mappe på disken.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from typing import BinaryIO, Dict, Optional, Union
+
+# Payloads over denne størrelse skrives altid til disk
+DEFAULT_SPILL_THRESHOLD_KB = 1024
+
+# Samlet loft for payloads i hukommelsen (kan overstyres med miljøvariabel)
+DEFAULT_MEMORY_LIMIT_MB = int(os.environ.get("DGB_RESULT_MEMORY_LIMIT_MB", "256"))
+
+# Præfiks for spill-mapper - bruges også til at finde efterladte mapper efter nedbrud
+STORE_DIR_PREFIX = "dgb-results-"
+
+
+class StoredPayload:
+    """Reference til én rendition - enten bytes i hukommelsen eller en spill-fil"""
+
+    __slots__ = ('size', 'data', 'path')
+
+    def __init__(self, size: int, data: Optional[bytes] = None, path: Optional[str] = None):
+        self.size = size
+        self.data = data
+        self.path = path
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+    def open(self) -> BinaryIO:
+        """Åbn payload til streaming læsning"""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return open(self.path, 'rb')
+
+    def read(self) -> bytes:
+        """Læs hele payload (undgå for store filer)"""
+        if self.data is not None:
+            return self.data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def as_source(self) -> Union[bytes, str]:
+        """Kilde til zip_export: bytes eller sti til spill-filen"""
+        return self.data if self.data is not None else self.path
+
+    def file_info(self, filename: str) -> Dict:
+        """files_data entry til MuseumOrganizer.organize_files"""
+        if self.data is not None:
+            return {'filename': filename, 'data': self.data}
+        return {'filename': filename, 'source_path': self.path}
+
+    def write_to(self, target_path: str):
+        """Stream payload til en fil"""
+        if self.data is not None:
+            with open(target_path, 'wb') as f:
+                f.write(self.data)
+        else:
+            shutil.copyfile(self.path, target_path)
+
+
+def _process_alive(pid: int) -> bool:
+    """Tjek om en proces stadig kører (bruges ved oprydning af efterladte mapper)"""
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def cleanup_stale_stores(temp_root: Optional[str] = None) -> int:
+    """Fjern spill-mapper efterladt af processer der ikke længere kører (fx efter nedbrud)"""
+    temp_root = temp_root or tempfile.gettempdir()
+    removed = 0
+    try:
+        entries = list(os.scandir(temp_root))
+    except OSError:
+        return 0
+
+    for entry in entries:
+        if not entry.name.startswith(STORE_DIR_PREFIX) or not entry.is_dir():
+            continue
+        try:
+            pid = int(entry.name[len(STORE_DIR_PREFIX):].split("-", 1)[0])
+        except ValueError:
+            continue
+        if not _process_alive(pid):
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+class ResultStore:
+    """Lager for behandlede renditions med spill-to-disk over en konfigurerbar grænse"""
+
+    def __init__(self, memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB,
+                 spill_threshold_kb: int = DEFAULT_SPILL_THRESHOLD_KB,
+                 temp_root: Optional[str] = None):
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.spill_threshold = spill_threshold_kb * 1024
+        self.memory_used = 0
+        self.spilled_bytes = 0
+        self.lock = threading.Lock()
+        self.counter = 0
+
+        cleanup_stale_stores(temp_root)
+        self.directory = tempfile.mkdtemp(prefix=f"{STORE_DIR_PREFIX}{os.getpid()}-", dir=temp_root)
+
+        # Oprydning ved close(), garbage collection eller normal programafslutning
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+    def put(self, data: bytes, suffix: str = ".jpg") -> StoredPayload:
+        """Gem en payload og returnér referencen"""
+        size = len(data)
+        with self.lock:
+            keep_in_memory = (size <= self.spill_threshold and
+                              self.memory_used + size <= self.memory_limit)
+            if keep_in_memory:
+                self.memory_used += size
+            self.counter += 1
+            index = self.counter
+
+        if keep_in_memory:
+            return StoredPayload(size, data=data)
+
+        path = os.path.join(self.directory, f"{index:06d}{suffix}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        with self.lock:
+            self.spilled_bytes += size
+        return StoredPayload(size, path=path)
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self):
+        """Slet alle spill-filer"""
+        self._finalizer()
+        self.memory_used = 0
+        self.spilled_bytes = 0
@@ -0,0 +1,610 @@
+"""
+Share Sync - DGB Assistent
+Write-back staging til museumsdrevet. Organisering lægger filerne i en lokal journal
+med det samme (hurtigt, uafhængigt af netværket), og en baggrundstråd skubber dem til
+M: med genforsøg, genoptagelse af afbrudte kopier og valgfri båndbreddegrænse.
+
+Journalen består af én <id>.dat (indhold) og én <id>.json (post) pr. fil - posten skrives
+sidst, så en fil først er "committet" når posten findes.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .fast_copy import TRANSFER_COPY, transfer_file
+from .file_writer import NETWORK_WORKERS
+from .manifest import MUSEUM_MANIFEST_DIR, HashingWriter, ManifestBuilder, hash_stream
+from .museum_fs import MuseumFilesystem, format_fs_stats
+from .museum_organizer import MUSEUM_BASE_PATH, MuseumOrganizer
+
+STAGING_DIR = Path.home() / "AppData" / "Local" / "DGB-Assistent" / "staging"
+
+# Båndbreddegrænse for synkronisering (0 = ubegrænset)
+SYNC_BANDWIDTH_KBPS = int(os.environ.get("DGB_SYNC_BANDWIDTH_KBPS", "0"))
+
+# Genforsøg med eksponentiel ventetid
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+
+POLL_SECONDS = 10       # Hvor ofte drevet tjekkes når der er ventende filer
+SYNC_BATCH_SIZE = 50    # Filer pr. planlægningsrunde
+SYNC_WORKERS = NETWORK_WORKERS  # Samtidige kopier til drevet
+COPY_CHUNK_SIZE = 1024 * 1024
+PARTIAL_SUFFIX = ".dgbpart"
+
+
+class BandwidthLimiter:
+    """Simpel token bucket - consume() sover så gennemsnittet holdes under grænsen"""
+
+    def __init__(self, kbps: int):
+        self.rate = kbps * 1024
+        self.allowance = float(self.rate)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()    # Grænsen deles af alle kopi-tråde
+
+    def consume(self, amount: int):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(float(self.rate), self.allowance + (now - self.last) * self.rate)
+            self.last = now
+            self.allowance -= amount
+            if self.allowance < 0:
+                time.sleep(-self.allowance / self.rate)
+
+
+class StagingArea:
+    """Lokal journal-mappe med filer der venter på at blive skrevet til museumsdrevet"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else STAGING_DIR
+        self.lock = threading.Lock()
+        self.counter = 0
+
+    def new_id(self) -> str:
+        with self.lock:
+            self.counter += 1
+            return f"{time.time_ns()}-{os.getpid()}-{self.counter:04d}"
+
+    def payload_path(self, item_id: str) -> str:
+        return str(self.directory / f"{item_id}.dat")
+
+    def record_path(self, item_id: str) -> Path:
+        return self.directory / f"{item_id}.json"
+
+    def stage(self, files_data: List[Dict], planned_targets: Optional[List[Optional[str]]] = None,
+              transfer_mode: str = TRANSFER_COPY, approved_folders: Optional[List[str]] = None,
+              dedup_mode: Optional[str] = None) -> List[Dict]:
+        """
+        Læg filer i journalen ('data' eller 'source_path' som i organize_files)
+        planned_targets: målstier fra forhåndsvisningen (gemmes så afvigelser kan rapporteres)
+        transfer_mode: hvordan source_path filer lægges i journalen (se fast_copy.TRANSFER_MODES) -
+        fx 'hardlink' for filer der aldrig ændres, så intet kopieres på samme drev
+        approved_folders: nye mapper brugeren har godkendt i forhåndsvisningen - posten husker
+        sin planlagte mappe hvis den er godkendt (andre manglende mapper oprettes ikke)
+        dedup_mode: valgt deduplikering (se content_hash) - gemmes i posten, så genoptagede
+        poster planlægges på samme måde (None = workerens organizer.dedup_mode)
+        Returns: de oprettede poster
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        approved = {os.path.normcase(folder) for folder in approved_folders or ()}
+        records = []
+        for index, file_info in enumerate(files_data):
+            item_id = self.new_id()
+            payload_path = self.payload_path(item_id)
+
+            if 'data' in file_info:
+                with open(payload_path, 'wb') as f:
+                    f.write(file_info['data'])
+            elif 'source_path' in file_info:
+                transfer_file(file_info['source_path'], payload_path, transfer_mode)
+            else:
+                continue
+
+            planned_target = planned_targets[index] if planned_targets else None
+            planned_folder = os.path.dirname(planned_target) if planned_target else None
+            record = {
+                'id': item_id,
+                'filename': file_info.get('filename', ''),
+                'size': os.path.getsize(payload_path),
+                'original_path': file_info.get('original_path') or file_info.get('source_path'),
+                'rendition': file_info.get('rendition'),
+                'staged': datetime.now().isoformat(timespec='seconds'),
+                'attempts': 0,
+                'next_attempt': 0.0,
+                'last_error': None,
+                'planned_target': planned_target,
+                'approved_folder': planned_folder if planned_folder and
+                                   os.path.normcase(planned_folder) in approved else None,
+                'conflict': None,   # Manglende mappe der ikke er godkendt - venter på brugeren
+                'dedup_mode': dedup_mode,
+                'target': None      # Endelig sti på drevet når den er tildelt (planlægges mod drevet)
+            }
+            self.save_record(record)
+            records.append(record)
+        return records
+
+    def save_record(self, record: Dict):
+        """Skriv posten atomisk"""
+        record_path = self.record_path(record['id'])
+        temp_path = record_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(temp_path, record_path)
+
+    def load_record(self, item_id: str) -> Optional[Dict]:
+        """Én post fra journalen (None hvis den er fjernet)"""
+        try:
+            with open(self.record_path(item_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def records(self) -> List[Dict]:
+        """Alle ventende poster i den rækkefølge de blev lagt i kø"""
+        records = []
+        try:
+            entries = sorted(self.directory.glob("*.json"))
+        except OSError:
+            return records
+        for record_path in entries:
+            try:
+                with open(record_path, 'r', encoding='utf-8') as f:
+                    records.append(json.load(f))
+            except Exception as e:
+                print(f"Ugyldig staging post {record_path.name}: {e}")
+        return records
+
+    def remove(self, item_id: str):
+        """Fjern en færdig post og dens indhold"""
+        for path in (self.record_path(item_id), Path(self.payload_path(item_id))):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def copy_resumable(source_path: str, partial_path: str, limiter: BandwidthLimiter,
+                   algorithms=(), fs: Optional[MuseumFilesystem] = None) -> Dict:
+    """
+    Kopiér til partial_path og fortsæt hvor en tidligere kopi slap
+    fs: drevets instrumenterede lag - kopien tidtages som 'copy'
+    Returns: {'size', 'hashes'} (hashes af hele filen)
+    """
+    fs = fs or MuseumFilesystem()
+    source_size = os.path.getsize(source_path)
+    offset = fs.getsize(partial_path) if fs.exists(partial_path) else 0
+    if offset > source_size:
+        offset = 0
+
+    with fs.timed('copy'), open(source_path, 'rb') as src, \
+            open(partial_path, 'r+b' if offset else 'wb') as dest:
+        # Hash den allerede kopierede del fra den lokale kilde (billigt) og fortsæt i strømmen
+        writer = HashingWriter(dest, algorithms)
+        if offset:
+            dest.seek(offset)
+            dest.truncate()
+            remaining = offset
+            while remaining:
+                block = src.read(min(COPY_CHUNK_SIZE, remaining))
+                for hasher in writer.hashers.values():
+                    hasher.update(block)
+                remaining -= len(block)
+            writer.size = offset
+
+        while True:
+            block = src.read(COPY_CHUNK_SIZE)
+            if not block:
+                break
+            limiter.consume(len(block))
+            writer.write(block)
+        dest.flush()
+        os.fsync(dest.fileno())
+
+    return {'size': writer.size, 'hashes': writer.digests()}
+
+
+class ShareSyncWorker:
+    """Baggrundstråd der tømmer staging-journalen til museumsdrevet"""
+
+    def __init__(self, staging: Optional[StagingArea] = None, base_path: str = MUSEUM_BASE_PATH,
+                 bandwidth_kbps: int = SYNC_BANDWIDTH_KBPS):
+        self.staging = staging or StagingArea()
+        self.base_path = base_path
+        self.limiter = BandwidthLimiter(bandwidth_kbps)
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.listeners = []
+        self.status = {'online': None, 'pending': 0, 'retrying': 0, 'skipped': 0, 'held': 0, 'last_sync': None,
+                       'last_error': None, 'conflicts': 0,
+                       'fs_stats': None}   # fs_stats: drev-kald i seneste batch (MuseumFilesystem.since)
+        self.history = []   # Seneste afsluttede/afviste filer: {'filename', 'result', 'message', 'time', 'conflict'}
+        self.organizer = None
+        self.transfer_mode = TRANSFER_COPY  # Standard for source_path filer ind i journalen
+        self.lock = threading.Lock()    # status, historik og hash-cache deles af kopi-trådene
+        self.retry_requested = False    # Næste runde ignorerer ventetiden for genforsøg
+
+    # Livscyklus
+    def start(self):
+        """Start tråden (genoptager poster fra tidligere sessioner)"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop efter den igangværende fil (resten bliver i journalen til næste start)"""
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def wake(self):
+        """Forsøg synkronisering nu (fx lige efter nye filer er lagt i kø)"""
+        self.wake_event.set()
+
+    def retry_now(self):
+        """Forsøg også filer der venter på genforsøg med det samme"""
+        self.retry_requested = True
+        self.wake()
+
+    # Status
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """callback(status) kaldes fra baggrundstråden ved ændringer"""
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Dict], None]):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def notify(self):
+        for callback in list(self.listeners):
+            try:
+                callback(dict(self.status))
+            except Exception as e:
+                print(f"Sync listener fejl: {e}")
+
+    def pending_items(self) -> List[Dict]:
+        """Filer der endnu ikke er skrevet til drevet"""
+        return self.staging.records()
+
+    def pending_count(self) -> int:
+        return len(self.pending_items())
+
+    def approve_folder(self, item_id: str) -> bool:
+        """
+        Brugeren godkender den manglende mappe for en tilbageholdt post - den oprettes og
+        filen gemmes i næste runde (kaldes fra GUI-tråden; tilbageholdte poster røres ikke af tråden)
+        Returns: False hvis posten ikke (længere) venter på godkendelse
+        """
+        record = self.staging.load_record(item_id)
+        if not record or not record.get('conflict'):
+            return False
+        record['approved_folder'] = record['conflict']['folder']
+        record['conflict'] = None
+        record['next_attempt'] = 0.0
+        self.staging.save_record(record)
+        with self.lock:
+            self.status['held'] = max(0, self.status['held'] - 1)
+        self.notify()
+        self.wake()
+        return True
+
+    def discard(self, item_id: str) -> bool:
+        """
+        Fjern en tilbageholdt post fra køen uden at gemme den (kaldes fra GUI-tråden)
+        Returns: False hvis posten ikke (længere) venter på godkendelse
+        """
+        record = self.staging.load_record(item_id)
+        if not record or not record.get('conflict'):
+            return False
+        self.finish(record, 'removed', f"{record['filename']} fjernet fra køen - "
+                                       f"mappen blev ikke oprettet: {record['conflict']['folder']}")
+        return True
+
+    def history_items(self) -> List[Dict]:
+        """Kopi af historikken, nyeste først (kan kaldes fra GUI-tråden)"""
+        with self.lock:
+            return list(reversed(self.history))
+
+    def conflict_items(self) -> List[Dict]:
+        """Filer gemt et andet sted end planlagt i forhåndsvisningen (status['conflicts']), nyeste først"""
+        return [item for item in self.history_items() if item.get('conflict')]
+
+    def share_available(self) -> bool:
+        """Er museumsdrevet tilgængeligt (kan tage tid på et afbrudt drev - kun fra tråden)"""
+        return self.get_organizer().share_available()
+
+    def get_organizer(self) -> MuseumOrganizer:
+        """Organizer der altid bruger workerens base_path"""
+        if self.organizer is None:
+            self.organizer = MuseumOrganizer()
+        self.organizer.base_path = self.base_path
+        return self.organizer
+
+    # Arbejdstråd
+    def enqueue(self, files_data: List[Dict], planned_targets: Optional[List[Optional[str]]] = None,
+                transfer_mode: Optional[str] = None, approved_folders: Optional[List[str]] = None,
+                dedup_mode: Optional[str] = None) -> int:
+        """
+        Læg filer i journalen og væk tråden - virker også når drevet er nede
+        planned_targets: målstier fra forhåndsvisningen i samme rækkefølge som files_data
+        transfer_mode: hvordan source_path filer lægges i journalen (standard: self.transfer_mode)
+        approved_folders: nye mapper brugeren har godkendt (forhåndsvisningens create_folders) -
+        kun de oprettes; mangler en anden mappe, tilbageholdes filen (se hold)
+        dedup_mode: valgt deduplikering for filerne (gemmes i journalen)
+        Returns: antal lagt i kø
+        """
+        records = self.staging.stage(files_data, planned_targets, transfer_mode or self.transfer_mode,
+                                     approved_folders, dedup_mode)
+        self.status['pending'] = self.pending_count()
+        self.notify()
+        self.start()
+        self.wake()
+        return len(records)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                records = self.pending_items()
+                self.status['pending'] = len(records)
+                self.status['retrying'] = sum(1 for record in records if record.get('attempts'))
+                self.status['held'] = sum(1 for record in records if record.get('conflict'))
+                if records:
+                    online = self.share_available()
+                    if online != self.status['online']:
+                        self.status['online'] = online
+                        self.notify()
+                    if online:
+                        self.sync_once(records)
+            except Exception as e:
+                self.status['last_error'] = str(e)
+                print(f"Synkroniseringsfejl: {e}")
+            self.notify()
+
+            self.wake_event.wait(POLL_SECONDS)
+            self.wake_event.clear()
+
+    def sync_once(self, records: List[Dict]):
+        """Synkronisér de poster der er klar til (gen)forsøg"""
+        now = float('inf') if self.retry_requested else time.time()
+        self.retry_requested = False
+        # Tilbageholdte poster venter på brugeren (approve_folder/discard) - ikke på genforsøg
+        due = [record for record in records
+               if not record.get('conflict') and record.get('next_attempt', 0) <= now][:SYNC_BATCH_SIZE]
+        if not due:
+            return
+
+        organizer = self.get_organizer()
+        fs_snapshot = organizer.fs.snapshot()
+        organizer.begin_naming()
+        # Hver post planlægges med den deduplikering brugeren valgte da den blev lagt i kø
+        dedup_modes = {record['id']: record.get('dedup_mode') or organizer.dedup_mode for record in due}
+        manifest = ManifestBuilder('organize', self.base_path,
+                                   {'sync': True, 'dedup_mode': ",".join(sorted(set(dedup_modes.values())))})
+
+        # Poster uden tildelt mål planlægges samlet pr. deduplikering (hver mappe slås op én gang) -
+        # navnene fra en gruppe er registreret i indexet inden den næste planlægges
+        to_plan = [record for record in due if not record.get('target')]
+        if to_plan:
+            organizer.get_hash_cache().begin_run()
+        for dedup_mode in sorted({dedup_modes[record['id']] for record in to_plan}):
+            group = [record for record in to_plan if dedup_modes[record['id']] == dedup_mode]
+            plan = organizer.plan_files([{'filename': record['filename'],
+                                          'source_path': self.staging.payload_path(record['id'])}
+                                         for record in group], dedup_mode)
+            for record, entry in zip(group, plan['entries']):
+                if entry['status'] == 'planned':
+                    record['target'] = entry['target']
+                    record['digest'] = entry['digest']
+                    record['link_to'] = entry['file_info'].get('link_to')
+                    organizer.tree_index.add_file(entry['target'])
+                    self.staging.save_record(record)
+                elif entry['status'] == 'skipped':
+                    # Fx ugyldigt filnavn eller identisk indhold - forsøges ikke igen
+                    self.finish(record, 'skipped', entry['message'])
+                else:
+                    self.schedule_retry(record, entry['message'])
+
+        # Kopiér parallelt - navne reserveres eksklusivt, så trådene ikke kan tage samme navn
+        ready = [record for record in due
+                 if record.get('target') and os.path.exists(self.staging.record_path(record['id']))]
+        if ready:
+            def push(record: Dict):
+                if not self.stop_event.is_set():
+                    self.push_record(record, organizer, manifest)
+
+            with ThreadPoolExecutor(max_workers=min(SYNC_WORKERS, len(ready))) as executor:
+                list(executor.map(push, ready))
+
+        organizer.get_hash_cache().save()
+        if manifest.files:
+            try:
+                with organizer.fs.timed('manifest'):
+                    manifest.write(self.manifest_path(manifest, organizer.fs))
+            except Exception as e:
+                print(f"Kunne ikke skrive manifest: {e}")
+        self.status['last_sync'] = datetime.now().isoformat(timespec='seconds')
+        self.status['fs_stats'] = organizer.fs.since(fs_snapshot)
+        print(f"Synkronisering ({len(due)} filer): {format_fs_stats(self.status['fs_stats'])}")
+
+    def manifest_path(self, manifest: ManifestBuilder, fs: MuseumFilesystem) -> str:
+        """Manifest-sti der ikke overskriver en tidligere batch fra samme sekund"""
+        manifest_dir = os.path.join(self.base_path, MUSEUM_MANIFEST_DIR)
+        base_name, extension = os.path.splitext(manifest.default_filename())
+        manifest_path = os.path.join(manifest_dir, base_name + extension)
+        counter = 1
+        while fs.exists(manifest_path):
+            manifest_path = os.path.join(manifest_dir, f"{base_name}_{counter}{extension}")
+            counter += 1
+        return manifest_path
+
+    def push_record(self, record: Dict, organizer: MuseumOrganizer, manifest: ManifestBuilder):
+        """
+        Kopiér én post til drevet (genoptager en afbrudt kopi)
+        Det endelige navn reserveres eksklusivt først når kopien er færdig - er det planlagte
+        navn taget af en anden arbejdsstation i mellemtiden, bruges næste ledige
+        Kun mapper brugeren har godkendt oprettes - mangler en anden mappe, tilbageholdes posten
+        """
+        target_path = record['target']
+        payload_path = self.staging.payload_path(record['id'])
+        # Delvis kopi navngives efter posten, så to poster med samme planlagte navn ikke deler den
+        partial_path = os.path.join(os.path.dirname(target_path), f".{record['id']}{PARTIAL_SUFFIX}")
+        claimed_path = record.get('claimed')
+        fs = organizer.fs
+
+        # Omdøbt før et nedbrud, men posten blev ikke fjernet
+        if claimed_path and not fs.exists(partial_path) and fs.exists(claimed_path) and \
+                fs.getsize(claimed_path) == record['size']:
+            self.finish(record, 'success', f"Gemt {os.path.basename(claimed_path)} til {claimed_path}")
+            return
+
+        folder = os.path.dirname(target_path)
+        try:
+            if not organizer.tree_index.is_dir(folder):
+                approved_folder = record.get('approved_folder')
+                if not approved_folder or os.path.normcase(approved_folder) != os.path.normcase(folder):
+                    organizer.tree_index.remove_file(target_path)   # Navnet var reserveret af planen
+                    self.hold(record, folder)
+                    return
+                organizer.make_folder(folder)
+            written = self.link_existing(record, payload_path, partial_path, manifest, fs) or \
+                copy_resumable(payload_path, partial_path, self.limiter, manifest.algorithms, fs)
+
+            if not claimed_path:
+                claimed_path = organizer.claim_filename(target_path, record['filename'])
+                record['claimed'] = claimed_path
+                self.staging.save_record(record)
+            fs.replace(partial_path, claimed_path)
+        except Exception as e:
+            self.schedule_retry(record, str(e))
+            return
+
+        manifest.add(claimed_path, written['size'], written['hashes'],
+                     record.get('original_path'), record.get('rendition'))
+        stat = None
+        if record.get('digest'):
+            with self.lock:
+                organizer.get_hash_cache().discard(target_path, record['digest'])
+                stat = organizer.get_hash_cache().record(claimed_path, record['digest'])
+        # Uden stat hentes størrelse/mtime når deduplikering næste gang læser mappen
+        organizer.tree_index.add_file(claimed_path, stat)
+
+        message = f"Gemt {os.path.basename(claimed_path)} til {claimed_path}"
+        planned_target = record.get('planned_target')
+        if planned_target and os.path.normcase(planned_target) != os.path.normcase(claimed_path):
+            # Drevet så anderledes ud end da filen blev lagt i kø (ny mappe-variant, navnet taget...)
+            message += f" (planlagt som {planned_target})"
+            with self.lock:
+                self.status['conflicts'] += 1
+            self.finish(record, 'success', message, {'planned_target': planned_target, 'target': claimed_path})
+            return
+        self.finish(record, 'success', message)
+
+    def link_existing(self, record: Dict, payload_path: str, partial_path: str,
+                      manifest: ManifestBuilder, fs: MuseumFilesystem) -> Optional[Dict]:
+        """DEDUP_LINK: opret filen som hardlink til den identiske fil (None = kopiér i stedet)"""
+        link_to = record.get('link_to')
+        if not link_to:
+            return None
+        try:
+            if fs.exists(partial_path):
+                fs.remove(partial_path)
+            fs.link(link_to, partial_path)
+        except OSError:
+            return None
+        with open(payload_path, 'rb') as f:
+            return hash_stream(f, manifest.algorithms)
+
+    def hold(self, record: Dict, folder: str):
+        """Tilbagehold posten indtil brugeren godkender mappen eller fjerner filen"""
+        planned_folder = os.path.dirname(record['planned_target']) if record.get('planned_target') else None
+        if planned_folder and os.path.normcase(planned_folder) != os.path.normcase(folder):
+            message = f"Mappen findes ikke: {folder} (planlagt i {planned_folder})"
+        else:
+            message = f"Mappen findes ikke og blev ikke godkendt: {folder}"
+        # Målet planlægges igen når mappen er godkendt (navnet kan være taget i mellemtiden)
+        record['target'] = None
+        record['conflict'] = {'folder': folder, 'message': message}
+        try:
+            self.staging.save_record(record)
+        except Exception as e:
+            print(f"Kunne ikke opdatere staging post: {e}")
+        with self.lock:
+            self.status['held'] += 1
+        self.notify()
+
+    def schedule_retry(self, record: Dict, error: str):
+        """Gem fejlen og planlæg næste forsøg med eksponentiel ventetid"""
+        record['attempts'] = record.get('attempts', 0) + 1
+        record['last_error'] = error
+        delay = min(RETRY_BASE_SECONDS * 2 ** (record['attempts'] - 1), RETRY_MAX_SECONDS)
+        record['next_attempt'] = time.time() + delay
+        with self.lock:
+            if record['attempts'] == 1:
+                self.status['retrying'] += 1
+            self.status['last_error'] = f"{record['filename']}: {error}"
+        try:
+            self.staging.save_record(record)
+        except Exception as e:
+            print(f"Kunne ikke opdatere staging post: {e}")
+        self.notify()
+
+    def finish(self, record: Dict, result: str, message: str, conflict: Optional[Dict] = None):
+        """
+        Fjern posten fra journalen og husk resultatet
+        conflict: {'planned_target', 'target'} når filen er gemt et andet sted end i forhåndsvisningen
+        """
+        self.staging.remove(record['id'])
+        with self.lock:
+            self.history.append({'filename': record['filename'], 'result': result, 'message': message,
+                                 'time': datetime.now().isoformat(timespec='seconds'), 'conflict': conflict})
+            del self.history[:-200]
+            self.status['pending'] = max(0, self.status['pending'] - 1)
+            if record.get('attempts'):
+                self.status['retrying'] = max(0, self.status['retrying'] - 1)
+            if record.get('conflict'):
+                self.status['held'] = max(0, self.status['held'] - 1)
+            if result == 'skipped':
+                self.status['skipped'] += 1
+        self.notify()
+
+
+_share_sync = None
+
+def get_share_sync() -> ShareSyncWorker:
+    """Get the global share sync worker (startes ved første brug)"""
+    global _share_sync
+    if _share_sync is None:
+        _share_sync = ShareSyncWorker()
+        _share_sync.start()
+    return _share_sync
+
+
+def running_share_sync() -> Optional[ShareSyncWorker]:
+    """Den globale worker hvis den er startet - ellers None (starter den ikke)"""
+    return _share_sync
+
+
+def current_status() -> Optional[Dict]:
+    """Status for den globale worker uden at starte den (None hvis den ikke kører)"""
+    if _share_sync is None:
+        return None
+    return dict(_share_sync.status)
+
+
+def has_pending_staging() -> bool:
+    """Hurtigt tjek (uden at starte tråden) om der ligger filer fra en tidligere session"""
+    try:
+        return any(STAGING_DIR.glob("*.json"))
+    except OSError:
+        return False
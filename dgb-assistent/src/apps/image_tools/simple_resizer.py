@@ -13,6 +13,11 @@ from PIL import Image, ImageTk
 import threading
 from typing import List, Dict
 from .museum_organizer import MuseumOrganizer
+from .fast_copy import TRANSFER_HARDLINK
+from .organize_preview import organize_with_preview
+from .result_store import ResultStore
+from .file_writer import BackgroundWriter
+from .manifest import ManifestBuilder
 
 
 class SimpleImageResizer:
@@ -24,6 +29,8 @@ class SimpleImageResizer:
         self.processed_images = []
         self.processing = False
         self.museum_organizer = MuseumOrganizer()
+        self.result_store = None
+        self.file_writer = None  # BackgroundWriter mens der gemmes
         
     def show(self):
         """Show the simple image resizer window"""
@@ -33,12 +40,25 @@ class SimpleImageResizer:
             self.window.lift()
             self.window.focus_force()
     
+    def on_close(self):
+        """Luk vinduet, afbryd gemning og slet midlertidige resultatfiler"""
+        if self.file_writer is not None:
+            # Lad igangværende filer blive færdige før spill-filerne slettes
+            self.file_writer.cancel()
+            self.file_writer.wait(timeout=5)
+            self.file_writer = None
+        if self.result_store is not None:
+            self.result_store.close()
+        self.processed_images.clear()
+        self.window.destroy()
+    
     def create_window(self):
         """Create the main window"""
         self.window = tk.Toplevel(self.parent) if self.parent else tk.Tk()
         self.window.title("Simpel Billedkomprimering - DGB Assistent")
         self.window.geometry("800x600")
         self.window.configure(bg='#f8fafc')
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Colors matching DGB Assistent theme
         self.colors = {
@@ -189,6 +209,11 @@ class SimpleImageResizer:
             parent=self.window
         )
         
+        if files:
+            self.load_files(files)
+    
+    def load_files(self, files):
+        """Indlæs valgte filer (fra fil-dialogen eller overdraget fra en anden instans)"""
         if files:
             self.selected_files = list(files)
             count = len(files)
@@ -203,7 +228,7 @@ class SimpleImageResizer:
         
     def start_processing(self):
         """Start processing images in a separate thread"""
-        if self.processing or not hasattr(self, 'selected_files'):
+        if self.processing or self.file_writer is not None or not hasattr(self, 'selected_files'):
             return
             
         self.processing = True
@@ -215,6 +240,11 @@ class SimpleImageResizer:
         self.progress_var.set(0)
         self.processed_images.clear()
         
+        # Nyt resultatlager - spill-filer fra forrige kørsel slettes
+        if self.result_store is not None:
+            self.result_store.close()
+        self.result_store = ResultStore()
+        
         # Start processing in background thread
         thread = threading.Thread(target=self.process_images, daemon=True)
         thread.start()
@@ -275,7 +305,8 @@ class SimpleImageResizer:
                 'original_path': file_path,
                 'original_name': input_path.name,
                 'output_filename': output_filename,
-                'data': compressed_data,
+                'payload': self.result_store.put(compressed_data),
+                'rendition': {'name': 'compressed', 'format': 'JPEG', 'max_size_kb': target_size_kb},
                 'original_size_kb': len(image_data) // 1024,
                 'compressed_size_kb': len(compressed_data) // 1024
             }
@@ -406,20 +437,48 @@ class SimpleImageResizer:
         if not output_dir:
             return
         
-        try:
-            saved_count = 0
-            for img_data in self.processed_images:
-                output_path = os.path.join(output_dir, img_data['output_filename'])
-                
-                with open(output_path, 'wb') as f:
-                    f.write(img_data['data'])
-                saved_count += 1
-            
+        # Skriv i baggrunden - vinduet kan bruges imens, og filerne dukker op færdige
+        jobs = [(img_data['payload'], os.path.join(output_dir, img_data['output_filename']),
+                 {'source': img_data['original_path'], 'rendition': img_data['rendition']})
+                for img_data in self.processed_images]
+        
+        self.save_btn.config(state=tk.DISABLED, text="⏳ Gemmer...")
+        self.progress_var.set(0)
+        self.status_label.config(text=f"Gemmer 0/{len(jobs)} billeder...")
+        
+        self.file_writer = BackgroundWriter(
+            jobs,
+            progress_callback=lambda done, total: self.window.after(
+                0, lambda: self.save_progress(done, total)),
+            done_callback=lambda results: self.window.after(
+                0, lambda: self.save_complete(output_dir, results)),
+            manifest=ManifestBuilder('save', output_dir, {'tool': 'simple_resizer'})
+        )
+        self.file_writer.start()
+    
+    def save_progress(self, done: int, total: int):
+        """Opdater fremdrift under gemning"""
+        self.progress_var.set((done / total) * 100 if total else 100)
+        self.status_label.config(text=f"Gemmer {done}/{total} billeder...")
+    
+    def save_complete(self, output_dir: str, results: Dict):
+        """Called when the background writer is done"""
+        self.file_writer = None
+        self.save_btn.config(state=tk.NORMAL, text="💾 Gem Billeder")
+        
+        saved_count = len(results['saved'])
+        self.status_label.config(text=f"{saved_count} billeder gemt")
+        
+        if results['errors']:
+            error_msg = "\n".join(results['errors'][:3])
+            if len(results['errors']) > 3:
+                error_msg += f"\n... og {len(results['errors']) - 3} flere fejl"
+            messagebox.showerror("Gem Fejl",
+                               f"{saved_count} billeder gemt i:\n{output_dir}\n\n"
+                               f"{len(results['errors'])} fejl:\n{error_msg}")
+        else:
             messagebox.showinfo("Gem Fuldført", 
                               f"{saved_count} billeder gemt succesfuldt i:\n{output_dir}")
-            
-        except Exception as e:
-            messagebox.showerror("Gem Fejl", f"Fejl ved gemning af billeder: {str(e)}")
     
     def organize_to_museum(self):
         """Organiser processede billeder til museum mappestruktur"""
@@ -431,15 +490,17 @@ class SimpleImageResizer:
             valid_files = []
             invalid_files = []
             
+            validations = self.museum_organizer.validate_filenames(
+                [img_data['output_filename'] for img_data in self.processed_images])
             for img_data in self.processed_images:
                 filename = img_data['output_filename']
-                valid, message = self.museum_organizer.validate_filename(filename)
+                valid, message = validations[filename]
                 
                 if valid:
-                    valid_files.append({
-                        'filename': filename,
-                        'data': img_data['data']
-                    })
+                    file_info = img_data['payload'].file_info(filename)
+                    file_info['original_path'] = img_data['original_path']
+                    file_info['rendition'] = img_data['rendition']
+                    valid_files.append(file_info)
                 else:
                     invalid_files.append(f"{filename}: {message}")
             
@@ -458,50 +519,9 @@ class SimpleImageResizer:
                                    "Ingen filer har gyldige sagnumre til organisering.")
                 return
             
-            # Bekræft organisering
-            response = messagebox.askyesno(
-                "Bekræft Museum Organisering",
-                f"Organisér {len(valid_files)} gyldige billeder til museum mappestruktur?\n\n"
-                f"Filerne vil blive kopieret til:\n"
-                f"{self.museum_organizer.base_path}\n\n"
-                f"Eksisterende mapper med beskrivelser vil blive fundet automatisk."
-            )
-            
-            if not response:
-                return
-            
-            # Organisér filerne - nu med smart scanning
-            results = self.museum_organizer.organize_files(valid_files, ask_before_create=True)
-            
-            # Vis resultater
-            success_count = len(results['success'])
-            error_count = len(results['errors'])
-            skipped_count = len(results['skipped'])
-            
-            result_msg = f"Museum Organisering Fuldført!\n\n"
-            result_msg += f"✅ Succes: {success_count} filer organiseret\n"
-            
-            if error_count > 0:
-                result_msg += f"❌ Fejl: {error_count} filer\n"
-            
-            if skipped_count > 0:
-                result_msg += f"⏭️ Sprunget over: {skipped_count} filer\n"
-            
-            if results['created_folders']:
-                result_msg += f"\n📁 {len(results['created_folders'])} mapper oprettet\n"
-            
-            # Vis detaljer hvis fejl
-            if results['errors']:
-                result_msg += f"\nFejl detaljer:\n"
-                for error in results['errors'][:3]:  # Vis max 3 fejl
-                    result_msg += f"• {error}\n"
-                if len(results['errors']) > 3:
-                    result_msg += f"... og {len(results['errors']) - 3} flere fejl"
-            
-            if success_count > 0:
-                messagebox.showinfo("Museum Organisering", result_msg)
-            else:
-                messagebox.showerror("Museum Organisering Fejl", result_msg)
+            # Forhåndsvis hvor filerne havner (dry-run i baggrunden - intet skrives) og læg dem i kø
+            # Spill-filer ændres aldrig - de hardlinkes ind i journalen i stedet for at blive kopieret
+            organize_with_preview(self.window, self.museum_organizer, valid_files, TRANSFER_HARDLINK)
             
         except Exception as e:
             messagebox.showerror("Organisering Fejl", 
@@ -0,0 +1,302 @@
+"""
+Sync Status - DGB Assistent
+Oversigt over synkroniseringen til museumsdrevet: filer i kø (med genforsøg og seneste fejl)
+og historikken over gemte og oversprungne filer i denne session - herunder konflikter, hvor
+filen er gemt et andet sted end forhåndsvisningen viste. Filer der venter på en mappe brugeren
+ikke har godkendt, kan gemmes (mappen oprettes) eller fjernes herfra.
+"""
+
+import os
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk, messagebox
+from typing import Dict, Optional
+
+from .share_sync import ShareSyncWorker
+
+HISTORY_LABELS = {
+    'success': "Gemt",
+    'skipped': "Sprunget over",
+    'removed': "Fjernet"
+}
+
+
+def format_timestamp(timestamp: Optional[str]) -> str:
+    """ISO-tidspunkt som 'HH:MM:SS' (dato med hvis det ikke er i dag)"""
+    if not timestamp:
+        return ""
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return timestamp
+    if moment.date() == datetime.now().date():
+        return moment.strftime("%H:%M:%S")
+    return moment.strftime("%d-%m-%Y %H:%M")
+
+
+class SyncStatusWindow:
+    """Ikke-modalt vindue med kø og historik - refresh() kaldes når workeren melder ændringer"""
+
+    def __init__(self, parent, worker: ShareSyncWorker):
+        self.parent = parent
+        self.worker = worker
+        self.window = None
+        self.summary_label = None
+        self.queue_tree = None
+        self.history_tree = None
+        self.notebook = None
+        self.queue_frame = None
+        self.history_frame = None
+        self.conflict_tree = None
+        self.conflict_frame = None
+        self.held_folders = {}  # post-id -> manglende mappe for tilbageholdte poster
+
+    def show(self, show_conflicts: bool = False):
+        """Vis vinduet (eller bring det frem hvis det allerede er åbent) - evt. med konflikterne fremme"""
+        if self.is_open():
+            self.window.deiconify()
+            self.window.lift()
+            self.refresh()
+            if show_conflicts:
+                self.notebook.select(self.conflict_frame)
+            return
+
+        self.window = tk.Toplevel(self.parent)
+        self.window.title("Synkronisering - Museumsdrevet")
+        self.window.geometry("900x500")
+        self.window.transient(self.parent)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.create_widgets()
+        self.refresh()
+        if show_conflicts:
+            self.notebook.select(self.conflict_frame)
+
+    def is_open(self) -> bool:
+        if self.window is None:
+            return False
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def close(self):
+        if self.is_open():
+            self.window.destroy()
+        self.window = None
+
+    def create_widgets(self):
+        """Opbyg opsummering, faner og knapper"""
+        main_frame = tk.Frame(self.window, bg='#ffffff', padx=20, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        tk.Label(main_frame, text="🔄 Synkronisering til museumsdrevet",
+                 font=('Segoe UI', 14, 'bold'), fg='#1e293b', bg='#ffffff').pack(anchor=tk.W)
+        self.summary_label = tk.Label(main_frame, text="", font=('Segoe UI', 10),
+                                      fg='#475569', bg='#ffffff', justify=tk.LEFT)
+        self.summary_label.pack(anchor=tk.W, pady=(4, 10))
+
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
+
+        self.queue_frame = tk.Frame(self.notebook, bg='#ffffff')
+        self.notebook.add(self.queue_frame, text="I kø")
+        self.queue_tree = self.create_table(self.queue_frame,
+                                            ('filename', 'status', 'attempts', 'target', 'error'),
+                                            {'filename': ("Fil", 180), 'status': ("Status", 130),
+                                             'attempts': ("Forsøg", 60), 'target': ("Planlagt mål", 280),
+                                             'error': ("Seneste fejl", 220)})
+
+        self.history_frame = tk.Frame(self.notebook, bg='#ffffff')
+        self.notebook.add(self.history_frame, text="Historik")
+        self.history_tree = self.create_table(self.history_frame,
+                                              ('time', 'filename', 'result', 'message'),
+                                              {'time': ("Tid", 80), 'filename': ("Fil", 180),
+                                               'result': ("Resultat", 110), 'message': ("Besked", 480)})
+
+        self.conflict_frame = tk.Frame(self.notebook, bg='#ffffff')
+        self.notebook.add(self.conflict_frame, text="Konflikter")
+        self.conflict_tree = self.create_table(self.conflict_frame,
+                                               ('time', 'filename', 'planned', 'target'),
+                                               {'time': ("Tid", 80), 'filename': ("Fil", 160),
+                                                'planned': ("Planlagt", 310), 'target': ("Gemt som", 310)})
+
+        button_frame = tk.Frame(main_frame, bg='#ffffff')
+        button_frame.pack(fill=tk.X)
+
+        close_btn = tk.Button(button_frame,
+                              text="Luk",
+                              font=('Segoe UI', 10),
+                              fg='#475569', bg='#f1f5f9',
+                              activebackground='#e2e8f0',
+                              relief=tk.FLAT, bd=0,
+                              padx=20, pady=10,
+                              cursor='hand2',
+                              command=self.close)
+        close_btn.pack(side=tk.RIGHT, padx=(10, 0))
+
+        retry_btn = tk.Button(button_frame,
+                              text="Forsøg igen nu",
+                              font=('Segoe UI', 10, 'bold'),
+                              fg='#ffffff', bg='#3b82f6',
+                              activebackground='#2563eb',
+                              relief=tk.FLAT, bd=0,
+                              padx=20, pady=10,
+                              cursor='hand2',
+                              command=self.retry_now)
+        retry_btn.pack(side=tk.RIGHT)
+
+        approve_btn = tk.Button(button_frame,
+                                text="Opret mappe og gem",
+                                font=('Segoe UI', 10, 'bold'),
+                                fg='#ffffff', bg='#10b981',
+                                activebackground='#059669',
+                                relief=tk.FLAT, bd=0,
+                                padx=20, pady=10,
+                                cursor='hand2',
+                                command=self.approve_selected)
+        approve_btn.pack(side=tk.LEFT)
+
+        discard_btn = tk.Button(button_frame,
+                                text="Fjern fra kø",
+                                font=('Segoe UI', 10),
+                                fg='#475569', bg='#f1f5f9',
+                                activebackground='#e2e8f0',
+                                relief=tk.FLAT, bd=0,
+                                padx=20, pady=10,
+                                cursor='hand2',
+                                command=self.discard_selected)
+        discard_btn.pack(side=tk.LEFT, padx=(10, 0))
+
+    def create_table(self, parent, columns, headings: Dict) -> ttk.Treeview:
+        """Treeview med scrollbar - headings: kolonne -> (overskrift, bredde)"""
+        tree = ttk.Treeview(parent, columns=columns, show='headings')
+        for column in columns:
+            heading, width = headings[column]
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W)
+
+        tree.tag_configure('held', foreground='#dc2626')
+        tree.tag_configure('conflict', foreground='#b45309')
+        tree.tag_configure('removed', foreground='#64748b')
+        tree.tag_configure('retrying', foreground='#b45309')
+        tree.tag_configure('skipped', foreground='#64748b')
+
+        scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        return tree
+
+    def refresh(self):
+        """Genindlæs kø og historik (GUI-tråden - journalen ligger på den lokale disk)"""
+        if not self.is_open():
+            return
+        status = dict(self.worker.status)
+        records = self.worker.pending_items()
+        history = self.worker.history_items()
+
+        summary = f"{len(records)} filer i kø · {status['held']} venter på en mappe · " \
+                  f"{status['retrying']} forsøges igen · {status['skipped']} sprunget over · " \
+                  f"{status['conflicts']} gemt andet sted end planlagt"
+        if status['online'] is False:
+            summary += "\n⚠️ Museumsdrevet er ikke tilgængeligt - filerne gemmes når det er tilbage"
+        elif status['last_sync']:
+            summary += f"\nSeneste synkronisering: {format_timestamp(status['last_sync'])}"
+        self.summary_label.config(text=summary)
+
+        self.notebook.tab(self.queue_frame, text=f"I kø ({len(records)})")
+        self.queue_tree.delete(*self.queue_tree.get_children(''))
+        self.held_folders = {record['id']: record['conflict']['folder'] for record in records
+                             if record.get('conflict')}
+        for record in records:
+            attempts = record.get('attempts', 0)
+            conflict = record.get('conflict')
+            if conflict:
+                state, tag = "Mappe mangler", 'held'
+            elif attempts:
+                state, tag = "Forsøges igen", 'retrying'
+            elif record.get('target'):
+                state, tag = "Kopieres", ''
+            else:
+                state, tag = "Venter", ''
+            target = record.get('planned_target') or record.get('target') or ""
+            error = conflict['message'] if conflict else record.get('last_error') or ""
+            self.queue_tree.insert('', tk.END, iid=record['id'],
+                                   values=(record['filename'], state, attempts or "",
+                                           self.relative(target), error),
+                                   tags=(tag,) if tag else ())
+
+        self.notebook.tab(self.history_frame, text=f"Historik ({len(history)})")
+        self.history_tree.delete(*self.history_tree.get_children(''))
+        for item in history:
+            result = "Gemt andet sted" if item.get('conflict') else HISTORY_LABELS.get(item['result'], item['result'])
+            self.history_tree.insert('', tk.END,
+                                     values=(format_timestamp(item.get('time')), item['filename'],
+                                             result, item['message']),
+                                     tags=('conflict' if item.get('conflict') else item['result'],))
+
+        # Konflikter: tælleren gælder hele sessionen, detaljerne de seneste i historikken
+        conflicts = [item for item in history if item.get('conflict')]
+        self.notebook.tab(self.conflict_frame, text=f"Konflikter ({status['conflicts']})")
+        self.conflict_tree.delete(*self.conflict_tree.get_children(''))
+        for item in conflicts:
+            self.conflict_tree.insert('', tk.END,
+                                      values=(format_timestamp(item.get('time')), item['filename'],
+                                              self.relative(item['conflict']['planned_target']),
+                                              self.relative(item['conflict']['target'])),
+                                      tags=('conflict',))
+
+    def selected_held(self):
+        """Markerede filer der venter på en mappe (andre filer håndteres af synkroniseringen)"""
+        selected = [item for item in self.queue_tree.selection() if 'held' in self.queue_tree.item(item, 'tags')]
+        if not selected:
+            messagebox.showinfo("Synkronisering",
+                                "Markér de filer med status \"Mappe mangler\" du vil gemme eller fjerne.",
+                                parent=self.window)
+        return selected
+
+    def approve_selected(self):
+        """Godkend de manglende mapper - de oprettes og filerne gemmes i næste runde"""
+        selected = self.selected_held()
+        if not selected:
+            return
+        folders = sorted({self.relative(self.held_folders[item]) for item in selected})
+        folder_msg = "\n".join(folders[:5])
+        if len(folders) > 5:
+            folder_msg += f"\n... og {len(folders) - 5} flere"
+        if not messagebox.askyesno("Opret Mapper?",
+                                   f"Følgende mapper oprettes, og {len(selected)} filer gemmes i dem:\n\n"
+                                   f"{folder_msg}\n\nFortsæt?",
+                                   parent=self.window):
+            return
+        for item_id in selected:
+            self.worker.approve_folder(item_id)
+        self.refresh()
+
+    def discard_selected(self):
+        """Fjern filerne fra køen uden at gemme dem"""
+        selected = self.selected_held()
+        if not selected:
+            return
+        if not messagebox.askyesno("Fjern Filer?",
+                                   f"{len(selected)} filer fjernes fra køen og gemmes ikke på museumsdrevet.\n\n"
+                                   f"Fortsæt?",
+                                   parent=self.window):
+            return
+        for item_id in selected:
+            self.worker.discard(item_id)
+        self.refresh()
+
+    def retry_now(self):
+        """Spring ventetiden over, så filer der venter på genforsøg prøves med det samme"""
+        self.worker.retry_now()
+
+    def relative(self, path: str) -> str:
+        """Sti relativt til workerens base_path"""
+        if not path:
+            return ""
+        try:
+            return os.path.relpath(path, self.worker.base_path)
+        except ValueError:
+            return path  # Andet drev på Windows
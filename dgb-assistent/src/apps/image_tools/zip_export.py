@@ -0,0 +1,272 @@
+"""
+ZIP Export - DGB Assistent
+Streamer behandlede billeder til ZIP i faste blokke. Allerede komprimerede formater
+(JPEG, PNG ...) gemmes ukomprimeret (ZIP_STORED), og Zip64 bruges automatisk over 4 GB.
+"""
+
+import os
+import queue
+import shutil
+import threading
+import time
+import zipfile
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .manifest import HashingWriter, ManifestBuilder, zip_manifest_path
+
+# Blokstørrelse ved streaming af indhold til arkivet
+CHUNK_SIZE = 1024 * 1024
+
+# Formater hvor deflate bruger CPU uden at spare plads
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.zip', '.gz', '.mp4', '.mov'}
+
+Source = Union[bytes, bytearray, memoryview, str]
+
+# (arkivnavn, kilde[, metadata]) - metadata {'source', 'rendition'} bruges i manifestet
+Entry = Tuple
+
+
+class ManifestWriteError(Exception):
+    """Arkivet er gemt, men manifestet ved siden af kunne ikke skrives"""
+
+
+def write_manifest(manifest: Optional[ManifestBuilder], zip_path: str):
+    """Skriv manifestet for et færdigt arkiv (fejl giver ManifestWriteError - arkivet bevares)"""
+    if manifest is None:
+        return
+    try:
+        manifest.write(zip_manifest_path(zip_path))
+    except Exception as e:
+        raise ManifestWriteError(f"Manifestet kunne ikke skrives: {e}") from e
+
+
+def compression_for(arcname: str) -> int:
+    """Vælg komprimering ud fra filtypen"""
+    ext = os.path.splitext(arcname)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+class ZipNameAllocator:
+    """
+    Giv duplikerede filnavne a, b, c suffikser (alle forekomster - også den første)
+    Antallet af forekomster kendes på forhånd, så navne kan tildeles løbende
+    """
+
+    def __init__(self, expected_filenames: Iterable[str]):
+        self.filename_counts = {}
+        for filename in expected_filenames:
+            self.filename_counts[filename] = self.filename_counts.get(filename, 0) + 1
+        self.filename_counters = {}
+
+    def allocate(self, filename: str) -> str:
+        """Tildel det næste unikke navn for filename"""
+        counter = self.filename_counters.get(filename, 0)
+        self.filename_counters[filename] = counter + 1
+
+        if self.filename_counts.get(filename, 1) > 1:
+            suffix_index = counter
+        elif counter > 0:
+            # Uventet duplikat (ikke i de forventede navne) - første kopi er allerede skrevet
+            suffix_index = counter - 1
+        else:
+            # Single file, no suffix needed
+            return filename
+
+        name, ext = os.path.splitext(filename)
+        return f"{name} {chr(ord('a') + suffix_index)}{ext}"
+
+
+def assign_unique_names(filenames: List[str]) -> List[str]:
+    """Samme regel som den oprindelige download_zip, for en færdig liste af navne"""
+    allocator = ZipNameAllocator(filenames)
+    return [allocator.allocate(filename) for filename in filenames]
+
+
+def processed_pair_entries(file_pair: Dict, filename: str) -> List[Entry]:
+    """Entries for small/ og large/ versionen af ét behandlet billede"""
+    return [
+        (f"{rendition}/{filename}", file_pair[rendition]['payload'].as_source(), {
+            'source': file_pair.get('original_path'),
+            'rendition': file_pair[rendition].get('rendition')
+        })
+        for rendition in ('small', 'large')
+    ]
+
+
+def processed_file_entries(processed_files: List[Dict]) -> List[Entry]:
+    """Byg (arkivnavn, kilde, metadata) for small/ og large/ versionerne af behandlede billeder"""
+    unique_names = assign_unique_names([pair['small']['filename'] for pair in processed_files])
+
+    entries = []
+    for file_pair, filename in zip(processed_files, unique_names):
+        entries.extend(processed_pair_entries(file_pair, filename))
+    return entries
+
+
+def source_size(source: Source) -> int:
+    """Størrelse af en kilde (bytes i hukommelsen eller fil på disk)"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    return os.path.getsize(source)
+
+
+def write_zip_entry(zip_file: zipfile.ZipFile, arcname: str, source: Source,
+                    algorithms: Iterable[str] = ()) -> Dict[str, str]:
+    """
+    Stream én kilde ind i arkivet i blokke af CHUNK_SIZE
+    Returns: hashes af indholdet (beregnet undervejs) for de angivne algoritmer
+    """
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+    info.compress_type = compression_for(arcname)
+    # Kendt størrelse lader zipfile vælge Zip64 header for store filer
+    info.file_size = source_size(source)
+
+    with zip_file.open(info, 'w') as dest:
+        writer = HashingWriter(dest, algorithms)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            for offset in range(0, len(view), CHUNK_SIZE):
+                writer.write(view[offset:offset + CHUNK_SIZE])
+        else:
+            with open(source, 'rb') as src:
+                shutil.copyfileobj(src, writer, CHUNK_SIZE)
+    return writer.digests()
+
+
+def record_entry(manifest: Optional[ManifestBuilder], entry: Entry, size: int, hashes: Dict[str, str]):
+    """Tilføj en skrevet entry til manifestet"""
+    if manifest is None:
+        return
+    metadata = entry[2] if len(entry) > 2 else {}
+    manifest.add(entry[0], size, hashes, metadata.get('source'), metadata.get('rendition'))
+
+
+def write_zip(zip_path: str, entries: Iterable[Entry], progress_callback=None,
+              manifest: Optional[ManifestBuilder] = None) -> int:
+    """
+    Skriv alle entries til zip_path via en midlertidig fil (ingen halve arkiver ved fejl)
+    progress_callback(antal_skrevet, bytes_skrevet) kaldes efter hver entry
+    manifest: skrives ved siden af arkivet (zip_path + .manifest.json) når det er færdigt -
+    fejler kun manifestet, rejses ManifestWriteError og arkivet bevares
+    Returns: antal skrevne entries
+    """
+    temp_path = zip_path + ".part"
+    written = 0
+    written_bytes = 0
+
+    try:
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zip_file:
+            for entry in entries:
+                arcname, source = entry[0], entry[1]
+                hashes = write_zip_entry(zip_file, arcname, source,
+                                         manifest.algorithms if manifest else ())
+                size = source_size(source)
+                record_entry(manifest, entry, size, hashes)
+                written += 1
+                written_bytes += size
+                if progress_callback:
+                    progress_callback(written, written_bytes)
+        os.replace(temp_path, zip_path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    write_manifest(manifest, zip_path)
+    return written
+
+
+class IncrementalZipWriter:
+    """
+    Bygger arkivet mens behandlingen kører: hver færdig rendition lægges i en kø
+    og skrives af en dedikeret tråd, så ZIP'en er klar når sidste billede er færdigt
+    """
+
+    def __init__(self, zip_path: str, expected_filenames: Iterable[str], max_pending: int = 8,
+                 manifest: Optional[ManifestBuilder] = None):
+        self.zip_path = zip_path
+        self.manifest = manifest
+        self.temp_path = zip_path + ".part"
+        self.name_allocator = ZipNameAllocator(expected_filenames)
+        # Begrænset kø giver modtryk hvis disken er langsommere end behandlingen
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.written = 0
+        self.closed = False
+
+        # Åbn arkivet med det samme, så en ugyldig sti opdages før behandlingen starter
+        self.zip_file = zipfile.ZipFile(self.temp_path, 'w', zipfile.ZIP_STORED, allowZip64=True)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def add(self, arcname: str, source: Source, metadata: Optional[Dict] = None):
+        """Læg en entry i skrivekøen (ignoreres efter en skrivefejl - rapporteres ved close)"""
+        if self.error is not None:
+            return
+        self.pending.put((arcname, source, metadata or {}))
+
+    def add_processed_file(self, file_pair: Dict):
+        """Tildel unikt navn (i behandlingsrækkefølge) og læg small/large i køen"""
+        filename = self.name_allocator.allocate(file_pair['small']['filename'])
+        for entry in processed_pair_entries(file_pair, filename):
+            self.add(*entry)
+
+    def run(self):
+        """Skrivetråd: tøm køen indtil None modtages"""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue  # Dræn køen efter fejl, så producenten ikke blokerer
+            try:
+                hashes = write_zip_entry(self.zip_file, item[0], item[1],
+                                         self.manifest.algorithms if self.manifest else ())
+                record_entry(self.manifest, item, source_size(item[1]), hashes)
+                self.written += 1
+            except Exception as e:
+                self.error = e
+
+    def close(self) -> int:
+        """Vent på at køen er skrevet, afslut arkivet og omdøb det på plads (se write_zip om manifestet)"""
+        if self.closed:
+            return self.written
+        self.closed = True
+        self.pending.put(None)
+        self.thread.join()
+
+        try:
+            self.zip_file.close()
+        except Exception as e:
+            self.error = self.error or e
+
+        if self.error is not None:
+            self.remove_temp_file()
+            raise self.error
+
+        os.replace(self.temp_path, self.zip_path)
+        write_manifest(self.manifest, self.zip_path)
+        return self.written
+
+    def abort(self):
+        """Stop uden at færdiggøre arkivet"""
+        if self.closed:
+            return
+        self.closed = True
+        self.error = self.error or RuntimeError("ZIP afbrudt")
+        self.pending.put(None)
+        self.thread.join()
+        try:
+            self.zip_file.close()
+        except Exception:
+            pass
+        self.remove_temp_file()
+
+    def remove_temp_file(self):
+        """Fjern det halvfærdige arkiv"""
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
@@ -16,6 +16,9 @@ APP_DESCRIPTION = "En moderne applikationslauncher og digitalt arbejdsområde"
 GITHUB_REPO_OWNER = "diveden"        # Your GitHub username
 GITHUB_REPO_NAME = "dgb-assistent"   # Your repository name
 
+# Single instance - værktøj der åbnes når filer sendes uden --tool
+DEFAULT_FILE_TOOL = "simple_resizer"
+
 # Window Configuration
 DEFAULT_WINDOW_WIDTH = 1200
 DEFAULT_WINDOW_HEIGHT = 800
@@ -21,23 +21,47 @@ from tkinter import ttk, messagebox, font
 import os
 import sys
 import math
+import importlib
 
 # Handle imports for both development and packaged versions
 try:
     from utils.settings import SettingsManager, SettingsDialog
-    from config import APP_VERSION
-    # Import image processing tools
-    from apps.image_tools.simple_resizer import SimpleImageResizer
-    from apps.image_tools.group_processor import GroupImageProcessor
-    from apps.image_tools.individual_processor import IndividualImageProcessor
+    from utils.startup_profiler import get_startup_profiler
+    from config import APP_VERSION, DEFAULT_FILE_TOOL
 except ImportError:
     # Fallback for development with relative imports
     from ..utils.settings import SettingsManager, SettingsDialog
-    from ..config import APP_VERSION
-    # Import image processing tools
-    from ..apps.image_tools.simple_resizer import SimpleImageResizer
-    from ..apps.image_tools.group_processor import GroupImageProcessor
-    from ..apps.image_tools.individual_processor import IndividualImageProcessor
+    from ..utils.startup_profiler import get_startup_profiler
+    from ..config import APP_VERSION, DEFAULT_FILE_TOOL
+
+
+# Værktøjs-register: action -> (modul, klasse, visningsnavn)
+# Modulerne (og dermed Pillow, zipfile osv.) importeres først når en tile klikkes,
+# så launcheren kan vises uden at vente på dem. Husk hiddenimports i build.spec.
+TOOL_REGISTRY = {
+    'simple_resizer': ('apps.image_tools.simple_resizer', 'SimpleImageResizer',
+                       'Simpel Billedkomprimering'),
+    'group_processor': ('apps.image_tools.group_processor', 'GroupImageProcessor',
+                        'Gruppe Billedbehandler'),
+    'individual_processor': ('apps.image_tools.individual_processor', 'IndividualImageProcessor',
+                             'Individuel Billedbehandler'),
+    'photo_search': ('apps.image_tools.photo_search', 'PhotoSearch', 'Find Fotos'),
+}
+
+
+# Hvor ofte sidebaren opdaterer antallet af filer der venter på museumsdrevet (ms)
+SYNC_STATUS_POLL_MS = 3000
+
+
+def load_tool_class(action):
+    """Importér og returnér værktøjsklassen for en action fra TOOL_REGISTRY"""
+    module_name, class_name, _ = TOOL_REGISTRY[action]
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        # Fallback for development with relative imports
+        module = importlib.import_module(f"..{module_name}", __package__)
+    return getattr(module, class_name)
 
 
 class ModernAppHub:
@@ -47,9 +71,11 @@ class ModernAppHub:
         self.master = master
         self.search_var = tk.StringVar()
         self.selected_category = tk.StringVar(value="Alle")
+        profiler = get_startup_profiler()
         
         # Initialize settings
-        self.settings_manager = SettingsManager()
+        with profiler.phase("settings_load"):
+            self.settings_manager = SettingsManager()
         
         # DGB Assistent apps (customizable)
         self.apps = [
@@ -77,17 +103,34 @@ class ModernAppHub:
                 "color": "#002852",
                 "action": "individual_processor"
             },
+            {
+                "name": "Find Fotos", 
+                "description": "Find eksisterende fotos for en sag eller genstand",
+                "category": "Billeder",
+                "icon": "🔎",
+                "color": "#002852",
+                "action": "photo_search"
+            },
             {
                 "name": "Indstillinger", 
                 "description": "Konfigurer applikationsindstillinger",
                 "category": "Billeder",
                 "icon": "⚙️",
-                "color": "#002852"
+                "color": "#002852",
+                "action": "settings"
             }
         ]
         
-        self.setup_window()
-        self.create_modern_interface()
+        with profiler.phase("setup_window"):
+            self.setup_window()
+        with profiler.phase("create_modern_interface"):
+            self.create_modern_interface()
+        
+        # Genoptag synkronisering af filer der blev lagt i kø i en tidligere session
+        self.sync_worker = None             # ShareSyncWorker når den er startet (lytteren er tilknyttet)
+        self.sync_status_window = None
+        self.sync_update_pending = False
+        self.master.after(1500, self.resume_share_sync)
         
     def setup_window(self):
         """Configure the main window with modern styling"""
@@ -221,6 +264,16 @@ class ModernAppHub:
                             bg=self.colors['bg_sidebar'])
         version_label.pack(anchor=tk.W, pady=(6, 0))
         
+        # Filer i kø til museumsdrevet (vises kun når der er noget at vise - se update_sync_status)
+        # Klik åbner oversigten over kø og historik
+        self.sync_label = tk.Label(stats_frame, text="",
+                                   font=self.fonts['body'],
+                                   fg=self.colors['warning'],
+                                   bg=self.colors['bg_sidebar'],
+                                   justify=tk.LEFT, wraplength=210,
+                                   cursor='hand2')
+        self.sync_label.bind('<Button-1>', lambda event: self.open_sync_status())
+        
     def create_sidebar_footer(self, parent):
         """Create sidebar footer with GitHub and settings"""
         footer_frame = tk.Frame(parent, bg=self.colors['bg_sidebar'])
@@ -364,41 +417,54 @@ class ModernAppHub:
         # Bind mousewheel to canvas
         self.canvas.bind("<MouseWheel>", self.on_mousewheel)
         
-        # Create app tiles
+        # Create app tiles (bygges én gang - søgning viser/skjuler dem kun)
+        self.build_app_tiles()
         self.update_app_display()
         
+    def build_app_tiles(self):
+        """Build one tile per app and the search index used for filtering"""
+        self.app_tiles = [self.create_app_tile(self.scrollable_frame, app) for app in self.apps]
+        self.tile_positions = {}  # app indeks -> (row, col) for synlige tiles
+        self.build_search_index()
+        
+    def build_search_index(self):
+        """Forberegn delstreng -> app-indekser for hvert ord i navn og beskrivelse"""
+        self.search_index = {}
+        for index, app in enumerate(self.apps):
+            text = f"{app['name']} {app['description']}".lower()
+            for token in set(text.split()):
+                for start in range(len(token)):
+                    for end in range(start + 1, len(token) + 1):
+                        self.search_index.setdefault(token[start:end], set()).add(index)
+        
     def update_app_display(self):
-        """Update the display of app tiles based on current filter/search"""
-        # Clear existing tiles
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-            
-        # Filter apps based on category and search
-        filtered_apps = self.filter_apps()
+        """Show/hide the prebuilt tiles and only re-grid tiles whose position changed"""
+        visible_indices = self.filter_app_indices()
         
         # Calculate grid layout (4 columns)
         cols = 4
-        col_width = 250
-        
-        # Create app tiles
-        for i, app in enumerate(filtered_apps):
-            row = i // cols
-            col = i % cols
-            
-            self.create_app_tile(self.scrollable_frame, app, row, col)
-            
-        # Update canvas scroll region
-        self.scrollable_frame.update_idletasks()
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        
-    def create_app_tile(self, parent, app, row, col):
-        """Create a beautiful app tile"""
+        new_positions = {index: divmod(position, cols)
+                         for position, index in enumerate(visible_indices)}
+        
+        for index, tile_frame in enumerate(self.app_tiles):
+            position = new_positions.get(index)
+            if position is None:
+                if index in self.tile_positions:
+                    tile_frame.grid_remove()
+            elif self.tile_positions.get(index) != position:
+                row, col = position
+                tile_frame.grid(row=row, column=col, padx=15, pady=15, sticky="w")
+        
+        # Scroll region opdateres af <Configure> bindingen på scrollable_frame
+        self.tile_positions = new_positions
+        
+    def create_app_tile(self, parent, app):
+        """Create a beautiful app tile (placeres i grid af update_app_display)"""
         # Premium tile container with elegant border
         tile_frame = tk.Frame(parent, bg=self.colors['bg_secondary'], 
                              relief=tk.SOLID, bd=1, 
                              highlightbackground=self.colors['border_light'],
                              highlightthickness=1)
-        tile_frame.grid(row=row, column=col, padx=15, pady=15, sticky="w")
         
         # Inner content frame with premium spacing
         content_frame = tk.Frame(tile_frame, bg=self.colors['bg_secondary'])
@@ -447,6 +513,8 @@ class ModernAppHub:
         # Add hover effects to tile
         self.add_tile_hover_effects(tile_frame, content_frame, launch_btn)
         
+        return tile_frame
+        
     def add_tile_hover_effects(self, tile_frame, content_frame, button):
         """Add premium hover effects to app tiles"""
         def on_enter(e):
@@ -472,16 +540,24 @@ class ModernAppHub:
             
     def filter_apps(self):
         """Filter apps based on search only (no categories anymore)"""
-        apps = self.apps.copy()
-            
-        # Filter by search
+        return [self.apps[index] for index in self.filter_app_indices()]
+    
+    def filter_app_indices(self):
+        """Find indekser på apps der matcher alle ord i søgningen via søgeindekset"""
         search_term = self.search_var.get().lower()
-        if search_term and search_term != "søg apps...":
-            apps = [app for app in apps if 
-                   search_term in app['name'].lower() or 
-                   search_term in app['description'].lower()]
-                   
-        return apps
+        if not search_term or search_term == "søg apps...":
+            return list(range(len(self.apps)))
+        
+        matches = None
+        for token in search_term.split():
+            token_matches = self.search_index.get(token, set())
+            matches = token_matches if matches is None else matches & token_matches
+            if not matches:
+                return []
+        
+        if matches is None:
+            return list(range(len(self.apps)))
+        return sorted(matches)
     
     # Event handlers and utility methods
     def center_window(self):
@@ -546,40 +622,10 @@ class ModernAppHub:
         """Launch an application"""
         action = app.get('action')
         
-        if action == 'simple_resizer':
-            try:
-                resizer = SimpleImageResizer(self.master)
-                resizer.show()
-                # Ensure proper window focus
-                if hasattr(resizer, 'window') and resizer.window:
-                    resizer.window.lift()
-                    resizer.window.focus_force()
-            except Exception as e:
-                messagebox.showerror("Fejl", f"Kunne ikke starte Simpel Billedkomprimering:\n{str(e)}", parent=self.master)
-        
-        elif action == 'group_processor':
-            try:
-                processor = GroupImageProcessor(self.master)
-                processor.show()
-                # Ensure proper window focus
-                if hasattr(processor, 'window') and processor.window:
-                    processor.window.lift()
-                    processor.window.focus_force()
-            except Exception as e:
-                messagebox.showerror("Fejl", f"Kunne ikke starte Gruppe Billedbehandler:\n{str(e)}", parent=self.master)
-        
-        elif action == 'individual_processor':
-            try:
-                processor = IndividualImageProcessor(self.master)
-                processor.show()
-                # Ensure proper window focus
-                if hasattr(processor, 'window') and processor.window:
-                    processor.window.lift()
-                    processor.window.focus_force()
-            except Exception as e:
-                messagebox.showerror("Fejl", f"Kunne ikke starte Individuel Billedbehandler:\n{str(e)}", parent=self.master)
-        
-        elif app['name'] == 'Indstillinger':
+        if action in TOOL_REGISTRY:
+            self.launch_tool(action)
+        
+        elif action == 'settings':
             self.open_settings()
         
         else:
@@ -588,7 +634,152 @@ class ModernAppHub:
                                f"Starter {app['name']}...\n\n"
                                f"{app['description']}\n\n"
                                "Dette er en placeholder. Du kan integrere rigtig app-start her.")
+    
+    def launch_tool(self, action):
+        """Importér værktøjet ved første brug og åbn dets vindue"""
+        display_name = TOOL_REGISTRY[action][2]
+        
+        try:
+            # Første import kan tage et øjeblik (Pillow m.m.) - vis ventecursor
+            self.master.config(cursor='watch')
+            self.master.update_idletasks()
+            try:
+                tool_class = load_tool_class(action)
+            finally:
+                self.master.config(cursor='')
+            
+            tool = tool_class(self.master)
+            tool.show()
+            # Ensure proper window focus
+            if hasattr(tool, 'window') and tool.window:
+                tool.window.lift()
+                tool.window.focus_force()
+            return tool
+        except Exception as e:
+            messagebox.showerror("Fejl", f"Kunne ikke starte {display_name}:\n{str(e)}", parent=self.master)
+            return None
         
+    def resume_share_sync(self):
+        """Start baggrundssynkroniseringen hvis der ligger filer i staging fra sidst"""
+        try:
+            try:
+                from apps.image_tools import share_sync
+            except ImportError:
+                from ..apps.image_tools import share_sync
+            if share_sync.has_pending_staging():
+                share_sync.get_share_sync()
+        except Exception as e:
+            print(f"Kunne ikke genoptage synkronisering: {e}")
+            return
+        self.poll_share_sync(share_sync)
+    
+    def poll_share_sync(self, share_sync):
+        """
+        Tilknyt lytteren når workeren er startet (fx ved første organisering) - derefter
+        opdateres sidebaren med det samme når workeren melder ændringer
+        """
+        worker = share_sync.running_share_sync()
+        if worker is not None and worker is not self.sync_worker:
+            self.sync_worker = worker
+            worker.add_listener(self.on_share_sync_status)
+        self.update_sync_status()
+        self.master.after(SYNC_STATUS_POLL_MS, lambda: self.poll_share_sync(share_sync))
+    
+    def on_share_sync_status(self, status):
+        """Lytter på workeren (baggrundstråd) - selve opdateringen sker på GUI-tråden"""
+        if self.sync_update_pending:
+            return
+        self.sync_update_pending = True
+        try:
+            self.master.after(0, self.update_sync_status)
+        except (RuntimeError, tk.TclError):
+            pass  # Vinduet er lukket
+    
+    def update_sync_status(self):
+        """Vis kø, konflikter, genforsøg og oversprungne filer i sidebaren (GUI-tråden)"""
+        self.sync_update_pending = False
+        status = dict(self.sync_worker.status) if self.sync_worker else None
+        lines = []
+        # Konflikter (gemt et andet sted end forhåndsvisningen viste) står ved siden af køen
+        counts = []
+        if status and status['pending']:
+            counts.append(f"⏳ {status['pending']} filer i kø til museumsdrevet")
+        if status and status['conflicts']:
+            counts.append(f"⚠️ {status['conflicts']} gemt andet sted end planlagt")
+        if counts:
+            lines.append(" · ".join(counts))
+        if status and status['pending'] and status['online'] is False:
+            lines.append("Drevet er ikke tilgængeligt - gemmes når det er tilbage")
+        if status and status['held']:
+            lines.append(f"📁 {status['held']} venter på en mappe")
+        if status and status['retrying']:
+            lines.append(f"🔁 {status['retrying']} forsøges igen")
+        if status and status['skipped']:
+            lines.append(f"⏭️ {status['skipped']} sprunget over")
+        
+        if lines:
+            self.sync_label.config(text="\n".join(lines + ["Klik for detaljer"]))
+            if not self.sync_label.winfo_manager():
+                self.sync_label.pack(anchor=tk.W, pady=(12, 0))
+        elif self.sync_label.winfo_manager():
+            self.sync_label.pack_forget()
+        
+        if self.sync_status_window is not None:
+            self.sync_status_window.refresh()
+    
+    def open_sync_status(self):
+        """Åbn oversigten over synkroniseringen (kø, genforsøg og historik)"""
+        if self.sync_worker is None:
+            return
+        try:
+            if self.sync_status_window is None:
+                try:
+                    from apps.image_tools.sync_status import SyncStatusWindow
+                except ImportError:
+                    from ..apps.image_tools.sync_status import SyncStatusWindow
+                self.sync_status_window = SyncStatusWindow(self.master, self.sync_worker)
+            # Uden noget i kø er konflikterne det brugeren har klikket for at se
+            status = self.sync_worker.status
+            self.sync_status_window.show(show_conflicts=bool(status['conflicts'] and not status['pending']))
+        except Exception as e:
+            messagebox.showerror("Fejl", f"Kunne ikke vise synkroniseringen:\n{str(e)}", parent=self.master)
+    
+    def attach_single_instance(self, instance):
+        """Modtag opstarts-forespørgsler fra senere instanser via den lokale socket"""
+        self.single_instance = instance
+        self.poll_single_instance()
+    
+    def poll_single_instance(self):
+        """Tjek periodisk for forespørgsler fra andre instanser (GUI-tråden)"""
+        for request in self.single_instance.poll_requests():
+            self.handle_launch_request(request, bring_to_front=True)
+        self.master.after(200, self.poll_single_instance)
+    
+    def handle_launch_request(self, request, bring_to_front=False):
+        """Åbn det ønskede værktøj med de medsendte filer allerede indlæst"""
+        if bring_to_front:
+            self.master.deiconify()
+            self.master.lift()
+            self.master.focus_force()
+        
+        files = [path for path in request.get('files', []) if os.path.isfile(path)]
+        action = request.get('tool')
+        if action is None and files:
+            action = DEFAULT_FILE_TOOL
+        
+        if action == 'settings':
+            self.open_settings()
+            return
+        if action not in TOOL_REGISTRY:
+            if action:
+                messagebox.showwarning("Ukendt værktøj", f"Værktøjet '{action}' findes ikke.",
+                                       parent=self.master)
+            return
+        
+        tool = self.launch_tool(action)
+        if tool and files and hasattr(tool, 'load_files'):
+            tool.load_files(files)
+    
     def add_new_app(self):
         """Add a new app to the hub - removed"""
         pass
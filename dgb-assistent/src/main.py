@@ -12,17 +12,44 @@ from tkinter import messagebox
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from gui.main_window import MainWindow
+# Opstartsprofilering (DGB_PROFILE_STARTUP / --profile-startup) skal starte før GUI-imports
+from utils.startup_profiler import init_startup_profiler
+profiler = init_startup_profiler(sys.argv)
+
+from utils.single_instance import SingleInstance, parse_launch_args
 
 
 def main():
     """Main application function"""
+    # Aflever til en kørende instans før vi betaler for GUI-import og Tk opstart
+    request = parse_launch_args(sys.argv[1:])
+    instance = None
+    if not request['new_instance']:
+        with profiler.phase("single_instance"):
+            instance = SingleInstance()
+            if not instance.acquire(request):
+                return
+    
     try:
+        with profiler.phase("import_gui"):
+            from gui.main_window import MainWindow
+        
         # Create the main tkinter root
-        root = tk.Tk()
+        with profiler.phase("tk_init"):
+            root = tk.Tk()
         
         # Create and configure the main window
-        app = MainWindow(root)
+        with profiler.phase("main_window"):
+            app = MainWindow(root)
+        
+        # Forespørgsler fra senere instanser - og fra vores egen kommandolinje
+        if instance is not None:
+            app.attach_single_instance(instance)
+        if request['tool'] or request['files']:
+            root.after_idle(lambda: app.handle_launch_request(request))
+        
+        # Rapporten skrives når hovedvinduet er tegnet og event loop er i gang
+        root.after_idle(profiler.finish)
         
         # Start the GUI event loop
         root.mainloop()
@@ -31,6 +58,10 @@ def main():
         # Show error dialog if something goes wrong
         messagebox.showerror("Application Error", f"An error occurred: {str(e)}")
         sys.exit(1)
+    
+    finally:
+        if instance is not None:
+            instance.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+"""
+Single Instance Manager for DGB Assistent
+Sørger for at kun én instans kører - senere opstarter sender deres filer/handlinger
+til den kørende instans over en lokal socket og afslutter med det samme
+"""
+
+import getpass
+import json
+import os
+import queue
+import secrets
+import socket
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Maks størrelse på en besked (filstier) fra en anden instans
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+
+def default_instance_port() -> int:
+    """Fast port pr. bruger i det dynamiske område, så to brugere ikke kolliderer"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "dgb"
+    return 49152 + zlib.crc32(user.encode('utf-8')) % 10000
+
+
+def parse_launch_args(argv: List[str]) -> Dict:
+    """
+    Fortolk kommandolinjen til en opstarts-forespørgsel
+    Eksempel: --tool=group_processor billede1.jpg billede2.jpg
+    Returns: {'tool': action eller None, 'files': [absolutte stier], 'new_instance': bool}
+    """
+    request = {'tool': None, 'files': [], 'new_instance': False}
+
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg == "--tool" and args:
+            request['tool'] = args.pop(0)
+        elif arg.startswith("--tool="):
+            request['tool'] = arg.split("=", 1)[1]
+        elif arg == "--new-instance":
+            request['new_instance'] = True
+        elif arg.startswith("--"):
+            continue  # Ukendte flag ignoreres
+        else:
+            # Absolutte stier - den kørende instans har ikke nødvendigvis samme cwd
+            request['files'].append(os.path.abspath(arg))
+
+    return request
+
+
+class SingleInstance:
+    """Lokal socket-server der modtager opstarts-forespørgsler fra senere instanser"""
+
+    def __init__(self, port: Optional[int] = None, state_dir: Optional[str] = None):
+        self.port = port if port is not None else default_instance_port()
+        self.state_dir = Path(state_dir) if state_dir else Path.home() / "AppData" / "Local" / "DGB-Assistent"
+        self.state_file = self.state_dir / "instance.json"
+        self.server_socket = None
+        self.server_thread = None
+        self.token = None
+        self.requests = queue.Queue()  # Modtagne forespørgsler, tømmes af GUI-tråden
+        self.is_primary = False
+
+    def acquire(self, request: Optional[Dict] = None) -> bool:
+        """
+        Bliv primær instans, eller aflever forespørgslen til den kørende instans
+        Returns: True hvis denne proces skal starte GUI'en, False hvis den skal afslutte
+        """
+        if self.start_server():
+            return True
+
+        # Porten er optaget - forsøg aflevering til den kørende instans
+        # (et par forsøg, hvis den anden instans lige er ved at starte op)
+        for attempt in range(5):
+            if self.send_to_running_instance(request or {}):
+                return False
+            time.sleep(0.1)
+
+        # Porten bruges af noget andet (eller instansen svarer ikke) - kør selvstændigt
+        print(f"Single instance: port {self.port} optaget, starter uden aflevering")
+        return True
+
+    def start_server(self) -> bool:
+        """Bind den faste port - lykkes kun for den første instans"""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if hasattr(socket, 'SO_EXCLUSIVEADDRUSE'):
+            # Windows: forhindr at en anden proces binder samme port oveni
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            # POSIX: serveren lukker hver aflevering først, så porten står i TIME_WAIT efter
+            # lukning - SO_REUSEADDR tillader ny binding, men stadig ikke mens en anden lytter
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            server.bind(("127.0.0.1", self.port))
+            server.listen(5)
+        except OSError:
+            server.close()
+            return False
+
+        self.server_socket = server
+        self.token = secrets.token_hex(16)
+        self.is_primary = True
+
+        try:
+            self.write_state_file()
+        except Exception as e:
+            print(f"Kunne ikke skrive instans-fil: {e}")
+
+        self.server_thread = threading.Thread(target=self.serve, daemon=True)
+        self.server_thread.start()
+        return True
+
+    def write_state_file(self):
+        """Gem port og token så senere instanser kan autentificere sig"""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        temp_file = self.state_file.with_suffix(".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'port': self.port, 'token': self.token, 'pid': os.getpid()}, f)
+        os.replace(temp_file, self.state_file)
+        if os.name != 'nt':
+            os.chmod(self.state_file, 0o600)
+
+    def read_state_file(self) -> Optional[Dict]:
+        """Læs den kørende instans' port og token"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def send_to_running_instance(self, request: Dict, timeout: float = 3.0) -> bool:
+        """Send forespørgslen til den kørende instans og vent på kvittering"""
+        state = self.read_state_file()
+        if not state or state.get('port') != self.port:
+            return False
+
+        message = json.dumps({'token': state.get('token'), 'request': request}).encode('utf-8') + b"\n"
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=timeout) as client:
+                client.sendall(message)
+                reply = client.makefile('rb').readline(64)
+            return reply.strip() == b"ok"
+        except OSError:
+            return False
+
+    def serve(self):
+        """Acceptér forbindelser (kører i baggrundstråd)"""
+        while self.server_socket is not None:
+            try:
+                connection, _ = self.server_socket.accept()
+            except OSError:
+                break  # Socket lukket
+
+            with connection:
+                try:
+                    connection.settimeout(3.0)
+                    line = connection.makefile('rb').readline(MAX_MESSAGE_BYTES)
+                    message = json.loads(line.decode('utf-8'))
+                    if message.get('token') != self.token:
+                        connection.sendall(b"denied\n")
+                        continue
+                    self.requests.put(message.get('request') or {})
+                    connection.sendall(b"ok\n")
+                except Exception as e:
+                    print(f"Ugyldig besked fra anden instans: {e}")
+
+    def poll_requests(self) -> List[Dict]:
+        """Hent alle ventende forespørgsler (kaldes fra GUI-tråden)"""
+        pending = []
+        while True:
+            try:
+                pending.append(self.requests.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def close(self):
+        """Stop serveren og fjern instans-filen"""
+        if self.server_socket is None:
+            return
+        server, self.server_socket = self.server_socket, None
+        try:
+            server.shutdown(socket.SHUT_RDWR)  # Vækker accept() i server-tråden
+        except OSError:
+            pass
+        try:
+            server.close()
+        except OSError:
+            pass
+
+        state = self.read_state_file()
+        if state and state.get('token') == self.token:
+            try:
+                self.state_file.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,311 @@
+"""
+Startup Profiler for DGB Assistent
+Måler import-tider pr. modul og tid pr. opstartsfase og skriver en JSON rapport
+
+Aktiveres med miljøvariablen DGB_PROFILE_STARTUP=1 (eller en sti til rapporten)
+eller med kommandolinje-flaget --profile-startup[=sti].
+
+Sammenlign to rapporter:
+    python -m utils.startup_profiler compare gammel.json ny.json
+"""
+
+import builtins
+import importlib.util
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILE_ENV_VAR = "DGB_PROFILE_STARTUP"
+PROFILE_CLI_FLAG = "--profile-startup"
+
+
+class StartupProfiler:
+    """Opsamler import- og fasetider under opstart"""
+
+    def __init__(self, enabled: bool = False, report_path: Optional[str] = None):
+        self.enabled = enabled
+        self.report_path = report_path
+        self.start_time = time.perf_counter()
+        self.imports = {}   # modulnavn -> {'self_ms', 'cumulative_ms'}
+        self.phases = []    # [{'name', 'start_ms', 'duration_ms'}] i rækkefølge
+        self.finished = False
+        self._original_import = None
+        self._child_time_stack = []
+
+    # Import tider
+    def install_import_hook(self):
+        """Erstat builtins.__import__ med en tidtagende wrapper"""
+        if not self.enabled or self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall_import_hook(self):
+        """Genskab den oprindelige __import__"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """Tidtag imports der faktisk indlæser nye moduler"""
+        original_import = self._original_import
+
+        # Hurtig vej: allerede indlæst absolut import
+        if level == 0 and name in sys.modules and not fromlist:
+            return original_import(name, globals, locals, fromlist, level)
+
+        modules_before = len(sys.modules)
+        self._child_time_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            child_time = self._child_time_stack.pop()
+            if self._child_time_stack:
+                self._child_time_stack[-1] += elapsed
+
+            if len(sys.modules) > modules_before:
+                module_name = self._resolve_name(name, globals, level)
+                record = self.imports.setdefault(module_name, {'self_ms': 0.0, 'cumulative_ms': 0.0})
+                record['self_ms'] += (elapsed - child_time) * 1000
+                record['cumulative_ms'] += elapsed * 1000
+
+    def _resolve_name(self, name: str, globals, level: int) -> str:
+        """Oversæt relative imports til fulde modulnavne"""
+        if level == 0:
+            return name
+        package = (globals or {}).get('__package__') or ''
+        try:
+            return importlib.util.resolve_name('.' * level + name, package)
+        except (ImportError, ValueError):
+            return '.' * level + name
+
+    # Faser
+    @contextmanager
+    def phase(self, name: str):
+        """Tidtag en navngiven opstartsfase"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append({
+                'name': name,
+                'start_ms': round((start - self.start_time) * 1000, 2),
+                'duration_ms': round((end - start) * 1000, 2)
+            })
+
+    def mark(self, name: str):
+        """Registrér et tidspunkt (fase uden varighed), fx første viste vindue"""
+        if self.enabled:
+            self.phases.append({
+                'name': name,
+                'start_ms': round((time.perf_counter() - self.start_time) * 1000, 2),
+                'duration_ms': 0.0
+            })
+
+    # Rapport
+    def build_report(self) -> Dict:
+        """Byg rapport-dict med faser og imports sorteret efter kumuleret tid"""
+        try:
+            from config import APP_VERSION
+        except ImportError:
+            APP_VERSION = "ukendt"
+
+        imports = [
+            {
+                'module': module_name,
+                'self_ms': round(times['self_ms'], 2),
+                'cumulative_ms': round(times['cumulative_ms'], 2)
+            }
+            for module_name, times in self.imports.items()
+        ]
+        imports.sort(key=lambda item: item['cumulative_ms'], reverse=True)
+
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'app_version': APP_VERSION,
+            'frozen': bool(getattr(sys, 'frozen', False)),
+            'python': sys.version.split()[0],
+            'platform': sys.platform,
+            'total_ms': round((time.perf_counter() - self.start_time) * 1000, 2),
+            'phases': self.phases,
+            'imports': imports
+        }
+
+    def default_report_path(self) -> Path:
+        """Standard placering for rapporter (ved siden af indstillingerne)"""
+        report_dir = Path.home() / "AppData" / "Local" / "DGB-Assistent" / "startup_profiles"
+        return report_dir / f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+    def write_report(self, path: Optional[str] = None) -> Optional[Path]:
+        """Skriv rapporten som JSON og returnér stien"""
+        report_path = Path(path or self.report_path or self.default_report_path())
+        try:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(self.build_report(), f, indent=2, ensure_ascii=False)
+            return report_path
+        except Exception as e:
+            print(f"Kunne ikke skrive opstartsrapport: {e}")
+            return None
+
+    def finish(self) -> Optional[Path]:
+        """Afslut målingen (kaldes når hovedvinduet er vist) og skriv rapporten"""
+        if not self.enabled or self.finished:
+            return None
+        self.finished = True
+        self.mark("first_idle")
+        self.uninstall_import_hook()
+        report_path = self.write_report()
+        if report_path:
+            print(f"Opstartsrapport gemt: {report_path}")
+        return report_path
+
+
+def load_report(path: str) -> Dict:
+    """Indlæs en gemt rapport"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_reports(old: Dict, new: Dict, min_delta_ms: float = 1.0) -> Dict:
+    """
+    Sammenlign to rapporter
+    Returns: dict med total-, fase- og import-forskelle (positiv delta = langsommere)
+    """
+    def phase_times(report):
+        times = {}
+        for phase in report.get('phases', []):
+            value = phase['duration_ms'] if phase['duration_ms'] else phase['start_ms']
+            times[phase['name']] = value
+        return times
+
+    def import_times(report):
+        return {item['module']: item['cumulative_ms'] for item in report.get('imports', [])}
+
+    def diff(old_times, new_times):
+        rows = []
+        for name in sorted(set(old_times) | set(new_times)):
+            old_ms = old_times.get(name)
+            new_ms = new_times.get(name)
+            delta = (new_ms or 0.0) - (old_ms or 0.0)
+            if abs(delta) >= min_delta_ms:
+                rows.append({'name': name, 'old_ms': old_ms, 'new_ms': new_ms,
+                             'delta_ms': round(delta, 2)})
+        rows.sort(key=lambda row: row['delta_ms'], reverse=True)
+        return rows
+
+    return {
+        'total': {
+            'old_ms': old.get('total_ms'),
+            'new_ms': new.get('total_ms'),
+            'delta_ms': round(new.get('total_ms', 0.0) - old.get('total_ms', 0.0), 2)
+        },
+        'phases': diff(phase_times(old), phase_times(new)),
+        'imports': diff(import_times(old), import_times(new))
+    }
+
+
+def format_comparison(comparison: Dict, limit: int = 15) -> str:
+    """Formatér en sammenligning som læsbar tekst"""
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    total = comparison['total']
+    lines = [f"Total: {fmt(total['old_ms'])} ms -> {fmt(total['new_ms'])} ms ({total['delta_ms']:+.1f} ms)"]
+
+    for title, key in [("Faser", 'phases'), ("Imports (kumuleret)", 'imports')]:
+        rows = comparison[key]
+        lines.append("")
+        lines.append(f"{title}:")
+        if not rows:
+            lines.append("  (ingen ændringer)")
+        for row in rows[:limit]:
+            lines.append(f"  {row['name']:<45} {fmt(row['old_ms']):>9} -> {fmt(row['new_ms']):>9}"
+                         f"  ({row['delta_ms']:+.1f} ms)")
+        if len(rows) > limit:
+            lines.append(f"  ... og {len(rows) - limit} flere")
+
+    return "\n".join(lines)
+
+
+_startup_profiler = None
+
+def get_startup_profiler() -> StartupProfiler:
+    """Get the global startup profiler instance (deaktiveret hvis ikke initialiseret)"""
+    global _startup_profiler
+    if _startup_profiler is None:
+        _startup_profiler = StartupProfiler(enabled=False)
+    return _startup_profiler
+
+
+def init_startup_profiler(argv: Optional[List[str]] = None) -> StartupProfiler:
+    """
+    Opret den globale profiler ud fra miljøvariabel eller kommandolinje
+    Flaget fjernes fra argv så resten af programmet ikke ser det
+    """
+    global _startup_profiler
+    argv = sys.argv if argv is None else argv
+
+    enabled = False
+    report_path = None
+
+    env_value = os.environ.get(PROFILE_ENV_VAR, "").strip()
+    if env_value and env_value.lower() not in ("0", "false", "no"):
+        enabled = True
+        if env_value.lower() not in ("1", "true", "yes"):
+            report_path = env_value
+
+    for arg in list(argv[1:]):
+        if arg == PROFILE_CLI_FLAG or arg.startswith(PROFILE_CLI_FLAG + "="):
+            enabled = True
+            if "=" in arg:
+                report_path = arg.split("=", 1)[1]
+            argv.remove(arg)
+
+    _startup_profiler = StartupProfiler(enabled=enabled, report_path=report_path)
+    _startup_profiler.install_import_hook()
+    return _startup_profiler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Kommandolinje: sammenlign to opstartsrapporter"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DGB Assistent opstartsprofiler")
+    subparsers = parser.add_subparsers(dest='command')
+
+    compare_parser = subparsers.add_parser('compare', help="Sammenlign to rapporter")
+    compare_parser.add_argument('old', help="Gammel rapport (JSON)")
+    compare_parser.add_argument('new', help="Ny rapport (JSON)")
+    compare_parser.add_argument('--min-delta', type=float, default=1.0,
+                                help="Skjul forskelle under denne værdi (ms)")
+    compare_parser.add_argument('--fail-over', type=float, default=None,
+                                help="Returnér fejlkode hvis total-tiden stiger mere end dette (ms)")
+
+    args = parser.parse_args(argv)
+    if args.command != 'compare':
+        parser.print_help()
+        return 2
+
+    comparison = compare_reports(load_report(args.old), load_report(args.new), args.min_delta)
+    print(format_comparison(comparison))
+
+    if args.fail_over is not None and comparison['total']['delta_ms'] > args.fail_over:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())